@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Cold import time of the modules loaded at app and CLI startup.
+
+Each import runs in a fresh interpreter with ``-X importtime``. Entry point
+discovery imports the package, the extension and the CLI commands on every
+``invenio`` invocation and gunicorn worker boot.
+
+Usage::
+
+    python benchmarks/import_time.py --save     # store a new baseline
+    python benchmarks/import_time.py            # compare with the baseline
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+TARGETS = {
+    "package": "import invenio_dnb_urn",
+    "extension": "from invenio_dnb_urn import InvenioSerializerXMetaDissPlus",
+    "views": "import invenio_dnb_urn.views",
+    "cli": "import invenio_dnb_urn.cli",
+    "provider": "from invenio_dnb_urn import DnbUrnProvider",
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "import-baseline.json")
+
+
+def import_tree(statement):
+    """Parse ``-X importtime`` output.
+
+    :returns: ``(module, depth, cumulative microseconds, children)`` tuples
+        in output order, children are listed before their importer.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    pending = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Nested imports are indented by two spaces per level.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        children = [entry for entry in pending if entry[1] == depth + 1]
+        pending = [entry for entry in pending if entry[1] <= depth]
+        entry = (name.strip(), depth, int(cumulative), children)
+        pending.append(entry)
+        imports.append(entry)
+    return imports
+
+
+STARTUP = None
+
+
+def measure(statement, runs):
+    """Median import time of a statement and the slowest external imports.
+
+    Modules imported by the interpreter startup are not counted, external
+    imports are those of third party modules made by this package.
+    """
+    global STARTUP
+    if STARTUP is None:
+        STARTUP = {name for name, *_ in import_tree("pass")}
+
+    totals = []
+    external = {}
+    for _ in range(runs):
+        imports = import_tree(statement)
+        totals.append(
+            sum(
+                cumulative
+                for name, depth, cumulative, _ in imports
+                if depth == 0 and name not in STARTUP
+            )
+        )
+        for name, _, _, children in imports:
+            if not name.startswith("invenio_dnb_urn"):
+                continue
+            for child, _, cumulative, _ in children:
+                if not child.startswith("invenio_dnb_urn"):
+                    external[child] = cumulative
+    slowest = sorted(external.items(), key=lambda item: item[1], reverse=True)
+    return {"ms": statistics.median(totals) / 1000, "slowest": slowest}
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--top", type=int, default=5, help="slowest imports shown")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--save", action="store_true", help="store results as baseline")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+
+    results = {}
+    regressions = []
+    for target in args.targets.split(","):
+        if target not in TARGETS:
+            parser.error(f"unknown target {target}")
+        result = measure(TARGETS[target], args.runs)
+        results[target] = result["ms"]
+        change = "-"
+        if target in baseline:
+            ratio = (result["ms"] - baseline[target]) / baseline[target]
+            change = f"{ratio:+.1%}"
+            if ratio > args.threshold:
+                regressions.append(target)
+        print(f"{target:<10}{result['ms']:>10.1f} ms{change:>10}  {TARGETS[target]}")
+        for name, microseconds in result["slowest"][: args.top]:
+            print(f"{'':<12}{microseconds / 1000:>8.1f} ms  {name}")
+
+    if args.save:
+        with open(args.baseline, "w") as fp:
+            json.dump(results, fp, indent=2)
+        print(f"Baseline stored in {args.baseline}.")
+    elif regressions:
+        print(
+            f"Slower than the baseline by more than {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Benchmark of ``xmetadiss_etree`` with synthetic records.
+
+Records are generated with Faker in profiles from ``tiny`` to ``extreme``,
+scaling the number of creators, contributors, subjects, identifiers and
+rights. Resource type lookups are answered from a constant instead of the
+vocabulary service.
+
+Usage::
+
+    python benchmarks/xmetadiss.py --save     # store a new baseline
+    python benchmarks/xmetadiss.py            # compare with the baseline
+
+The run fails when a profile got slower than the baseline by more than the
+threshold.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from faker import Faker
+from flask import Flask
+from lxml import etree
+
+from invenio_dnb_urn.oai import XMetaDissBuilder, xmetadiss_etree
+
+PROFILES = {
+    # creators, contributors, subjects, identifiers, rights
+    "tiny": (1, 0, 0, 0, 0),
+    "small": (2, 1, 3, 2, 1),
+    "medium": (5, 3, 10, 5, 2),
+    "large": (25, 10, 50, 20, 5),
+    "extreme": (250, 100, 500, 200, 20),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "xmetadiss-baseline.json")
+
+RESOURCE_TYPE_PROPS = {"openaire_type": "publication"}
+
+
+def vocabulary_props(vocabulary, fields, id_):
+    """Constant stand-in for ``get_vocabulary_props``."""
+    return RESOURCE_TYPE_PROPS
+
+
+class RecordFactory:
+    """Deterministic synthetic RDM search hits."""
+
+    def __init__(self, seed=0):
+        """Constructor."""
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        self.random = random.Random(seed)
+
+    def person(self):
+        """Creator or contributor."""
+        fake = self.fake
+        if self.random.random() < 0.2:
+            person = {"type": "organizational", "name": fake.company()}
+        else:
+            person = {
+                "type": "personal",
+                "given_name": fake.first_name(),
+                "family_name": fake.last_name(),
+                "identifiers": [
+                    {
+                        "scheme": "orcid",
+                        "identifier": fake.numerify("0000-000#-####-####"),
+                    },
+                    {"scheme": "gnd", "identifier": fake.numerify("#########")},
+                ],
+            }
+        return {
+            "person_or_org": person,
+            "affiliations": [{"name": fake.company()}],
+        }
+
+    def subject(self):
+        """Free, FOS or DDC subject."""
+        kind = self.random.randrange(3)
+        if kind == 0:
+            return {"subject": self.fake.word()}
+        if kind == 1:
+            return {"scheme": "FOS", "subject": self.fake.word()}
+        notation = self.fake.numerify("###")
+        return {
+            "scheme": "DDC",
+            "id": f"http://dewey.info/class/{notation}",
+            "subject": self.fake.word(),
+        }
+
+    def identifier(self):
+        """Related identifier."""
+        scheme = self.random.choice(["url", "urn", "doi", "handle", "isbn", "arxiv"])
+        return {"scheme": scheme, "identifier": self.fake.uri()}
+
+    def right(self, index):
+        """Creative Commons or other licence."""
+        if index % 2 == 0:
+            return {
+                "id": "cc-by-4.0",
+                "title": {"en": "CC BY 4.0"},
+                "props": {"url": self.fake.uri()},
+            }
+        return {
+            "id": f"licence-{index}",
+            "title": {"de": self.fake.sentence(), "en": self.fake.sentence()},
+            "props": {"url": self.fake.uri()},
+        }
+
+    def record(self, index, profile):
+        """Search hit of a published record of the given profile."""
+        creators, contributors, subjects, identifiers, rights = PROFILES[profile]
+        fake = self.fake
+        metadata = {
+            "title": fake.sentence(),
+            "additional_titles": [
+                {
+                    "type": {"id": "translated-title"},
+                    "title": fake.sentence(),
+                    "lang": {"id": "eng"},
+                }
+            ],
+            "creators": [self.person() for _ in range(creators)],
+            "contributors": [self.person() for _ in range(contributors)],
+            "subjects": [self.subject() for _ in range(subjects)],
+            "identifiers": [self.identifier() for _ in range(identifiers)],
+            "publisher": f"{fake.company()} / {fake.city()}",
+            "publication_date": fake.date(),
+            "resource_type": {"id": "publication-thesis"},
+            "languages": [{"id": "deu"}],
+            "sizes": [f"{self.random.randint(10, 500)} pages"],
+            "additional_descriptions": [
+                {
+                    "type": {"id": "series-information"},
+                    "description": f"<p>{fake.sentence()}</p>",
+                }
+            ],
+        }
+        if rights:
+            metadata["rights"] = [self.right(i) for i in range(rights)]
+        return {
+            "_source": {
+                "id": fake.bothify("?????-?????").lower(),
+                "metadata": metadata,
+                "pids": {
+                    "urn": {"identifier": f"urn:nbn:de:hbz:6-{index}"},
+                    "doi": {"identifier": f"10.1234/{index}"},
+                },
+                "access": {"files": self.random.choice(["public", "restricted"])},
+                "custom_fields": {
+                    "thesis:level": {"id": "master"},
+                    "thesis:organisation": fake.company(),
+                    "thesis:place": fake.city(),
+                },
+            }
+        }
+
+
+def create_app():
+    """Minimal application serving ``xmetadiss_etree`` without caches."""
+    app = Flask(__name__)
+    app.extensions["invenio_dnb_urn"] = SimpleNamespace(
+        xmetadiss_builder=XMetaDissBuilder(
+            "https://127.0.0.1:5000/api",
+            "https://127.0.0.1:5000",
+            "openaire_type",
+            "openaire_type",
+            vocabulary_props=vocabulary_props,
+        ),
+        xmetadiss_cache=None,
+        serializer_pool=None,
+    )
+    return app
+
+
+def serialize(record):
+    """Serialization measured per record."""
+    return etree.tostring(xmetadiss_etree(None, record))
+
+
+def measure(records, repeat):
+    """Timing and memory of serializing records."""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for record in records:
+            serialize(record)
+        rounds.append((time.perf_counter() - start) / len(records))
+
+    # Python side allocations only, libxml2 allocates outside tracemalloc.
+    allocated = []
+    tracemalloc.start()
+    for record in records:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        serialize(record)
+        allocated.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "per_record_us": min(rounds) * 1e6,
+        "median_us": statistics.median(rounds) * 1e6,
+        "alloc_kib": statistics.mean(allocated) / 1024,
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run(profiles, count, repeat):
+    """Measure every profile."""
+    app = create_app()
+    factory = RecordFactory()
+    results = {}
+    with app.app_context():
+        for profile in profiles:
+            records = [factory.record(i, profile) for i in range(count)]
+            results[profile] = measure(records, repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Regressions of per record time above the threshold."""
+    regressions = []
+    for profile, result in results.items():
+        if profile not in baseline:
+            continue
+        base = baseline[profile]["per_record_us"]
+        change = (result["per_record_us"] - base) / base
+        result["change"] = change
+        if change > threshold:
+            regressions.append(profile)
+    return regressions
+
+
+def main(argv=None):
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--count", type=int, default=200, help="records per profile")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--save", action="store_true", help="store results as baseline")
+    args = parser.parse_args(argv)
+
+    profiles = args.profiles.split(",")
+    for profile in profiles:
+        if profile not in PROFILES:
+            parser.error(f"unknown profile {profile}")
+    results = run(profiles, args.count, args.repeat)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["profiles"]
+    regressions = compare(results, baseline, args.threshold)
+
+    print(
+        f"{'profile':<10}{'us/record':>12}{'median':>12}{'KiB alloc':>12}{'change':>10}"
+    )
+    for profile, result in results.items():
+        change = f"{result['change']:+.1%}" if "change" in result else "-"
+        print(
+            f"{profile:<10}{result['per_record_us']:>12.1f}{result['median_us']:>12.1f}"
+            f"{result['alloc_kib']:>12.1f}{change:>10}"
+        )
+    print(f"max RSS {max(r['max_rss_mib'] for r in results.values()):.1f} MiB")
+
+    if args.save:
+        with open(args.baseline, "w") as fp:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "lxml": etree.__version__,
+                    "profiles": results,
+                },
+                fp,
+                indent=2,
+            )
+        print(f"Baseline stored in {args.baseline}.")
+    elif regressions:
+        print(
+            f"Slower than the baseline by more than {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,9 +7,6 @@
 
 """Invenio Serializer to create xepicur serialization for DNB harvesting."""
 
-from .serialize import InvenioSerializerXMetaDissPlus
-from .provider import DnbUrnProvider
-
 __version__ = '0.1.2'
 
 __all__ = (
@@ -18,3 +15,20 @@ __all__ = (
     'DnbUrnProvider',
 )
 
+
+def __getattr__(name):
+    """Import the exported classes on first access.
+
+    Keeps ``import invenio_dnb_urn``, e.g. by entry point discovery, free of
+    the lxml, vocabularies and DNB client imports.
+    """
+    if name == "InvenioSerializerXMetaDissPlus":
+        from .serialize import InvenioSerializerXMetaDissPlus
+
+        return InvenioSerializerXMetaDissPlus
+    if name == "DnbUrnProvider":
+        from .provider import DnbUrnProvider
+
+        return DnbUrnProvider
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create DNB URN outbox table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6e1493f7cf16"
+down_revision = "aab75e582170"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        "dnb_urn_outbox",
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.Column("urn", sa.String(length=255), nullable=False),
+        sa.Column("action", sa.String(length=6), nullable=False),
+        sa.Column("url", sa.Text(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt", sa.DateTime(), nullable=False),
+        sa.Column("failed", sa.Boolean(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint("urn", name=op.f("pk_dnb_urn_outbox")),
+    )
+    op.create_index(
+        op.f("ix_dnb_urn_outbox_next_attempt"),
+        "dnb_urn_outbox",
+        ["next_attempt"],
+        unique=False,
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(op.f("ix_dnb_urn_outbox_next_attempt"), table_name="dnb_urn_outbox")
+    op.drop_table("dnb_urn_outbox")
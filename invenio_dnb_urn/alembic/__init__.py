@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Alembic recipes of the DNB URN outbox."""
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create DNB URN pushed URL table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d2054762fd6e"
+down_revision = "6e1493f7cf16"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        "dnb_urn_pushed_url",
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.Column("urn", sa.String(length=255), nullable=False),
+        sa.Column("url_hash", sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint("urn", name=op.f("pk_dnb_urn_pushed_url")),
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table("dnb_urn_pushed_url")
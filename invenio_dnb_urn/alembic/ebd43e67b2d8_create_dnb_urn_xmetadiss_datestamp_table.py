@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Create DNB URN xMetaDiss datestamp table."""
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "ebd43e67b2d8"
+down_revision = "d2054762fd6e"
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        "dnb_urn_xmetadiss_datestamp",
+        sa.Column("created", sa.DateTime(), nullable=False),
+        sa.Column("updated", sa.DateTime(), nullable=False),
+        sa.Column("record_id", sqlalchemy_utils.types.uuid.UUIDType(), nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("datestamp", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "record_id", name=op.f("pk_dnb_urn_xmetadiss_datestamp")
+        ),
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table("dnb_urn_xmetadiss_datestamp")
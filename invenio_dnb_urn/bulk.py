@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Helpers for bulk operations against the DNB URN service."""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+
+class RateLimiter:
+    """Thread-safe limiter allowing ``rate`` calls per second."""
+
+    def __init__(self, rate=None):
+        """Constructor."""
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(self._next, now) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BulkReport:
+    """Counters, failures and throughput of a bulk run."""
+
+    def __init__(
+        self, processed=0, succeeded=0, skipped=0, failures=None, counters=None
+    ):
+        """Constructor."""
+        self.processed = processed
+        self.succeeded = succeeded
+        self.skipped = skipped
+        self.failures = failures or []
+        self.counters = counters or {}
+        self.started = time.monotonic()
+        self._resumed = processed
+
+    @property
+    def failed(self):
+        """Number of failed items."""
+        return len(self.failures)
+
+    @property
+    def elapsed(self):
+        """Seconds since the run started."""
+        return time.monotonic() - self.started
+
+    @property
+    def throughput(self):
+        """Processed items per second, resumed counters excluded."""
+        elapsed = self.elapsed
+        return (self.processed - self._resumed) / elapsed if elapsed else 0.0
+
+    def dump(self):
+        """Counters to be stored in a checkpoint."""
+        return {
+            "processed": self.processed,
+            "succeeded": self.succeeded,
+            "skipped": self.skipped,
+            "failures": self.failures,
+            "counters": self.counters,
+        }
+
+    def count(self, key, value=1):
+        """Increment a command specific counter."""
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def summary(self):
+        """One line summary."""
+        counters = "".join(f", {value} {key}" for key, value in self.counters.items())
+        return (
+            f"{self.processed} processed, {self.succeeded} succeeded, "
+            f"{self.skipped} skipped, {self.failed} failed{counters} "
+            f"in {self.elapsed:.1f}s ({self.throughput:.1f}/s)"
+        )
+
+
+class Checkpoint:
+    """JSON file recording how far a bulk run got."""
+
+    def __init__(self, path=None):
+        """Constructor."""
+        self.path = path
+
+    def load(self):
+        """Stored position and report, ``(None, BulkReport())`` if none."""
+        if not self.path or not os.path.exists(self.path):
+            return None, BulkReport()
+        with open(self.path) as fp:
+            data = json.load(fp)
+        return data.get("position"), BulkReport(**data.get("report", {}))
+
+    def save(self, position, report):
+        """Atomically store position and report."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump({"position": position, "report": report.dump()}, fp)
+        os.replace(tmp_path, self.path)
+
+
+class BulkRunner:
+    """Runs a remote call for every item in a bounded, rate limited pool.
+
+    Items are processed in batches. Remote calls run in worker threads, the
+    ``on_batch`` callback and checkpointing run in the calling thread after
+    each batch, so local database changes stay in the caller's context.
+    """
+
+    def __init__(self, func, workers=4, rate=None, batch_size=100, checkpoint=None):
+        """Constructor.
+
+        :param func: called with an item in a worker thread, returns ``False``
+            to count the item as skipped, raises to count it as failed.
+        :param rate: maximum calls per second over all workers.
+        """
+        self.func = func
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint or Checkpoint()
+
+    def _call(self, item):
+        self.limiter.acquire()
+        try:
+            return item, self.func(item), None
+        except Exception as e:
+            return item, None, e
+
+    def run(self, items, position, on_batch=None, describe=str, progress=None):
+        """Process items.
+
+        :param items: called with the resumed checkpoint position, or
+            ``None``, returns the remaining items ordered by ``position``.
+        :param position: returns the checkpoint position of an item.
+        :param on_batch: called with the succeeded ``(item, result)`` pairs
+            of each batch and the report.
+        :param describe: returns the label of an item used in failures.
+        :param progress: called with the report after each batch.
+        :returns: the :class:`BulkReport` including resumed counters.
+        """
+        resumed, report = self.checkpoint.load()
+        items = iter(items(resumed))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while True:
+                batch = list(islice(items, self.batch_size))
+                if not batch:
+                    break
+                succeeded = []
+                for item, result, error in executor.map(self._call, batch):
+                    report.processed += 1
+                    if error is not None:
+                        report.failures.append((describe(item), str(error)))
+                    elif result is False:
+                        report.skipped += 1
+                    else:
+                        report.succeeded += 1
+                        succeeded.append((item, result))
+                if on_batch is not None:
+                    on_batch(succeeded, report)
+                self.checkpoint.save(position(batch[-1]), report)
+                if progress is not None:
+                    progress(report)
+        return report
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Caches for serialized xMetaDiss fragments."""
+
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """Base class of serialized xMetaDiss caches.
+
+    Values are ``(fragment, build_seconds)`` tuples. The build time of a
+    fragment is added to ``saved_seconds`` every time it is served from the
+    cache.
+    """
+
+    def __init__(self, **kwargs):
+        """Constructor."""
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _get(self, key):
+        raise NotImplementedError()
+
+    def _set(self, key, value):
+        raise NotImplementedError()
+
+    def get(self, key):
+        """Return the cached fragment for key or ``None``."""
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        fragment, build_seconds = value
+        self.hits += 1
+        self.saved_seconds += build_seconds
+        return fragment
+
+    def set(self, key, fragment, build_seconds=0.0):
+        """Store a fragment and the time it took to build it."""
+        self._set(key, (fragment, build_seconds))
+
+    @property
+    def stats(self):
+        """Hit rate and saved serialization time."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+class LRUFragmentCache(FragmentCache):
+    """In-process cache bounded by number of entries and total bytes."""
+
+    def __init__(self, max_entries=10000, max_bytes=64 * 1024 * 1024, **kwargs):
+        """Constructor."""
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        fragment_size = len(value[0])
+        if fragment_size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[0])
+            self._entries[key] = value
+            self.size += fragment_size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted[0])
+
+    @property
+    def stats(self):
+        """Hit rate, saved serialization time and current size."""
+        stats = super().stats
+        stats.update(entries=len(self._entries), bytes=self.size)
+        return stats
+
+
+class InvenioFragmentCache(FragmentCache):
+    """Cache shared between processes through Invenio-Cache.
+
+    In deployments Invenio-Cache is backed by Redis, locally and in tests by
+    whatever ``CACHE_TYPE`` is configured.
+    """
+
+    key_prefix = "xmetadiss:"
+
+    def __init__(self, ttl=24 * 3600, **kwargs):
+        """Constructor."""
+        super().__init__(**kwargs)
+        self.ttl = ttl
+
+    def _get(self, key):
+        from invenio_cache import current_cache
+
+        return current_cache.get(self.key_prefix + key)
+
+    def _set(self, key, value):
+        from invenio_cache import current_cache
+
+        current_cache.set(self.key_prefix + key, value, timeout=self.ttl)
+
+
+def fragment_key(record, generation):
+    """Cache key of a search hit, ``None`` if it carries no revision.
+
+    The xMetaDiss fingerprint is preferred, so the cached fragment survives
+    revisions which did not change the xMetaDiss content.
+
+    :param generation: the builder generation of the record, see
+        :meth:`invenio_dnb_urn.oai.XMetaDissBuilder.generation`. Fragments
+        built before a deployment or a change of the config or vocabularies
+        are not served.
+    """
+    from .dumpers import FINGERPRINT_FIELD
+
+    source = record["_source"]
+    revision = (
+        source.get(FINGERPRINT_FIELD)
+        or record.get("_version")
+        or source.get("revision_id")
+        or source.get("updated")
+    )
+    if revision is None:
+        return None
+    return f"{source['id']}:{revision}:{generation[:16]}"
@@ -8,11 +8,18 @@
 
 """Command-line tools for demo module."""
 
-from flask_security.confirmable import confirm_user
-from flask_security.utils import hash_password
-from invenio_accounts.proxies import current_datastore
-from invenio_db import db
-from invenio_users_resources.services.users.tasks import reindex_user
+import json
+import os
+from collections import namedtuple
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .bulk import BulkRunner, Checkpoint
+
+# The commands are loaded by every ``invenio`` invocation, Invenio modules
+# are imported by the commands that need them.
 
 COMMUNITY_OWNER_EMAIL = "community@demo.org"
 USER_EMAIL = "user@demo.org"
@@ -20,6 +27,12 @@ HELP_MSG_USER = "User e-mail of an already existing user."
 
 
 def _get_or_create_user(email):
+    from flask_security.confirmable import confirm_user
+    from flask_security.utils import hash_password
+    from invenio_accounts.proxies import current_datastore
+    from invenio_db import db
+    from invenio_users_resources.services.users.tasks import reindex_user
+
     user = current_datastore.get_user(email)
     if not user:
         with db.session.begin_nested():
@@ -33,3 +46,664 @@ def _get_or_create_user(email):
         db.session.commit()
         reindex_user(user.id)
     return user
+
+
+class PublishedUrn(namedtuple("PublishedUrn", "id urn url status updated")):
+    """URN PID of a published record and its landing page URL."""
+
+
+def _published_urns(
+    statuses, after=None, page_size=1000, url_template=None, updated_after=None
+):
+    """Yield a :class:`PublishedUrn` for every URN of a published record.
+
+    Pages are fetched by PID id, so the caller may commit in between.
+
+    :param url_template: landing page URL format with the placeholders
+        ``{id}`` and ``{urn}``, the record page of ``SITE_UI_URL`` if not
+        given.
+    :param updated_after: only URN PIDs updated at or after this time.
+    """
+    from invenio_db import db
+    from invenio_pidstore.models import PersistentIdentifier, PIDStatus
+    from sqlalchemy.orm import aliased
+
+    recid = aliased(PersistentIdentifier)
+    if url_template is None:
+        url_template = current_app.config["SITE_UI_URL"] + "/records/{id}"
+    while True:
+        query = (
+            db.session.query(
+                PersistentIdentifier.id,
+                PersistentIdentifier.pid_value,
+                recid.pid_value,
+                PersistentIdentifier.status,
+                PersistentIdentifier.updated,
+            )
+            .join(recid, recid.object_uuid == PersistentIdentifier.object_uuid)
+            .filter(
+                PersistentIdentifier.pid_type == "urn",
+                PersistentIdentifier.status.in_(statuses),
+                recid.pid_type == "recid",
+                recid.status == PIDStatus.REGISTERED,
+            )
+        )
+        if after is not None:
+            query = query.filter(PersistentIdentifier.id > after)
+        if updated_after is not None:
+            query = query.filter(PersistentIdentifier.updated >= updated_after)
+        rows = query.order_by(PersistentIdentifier.id).limit(page_size).all()
+        if not rows:
+            return
+        for id_, urn, recid_value, status, updated in rows:
+            url = url_template.format(id=recid_value, urn=urn)
+            yield PublishedUrn(id_, urn, url, status, updated)
+        after = rows[-1][0]
+
+
+def _bulk_options(f):
+    """Options shared by the bulk DNB commands."""
+    f = click.option(
+        "--checkpoint",
+        type=click.Path(dir_okay=False),
+        help="File recording progress, an interrupted run resumes from it.",
+    )(f)
+    f = click.option("--batch-size", default=100, show_default=True)(f)
+    f = click.option(
+        "--rate",
+        default=5.0,
+        show_default=True,
+        help="Maximum DNB calls per second.",
+    )(f)
+    f = click.option("--workers", default=4, show_default=True)(f)
+    return f
+
+
+def _mark_registered(ids):
+    """Set the status of the given URN PIDs to REGISTERED and commit."""
+    from invenio_db import db
+    from invenio_pidstore.models import PersistentIdentifier, PIDStatus
+
+    if ids:
+        PersistentIdentifier.query.filter(PersistentIdentifier.id.in_(ids)).update(
+            {PersistentIdentifier.status: PIDStatus.REGISTERED},
+            synchronize_session=False,
+        )
+    db.session.commit()
+
+
+def _print_report(report):
+    """Print the final report of a bulk run."""
+    click.secho(report.summary(), fg="red" if report.failures else "green")
+    for item, error in report.failures:
+        click.secho(f"{item}: {error}", fg="red")
+
+
+@click.group()
+def dnb_urn():
+    """DNB URN and xMetaDiss commands."""
+
+
+@dnb_urn.command("reindex-xmetadiss")
+@with_appcontext
+def reindex_xmetadiss():
+    """Queue all published records for reindexing with precomputed xMetaDiss.
+
+    Adds the xMetaDiss mappings to the existing record index first, indices
+    created later get them from the search template. The queued records are
+    indexed by ``invenio index run`` or the periodic bulk indexing task.
+    """
+    from invenio_db import db
+    from invenio_rdm_records.proxies import current_rdm_records
+    from invenio_rdm_records.records.api import RDMRecord
+    from invenio_search import current_search_client
+    from invenio_search.utils import build_alias_name
+
+    from .dumpers import FINGERPRINT_MAPPINGS, FRAGMENT_MAPPINGS
+
+    index = build_alias_name(RDMRecord.index.search_alias)
+    current_search_client.indices.put_mapping(
+        index=index,
+        body={"properties": {**FRAGMENT_MAPPINGS, **FINGERPRINT_MAPPINGS}},
+    )
+    click.secho(f"xMetaDiss mappings ensured on {index}.", fg="green")
+
+    model_cls = RDMRecord.model_cls
+    records = (
+        db.session.query(model_cls.id)
+        .filter(model_cls.is_deleted == False)  # noqa: E712
+        .yield_per(1000)
+    )
+    current_rdm_records.records_service.indexer.bulk_index((rec.id for rec in records))
+    click.secho("Published records queued for reindexing.", fg="green")
+
+
+@dnb_urn.command("fetch-xmetadiss-schemas")
+@click.option(
+    "--directory",
+    type=click.Path(file_okay=False),
+    help="Schema mirror, XMETADISS_SCHEMA_DIR if not given.",
+)
+@with_appcontext
+def fetch_xmetadiss_schemas(directory):
+    """Mirror the xMetaDissPlus schema and its imports for validation."""
+    from .validation import fetch_schemas, schema_directory
+
+    directory = directory or schema_directory(current_app)
+    for url in fetch_schemas(directory):
+        click.echo(url)
+    click.secho(f"Schemas mirrored to {directory}.", fg="green")
+
+
+@dnb_urn.command("validate-xmetadiss")
+@click.option(
+    "--processes",
+    default=os.cpu_count(),
+    show_default=True,
+    help="Validating processes, 0 validates in this process.",
+)
+@click.option("--batch-size", default=500, show_default=True)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="JSON file the report is written to.",
+)
+@with_appcontext
+def validate_xmetadiss(processes, batch_size, output):
+    """Validate the xMetaDiss of all records in the OAI-PMH index.
+
+    Errors are reported grouped by the violated schema rule.
+    """
+    from itertools import islice
+
+    from invenio_oaiserver.proxies import current_oaiserver
+    from lxml import etree
+
+    from .parallel import SerializerPool
+    from .validation import (
+        ValidationReport,
+        load_schema,
+        schema_directory,
+        validate_source,
+    )
+
+    directory = schema_directory(current_app)
+    try:
+        load_schema(directory)
+    except (OSError, etree.Error) as e:
+        raise click.ClickException(str(e)) from e
+    ext = current_app.extensions["invenio_dnb_urn"]
+    builder = ext.xmetadiss_builder
+    search = current_oaiserver.search_cls(
+        index=current_app.config["OAISERVER_RECORD_INDEX"]
+    )
+    sources = (hit.to_dict() for hit in search.scan())
+    pool = SerializerPool(processes) if processes else None
+    report = ValidationReport()
+    try:
+        while True:
+            batch = list(islice(sources, batch_size))
+            if not batch:
+                break
+            if pool is None:
+                results = (
+                    validate_source(builder, ext.xmetadiss_validator, s) for s in batch
+                )
+            else:
+                results = pool.validate(builder, batch, directory)
+            for record_id, errors in results:
+                report.add(record_id, errors)
+            click.echo(report.summary(), err=True)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    for rule, entry in report.by_count():
+        click.secho(f"{entry['count']:>8}  {rule}", fg="red")
+        click.echo(f"          {entry['message']}")
+        click.echo(f"          e.g. {', '.join(map(str, entry['records']))}")
+    if output:
+        with open(output, "w") as fp:
+            json.dump(report.dump(), fp, indent=2)
+    click.secho(report.summary(), fg="red" if report.invalid else "green")
+
+
+@dnb_urn.command("register-missing")
+@_bulk_options
+@with_appcontext
+def register_missing(workers, rate, batch_size, checkpoint):
+    """Register the URNs of published records which were never registered.
+
+    Streams ``urn`` PIDs in NEW or RESERVED state and creates them at DNB.
+    """
+    from invenio_pidstore.models import PIDStatus
+
+    from .provider import get_dnb_urn_provider
+
+    provider = get_dnb_urn_provider()
+    api = provider.client.api
+
+    def create(item):
+        api.create_urn(url=item.url, urn=item.urn)
+
+    def mark_registered(succeeded, report):
+        for item, _ in succeeded:
+            provider.url_pushed(item.urn, item.url)
+        _mark_registered([item[0] for item, _ in succeeded])
+
+    runner = BulkRunner(
+        create,
+        workers=workers,
+        rate=rate,
+        batch_size=batch_size,
+        checkpoint=Checkpoint(checkpoint),
+    )
+    report = runner.run(
+        lambda after: _published_urns([PIDStatus.NEW, PIDStatus.RESERVED], after=after),
+        position=lambda item: item[0],
+        on_batch=mark_registered,
+        describe=lambda item: item[1],
+        progress=lambda report: click.echo(report.summary()),
+    )
+    _print_report(report)
+
+
+@dnb_urn.command("reconcile")
+@_bulk_options
+@click.option(
+    "--repair",
+    is_flag=True,
+    help="Register missing URNs, update stale URLs and mark unknown URNs "
+    "as registered.",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="JSON lines file the differences are appended to.",
+)
+@with_appcontext
+def reconcile(workers, rate, batch_size, checkpoint, repair, output):
+    """Compare the URNs of published records with the DNB registry.
+
+    Reports URNs missing at DNB, URNs registered with a stale landing page
+    URL and URNs registered at DNB whose local PID is not marked as
+    registered ("unknown"). Only local URNs are checked, DNB cannot list
+    its URNs, so URNs registered at DNB without a local PID are not found.
+    """
+    from invenio_pidstore.models import PIDStatus
+
+    from . import reconcile as reconciliation
+    from .provider import get_dnb_urn_provider
+
+    provider = get_dnb_urn_provider()
+    api = provider.client.api
+
+    def check(item):
+        difference, remote_url = reconciliation.compare(
+            api, item.urn, item.url, item.status == PIDStatus.REGISTERED
+        )
+        if difference is None:
+            return False
+        if repair:
+            reconciliation.repair(api, difference, item.urn, item.url, remote_url)
+        return difference, remote_url
+
+    def record(succeeded, report):
+        if output and succeeded:
+            with open(output, "a") as fp:
+                for item, (difference, remote_url) in succeeded:
+                    fp.write(
+                        json.dumps(
+                            {
+                                "urn": item.urn,
+                                "difference": difference,
+                                "url": item.url,
+                                "remote_url": remote_url,
+                                "repaired": repair,
+                            }
+                        )
+                        + "\n"
+                    )
+        for _, (difference, _) in succeeded:
+            report.count(difference)
+        if repair:
+            for item, _ in succeeded:
+                provider.url_pushed(item.urn, item.url)
+            _mark_registered(
+                [item[0] for item, _ in succeeded if item[3] != PIDStatus.REGISTERED]
+            )
+
+    runner = BulkRunner(
+        check,
+        workers=workers,
+        rate=rate,
+        batch_size=batch_size,
+        checkpoint=Checkpoint(checkpoint),
+    )
+    report = runner.run(
+        lambda after: _published_urns(
+            [PIDStatus.NEW, PIDStatus.RESERVED, PIDStatus.REGISTERED], after=after
+        ),
+        position=lambda item: item[0],
+        on_batch=record,
+        describe=lambda item: item[1],
+        progress=lambda report: click.echo(report.summary()),
+    )
+    _print_report(report)
+
+
+@dnb_urn.command("migrate-urls")
+@_bulk_options
+@click.option(
+    "--url-template",
+    help="New landing page URL with the placeholders {id} and {urn}, "
+    "e.g. https://repository.example.org/records/{id}. Defaults to the "
+    "record page of SITE_UI_URL.",
+)
+@click.option("--dry-run", is_flag=True, help="Only report the URLs to change.")
+@with_appcontext
+def migrate_urls(workers, rate, batch_size, checkpoint, url_template, dry_run):
+    """Point the registered URNs of published records to new URLs.
+
+    URNs already registered with the new URL at DNB are skipped. With
+    ``URN_DNB_SKIP_UNCHANGED_URLS`` the URL last sent for a URN is taken
+    from the database, DNB is only asked for URNs without a recorded URL.
+    """
+    from itertools import islice
+
+    from invenio_pidstore.models import PIDStatus
+
+    from .models import DnbUrnPushedUrl
+    from .provider import get_dnb_urn_provider
+
+    if url_template is not None:
+        try:
+            url_template.format(id="", urn="")
+        except (IndexError, KeyError) as e:
+            raise click.BadParameter(f"Unknown placeholder {e}.") from e
+    provider = get_dnb_urn_provider()
+    api = provider.client.api
+    # Hashes of the URLs last sent, looked up in the main thread by batch
+    # and taken by the workers.
+    pushed = {}
+
+    def urns(after):
+        items = _published_urns(
+            [PIDStatus.REGISTERED], after=after, url_template=url_template
+        )
+        if not provider.client.cfg("skip_unchanged_urls"):
+            yield from items
+            return
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                return
+            pushed.update(DnbUrnPushedUrl.hashes([item.urn for item in batch]))
+            yield from batch
+
+    def migrate(item):
+        url_hash = pushed.pop(item.urn, None)
+        if url_hash is None:
+            unchanged = api.get_urn(item.urn) == item.url
+        else:
+            unchanged = url_hash == DnbUrnPushedUrl.hash(item.url)
+        if unchanged:
+            return False
+        if not dry_run:
+            api.modify_urn(url=item.url, urn=item.urn)
+        return item.url
+
+    def echo_changes(succeeded, report):
+        if dry_run:
+            for item, url in succeeded:
+                click.echo(f"{item[1]} -> {url}")
+            return
+        from invenio_db import db
+
+        for item, url in succeeded:
+            provider.url_pushed(item.urn, url)
+        db.session.commit()
+
+    # A dry run must not make the real run skip URNs.
+    runner = BulkRunner(
+        migrate,
+        workers=workers,
+        rate=rate,
+        batch_size=batch_size,
+        checkpoint=Checkpoint(None if dry_run else checkpoint),
+    )
+    report = runner.run(
+        urns,
+        position=lambda item: item[0],
+        on_batch=echo_changes,
+        describe=lambda item: item[1],
+        progress=lambda report: click.echo(report.summary(), err=True),
+    )
+    _print_report(report)
+
+
+@dnb_urn.command("export-xmetadiss")
+@click.argument("directory", type=click.Path(file_okay=False, writable=True))
+@click.option(
+    "--since",
+    help="Only export records changed at or after this date or time, e.g. "
+    "the started time of the manifest of the previous export.",
+)
+@click.option(
+    "--processes",
+    default=os.cpu_count(),
+    show_default=True,
+    help="Serializing processes, 0 serializes in this process.",
+)
+@click.option("--batch-size", default=500, show_default=True)
+@click.option("--shard-size", default=10000, show_default=True)
+@with_appcontext
+def export_xmetadiss(directory, since, processes, batch_size, shard_size):
+    """Export the xMetaDiss of all records in the OAI-PMH index.
+
+    Records are written to gzip-compressed shards of at most the shard size
+    records each, listed with their checksums in manifest.json. Records
+    precomputed at index time or cached are not serialized again.
+    """
+    from datetime import datetime
+    from itertools import islice
+
+    from invenio_oaiserver.proxies import current_oaiserver
+
+    from .export import ShardWriter, write_manifest
+    from .oai import xmetadiss_fragments
+    from .parallel import SerializerPool
+    from .streaming import datestamp_key, source_includes
+
+    if os.path.isdir(directory) and os.listdir(directory):
+        raise click.BadParameter(f"{directory} is not empty.")
+    os.makedirs(directory, exist_ok=True)
+    config = current_app.config
+    started = datetime.utcnow()
+    key = datestamp_key(current_app)
+    last_update_key = current_oaiserver.last_update_key
+
+    search = current_oaiserver.search_cls(
+        index=config["OAISERVER_RECORD_INDEX"]
+    ).params(size=batch_size)
+    if config["XMETADISS_SOURCE_FILTERING"]:
+        search = search.source(includes=source_includes(current_app))
+    if since:
+        search = search.filter("range", **{key: {"gte": since}})
+    records = ({"_id": hit.meta.id, "_source": hit.to_dict()} for hit in search.scan())
+
+    pool = SerializerPool(processes) if processes else None
+    total = 0
+    try:
+        with ShardWriter(directory, shard_size=shard_size) as writer:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                fragments = xmetadiss_fragments(batch, pool=pool)
+                for record, fragment in zip(batch, fragments):
+                    source = record["_source"]
+                    pid = current_oaiserver.oaiid_fetcher(record["_id"], source)
+                    datestamp = source.get(key) or source[last_update_key]
+                    writer.write(pid.pid_value, datestamp, fragment)
+                total += len(batch)
+                click.echo(f"{total} records exported", err=True)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    path = write_manifest(
+        directory,
+        started=started.isoformat(),
+        since=since,
+        metadata_prefix=config["XMETADISS_METADATA_PREFIX"],
+        records=total,
+        shards=writer.shards,
+    )
+    click.secho(
+        f"{total} records exported to {len(writer.shards)} shards, see {path}.",
+        fg="green",
+    )
+
+
+@dnb_urn.command("export-epicur")
+@click.argument("directory", type=click.Path(file_okay=False, writable=True))
+@click.option(
+    "--chunk-size",
+    type=int,
+    help="Records per file, EPICUR_CHUNK_SIZE if not given.",
+)
+@click.option(
+    "--watermark",
+    type=click.Path(dir_okay=False),
+    help="File storing the start time of the last complete export.",
+)
+@click.option(
+    "--delta",
+    is_flag=True,
+    help="Only export URNs changed since the time stored in the watermark.",
+)
+@with_appcontext
+def export_epicur(directory, chunk_size, watermark, delta):
+    """Write the URNs of published records to Epicur bulk delivery files.
+
+    Registered URNs are written with update status url_update_general, URNs
+    not registered yet with urn_new, into separate gzip-compressed files of
+    at most the chunk size records each. The watermark is updated after a
+    complete export, URNs changed while an export runs are exported again
+    by the next delta.
+    """
+    from datetime import datetime
+
+    from invenio_pidstore.models import PIDStatus
+
+    from .epicur import URL_UPDATE, URN_NEW, EpicurWriter, Watermark
+
+    if delta and not watermark:
+        raise click.BadParameter("--delta requires --watermark.")
+    config = current_app.config
+    chunk_size = chunk_size or config["EPICUR_CHUNK_SIZE"]
+    os.makedirs(directory, exist_ok=True)
+    mark = Watermark(watermark)
+    since = mark.load() if delta else None
+    started = datetime.utcnow()
+    if delta and since is None:
+        click.echo("No watermark stored, exporting all URNs.", err=True)
+
+    def writer(update_status):
+        return EpicurWriter(
+            directory,
+            update_status=update_status,
+            chunk_size=chunk_size,
+            scheme=config["EPICUR_NBN_SCHEME"],
+        )
+
+    with writer(URL_UPDATE) as registered, writer(URN_NEW) as new:
+        for item in _published_urns(
+            [PIDStatus.NEW, PIDStatus.RESERVED, PIDStatus.REGISTERED],
+            updated_after=since,
+        ):
+            if item.status == PIDStatus.REGISTERED:
+                registered.write(item.urn, item.url)
+            else:
+                new.write(item.urn, item.url)
+    mark.save(started)
+    for path, count in registered.files + new.files:
+        click.echo(f"{path}: {count} URNs")
+    click.secho(
+        f"{sum(count for _, count in registered.files)} registered and "
+        f"{sum(count for _, count in new.files)} new URNs exported.",
+        fg="green",
+    )
+
+
+@dnb_urn.command("standin")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8089, show_default=True)
+@click.option("--latency", default=0.0, help="Mean latency in seconds.")
+@click.option("--error-rate", default=0.0, help="Share of 503 responses.")
+@click.option("--rate-limit", type=float, help="Requests per second before 429.")
+@click.option("--verbose", is_flag=True)
+def standin(host, port, latency, error_rate, rate_limit, verbose):
+    """Serve a local stand-in for the DNB URN service API.
+
+    Point the provider to it with URN_DNB_TEST_MODE = False and
+    URN_DNB_URL = "http://<host>:<port>/".
+    """
+    from .standin import StandinServer
+
+    server = StandinServer(
+        (host, port),
+        latency=latency,
+        error_rate=error_rate,
+        rate_limit=rate_limit,
+        verbose=verbose,
+    )
+    click.secho(f"DNB URN service stand-in on {server.url}", fg="green")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    click.echo(server.counters)
+
+
+@dnb_urn.command("loadtest")
+@click.option(
+    "--operation",
+    type=click.Choice(["register", "update", "validate"]),
+    default="register",
+    show_default=True,
+)
+@click.option("--count", default=1000, show_default=True)
+@click.option("--rate", type=float, help="Target calls per second.")
+@click.option("--workers", default=8, show_default=True)
+@with_appcontext
+def loadtest(operation, count, rate, workers):
+    """Load test the DNB URN provider, e.g. against the stand-in."""
+    from .loadtest import LoadTest
+    from .provider import get_dnb_urn_provider
+
+    provider = get_dnb_urn_provider()
+    client = provider.client
+    report = LoadTest(provider, operation, rate=rate, workers=workers).run(count)
+    click.echo(report.summary())
+    click.echo(f"session: {client.session_stats}")
+    click.echo(f"resilience: {client.resilience_stats}")
+
+
+@dnb_urn.command("retry-outbox")
+@with_appcontext
+def retry_outbox():
+    """Retry outbox jobs which exceeded their maximum number of attempts."""
+    from invenio_db import db
+
+    from .models import DnbUrnJob
+    from .tasks import process_outbox
+
+    count = DnbUrnJob.query.filter(DnbUrnJob.failed.is_(True)).update(
+        {DnbUrnJob.failed: False, DnbUrnJob.attempts: 0},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    process_outbox.delay()
+    click.secho(f"{count} failed jobs queued again.", fg="green")
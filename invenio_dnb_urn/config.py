@@ -9,6 +9,9 @@
 
 EPICUR_NBN_SCHEME = "urn:nbn:de"
 
+EPICUR_CHUNK_SIZE = 10000
+"""Maximum number of URNs per Epicur bulk delivery file."""
+
 """URN-PIDStore configuration used by the DnbUrnProvider."""
 URN_DNB_ENABLED = False
 """Flag to enable/disable URN registration to DNB."""
@@ -28,5 +31,164 @@ URN_DNB_TEST_MODE = True
 URN_DNB_FORMAT = "{prefix}-{id}"
 """A string used for formatting the URN."""
 
+URN_DNB_CHECK_DIGIT = False
+"""Append the DNB check digit to generated URNs.
+
+Only applies to newly minted URNs, existing URNs are not required to end
+with a check digit.
+"""
+
+URN_DNB_URL = None
+"""DNB URN service API URL, the production API if not set."""
+
+URN_DNB_POOL_SIZE = 10
+"""Maximum number of kept-alive connections to DNB per process."""
+
+URN_DNB_KEEP_ALIVE = True
+"""Reuse connections to DNB between requests."""
+
+URN_DNB_CONNECT_TIMEOUT = 5
+"""Seconds to wait for a connection to DNB."""
+
+URN_DNB_READ_TIMEOUT = 30
+"""Seconds to wait for a DNB response."""
+
+URN_DNB_RETRIES = 3
+"""Retries of DNB calls failing with connection errors, timeouts or 5XX."""
+
+URN_DNB_RETRY_BACKOFF = 0.5
+"""Base of the jittered exponential backoff between retries in seconds."""
+
+URN_DNB_RETRY_MAX_BACKOFF = 8.0
+"""Maximum backoff between retries in seconds."""
+
+URN_DNB_BREAKER_THRESHOLD = 5
+"""Consecutive failed DNB calls after which calls fail fast."""
+
+URN_DNB_BREAKER_RESET_TIMEOUT = 60.0
+"""Seconds before a trial call is sent to DNB again."""
+
+URN_DNB_SKIP_UNCHANGED_URLS = False
+"""Only send URL updates to DNB when the URL differs from the last one sent."""
+
+URN_DNB_METRICS_ENABLED = False
+"""Collect timers and counters and serve them at ``/dnb-urn/metrics``.
+
+Metrics are kept per process and labelled with the process id.
+"""
+
+URN_DNB_METRICS_TOKEN = None
+"""Bearer token of metrics scrapers, otherwise superuser access is required."""
+
+URN_DNB_PROFILE_SAMPLE_RATE = 0.0
+"""Share of OAI-PMH requests profiled with cProfile, e.g. ``0.01``."""
+
+URN_DNB_PROFILE_DIR = None
+"""Directory sampled profiles are written to, logged if not set."""
+
+URN_DNB_OUTBOX = False
+"""Queue DNB registrations and URL updates instead of sending them on publish."""
+
+URN_DNB_OUTBOX_BATCH_SIZE = 100
+"""Number of outbox jobs sent per task run."""
+
+URN_DNB_OUTBOX_MAX_ATTEMPTS = 10
+"""Attempts after which an outbox job is marked as failed."""
+
+URN_DNB_OUTBOX_RETRY_DELAY = 60
+"""Seconds before the first retry of an outbox job, doubled on every attempt."""
+
+URN_DNB_OUTBOX_LEASE = 300
+"""Seconds a claimed outbox job is not due for other workers while it is sent."""
+
 XMETADISS_TYPE_DINI_PUBLTYPE = "openaire_type"
 XMETADISS_TYPE_DCTERMS_DCMITYPE = "openaire_type"
+
+XMETADISS_VOCABULARY_CACHE_SIZE = 1024
+"""Maximum number of vocabulary props entries kept per process."""
+
+XMETADISS_VOCABULARY_CACHE_TTL = 3600
+"""Seconds a cached vocabulary props entry stays valid.
+
+Vocabulary writes only invalidate the cache of the process handling them,
+other processes see the change after at most this many seconds.
+"""
+
+XMETADISS_METADATA_PREFIX = "xMetaDiss"
+"""OAI-PMH metadataPrefix under which xMetaDissPlus is configured."""
+
+XMETADISS_STREAMING_ENABLED = False
+"""Stream ListRecords responses for the xMetaDiss prefix record by record.
+
+GetRecord and ListIdentifiers of the prefix then use the same datestamps.
+"""
+
+XMETADISS_SOURCE_FILTERING = False
+"""Only fetch the search document fields needed for xMetaDiss responses."""
+
+XMETADISS_SOURCE_INCLUDES = ["_oai", "parent.communities"]
+"""Fields fetched in addition to the ones xMetaDiss is built from, e.g. the
+fields the queries of OAI sets refer to."""
+
+XMETADISS_CACHE_BACKEND = None
+"""Cache for serialized xMetaDiss, e.g.
+``"invenio_dnb_urn.cache:LRUFragmentCache"`` (per process) or
+``"invenio_dnb_urn.cache:InvenioFragmentCache"`` (shared via Invenio-Cache).
+``None`` disables caching."""
+
+XMETADISS_CACHE_MAX_ENTRIES = 10000
+"""Maximum number of fragments kept by the in-process cache."""
+
+XMETADISS_CACHE_MAX_BYTES = 64 * 1024 * 1024
+"""Maximum total size of fragments kept by the in-process cache."""
+
+XMETADISS_CACHE_TTL = 24 * 3600
+"""Seconds a fragment is kept by the Invenio-Cache backend."""
+
+XMETADISS_INDEX_FRAGMENTS = False
+"""Precompute xMetaDiss when published records are indexed."""
+
+XMETADISS_FINGERPRINT_ENABLED = False
+"""Date streamed xMetaDiss records by the last change of their xMetaDiss content.
+
+Requires the ``dnb_urn_xmetadiss_datestamp`` table, see ``invenio alembic upgrade``.
+"""
+
+XMETADISS_FINGERPRINT_FIELDS = [
+    "id",
+    "pids",
+    "metadata",
+    "custom_fields",
+    "access.files",
+]
+"""Search document fields xMetaDissPlus is built from."""
+
+XMETADISS_THESIS_TYPES_FILE = None
+"""Thesis type vocabulary, ``<instance path>/app_data/vocabularies/thesis_types.yaml``
+if not set."""
+
+XMETADISS_THESIS_TYPES_CHECK_INTERVAL = 30
+"""Seconds between checks of the thesis type vocabulary file for changes."""
+
+XMETADISS_THESIS_PUBLTYPE = False
+"""Use the ``dini_publtype`` prop of the thesis level as ``dini:publType``.
+
+Changes the ``dc:type`` of theses, the ``thesis_types.yaml`` of the instance needs
+the ``dini_publtype`` props first, see the README.
+"""
+
+XMETADISS_SCHEMA_DIR = None
+"""Local mirror of the xMetaDissPlus schemas, ``<instance path>/xmetadiss-schemas``
+if not set."""
+
+XMETADISS_VALIDATION_SAMPLE_RATE = 0.0
+"""Share of built xMetaDiss validated against the schemas, 0 disables validation."""
+
+XMETADISS_SERIALIZER_PROCESSES = 0
+"""Size of the process pool serializing streamed ListRecords pages, 0 disables it."""
+
+XMETADISS_SERIALIZER_MIN_PAGE_SIZE = 50
+"""Pages with fewer records are serialized in the request process."""
+
+XMETADISS_EXPORT_MAX_AGE = 3600
+"""Seconds clients and CDNs may cache the xMetaDiss export of a record."""
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""xMetaDiss fields of the search documents of published records."""
+
+import copy
+import hashlib
+import json
+from datetime import timezone
+from functools import lru_cache
+
+from flask import current_app
+
+FRAGMENT_FIELD = "_xmetadiss"
+"""Search document field holding the precomputed xMetaDiss."""
+
+GENERATION_FIELD = "_xmetadiss_generation"
+"""Search document field holding the builder generation of the fragment."""
+
+FRAGMENT_MAPPINGS = {
+    FRAGMENT_FIELD: {"type": "object", "enabled": False},
+    GENERATION_FIELD: {"type": "keyword", "index": False},
+}
+"""Mappings of the fragment and generation fields, stored but not indexed."""
+
+FINGERPRINT_FIELD = "_xmetadiss_fingerprint"
+"""Search document field holding the fingerprint of the xMetaDiss content."""
+
+DATESTAMP_FIELD = "_xmetadiss_datestamp"
+"""Search document field holding the time the xMetaDiss content changed."""
+
+FINGERPRINT_MAPPINGS = {
+    FINGERPRINT_FIELD: {"type": "keyword", "index": False},
+    DATESTAMP_FIELD: {"type": "date"},
+}
+"""Mappings of the fingerprint and datestamp fields.
+
+The fields are added to new record indices by the ``search_templates``.
+"""
+
+
+def _subset(data, path):
+    """Value at a dotted path of a search document, ``None`` if missing."""
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def fingerprint(data, fields):
+    """Stable hash of the given dotted paths of a search document."""
+    subset = {path: _subset(data, path) for path in fields}
+    serialized = json.dumps(
+        subset, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def fingerprint_dumper(record_cls):
+    """Search dumper of a record class without the statistics extension.
+
+    Dumps the same fields as the search documents, except the statistics
+    which are queried from Invenio-Stats. Releases of Invenio-RDM-Records
+    without statistics use the dumper of the record class.
+    """
+    from invenio_records.dumpers import SearchDumper
+
+    dumper = record_cls.dumper
+    try:
+        from invenio_rdm_records.records.dumpers import StatisticsDumperExt
+    except ImportError:
+        return dumper
+    return SearchDumper(
+        extensions=[
+            ext
+            for ext in dumper._extensions
+            if not isinstance(ext, StatisticsDumperExt)
+        ],
+        model_fields=dumper._model_fields,
+    )
+
+
+def record_fingerprint(record):
+    """Fingerprint of a record, in the shape of its search document.
+
+    A copy is dumped, as dereferencing the relations changes the record.
+    """
+    record_copy = type(record)(copy.deepcopy(dict(record)), model=record.model)
+    return fingerprint(
+        record_copy.dumps(dumper=fingerprint_dumper(type(record))),
+        current_app.config["XMETADISS_FINGERPRINT_FIELDS"],
+    )
+
+
+def _is_published(record):
+    from invenio_rdm_records.records.api import RDMRecord
+
+    return isinstance(record, RDMRecord)
+
+
+def update_fingerprint(sender, record=None, **kwargs):
+    """Store the fingerprint of a published record when it is written.
+
+    Receiver of ``after_record_insert`` and ``after_record_update``, runs in
+    the transaction writing the record.
+    """
+    if not current_app.config["XMETADISS_FINGERPRINT_ENABLED"]:
+        return
+    if not _is_published(record):
+        return
+    from .models import XMetaDissDatestamp
+
+    XMetaDissDatestamp.update(record.id, record_fingerprint(record))
+
+
+def index_xmetadiss(sender, json=None, record=None, **kwargs):
+    """Add the xMetaDiss fields to the search document of a published record.
+
+    Receiver of ``invenio_indexer.signals.before_record_index``.
+    """
+    from lxml import etree
+
+    if json is None or not _is_published(record):
+        return
+    json.pop(FRAGMENT_FIELD, None)
+    json.pop(GENERATION_FIELD, None)
+    json.pop(FINGERPRINT_FIELD, None)
+    json.pop(DATESTAMP_FIELD, None)
+    if current_app.config["XMETADISS_FINGERPRINT_ENABLED"]:
+        dump_fingerprint(record, json)
+    if not current_app.config["XMETADISS_INDEX_FRAGMENTS"]:
+        return
+    builder = current_app.extensions["invenio_dnb_urn"].xmetadiss_builder
+    try:
+        json[FRAGMENT_FIELD] = etree.tostring(builder.build(json), encoding="unicode")
+        json[GENERATION_FIELD] = builder.generation(json)
+    except Exception:
+        # Incomplete records are serialized on the OAI path instead,
+        # indexing must not fail because of them.
+        current_app.logger.warning(
+            f"Could not precompute xMetaDiss for record {json.get('id')}",
+            exc_info=True,
+        )
+
+
+def dump_fingerprint(record, data):
+    """Dump the fingerprint and the xMetaDiss datestamp.
+
+    The datestamp is the time the stored fingerprint last changed, or the
+    record's ``updated`` if the record was not written since fingerprints
+    were enabled. The fingerprint is taken from the search document, which
+    has the shape of :func:`record_fingerprint`'s dump.
+    """
+    from .models import XMetaDissDatestamp
+
+    data[FINGERPRINT_FIELD] = fingerprint(
+        data, current_app.config["XMETADISS_FINGERPRINT_FIELDS"]
+    )
+    data[DATESTAMP_FIELD] = data.get("updated")
+    stored = XMetaDissDatestamp.query.get(record.id)
+    if stored is not None and stored.fingerprint == data[FINGERPRINT_FIELD]:
+        data[DATESTAMP_FIELD] = stored.datestamp.replace(
+            tzinfo=timezone.utc
+        ).isoformat()
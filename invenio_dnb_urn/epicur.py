@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Epicur bulk delivery files of URN/URL pairs."""
+
+import gzip
+import json
+import os
+from contextlib import ExitStack
+from datetime import datetime
+
+from lxml import etree
+
+NS_EPICUR = "urn:nbn:de:1111-2004033116"
+NS_XSI = "http://www.w3.org/2001/XMLSchema-instance"
+SCHEMA_LOCATION = (
+    f"{NS_EPICUR} http://www.persistent-identifier.de/xepicur/version1.0/xepicur.xsd"
+)
+
+URN_NEW = "urn_new"
+"""Update status of URNs not yet registered at DNB."""
+
+URL_UPDATE = "url_update_general"
+"""Update status replacing the URLs of registered URNs."""
+
+
+def _tag(name):
+    return etree.QName(NS_EPICUR, name)
+
+
+class EpicurWriter:
+    """Streams URN/URL pairs into numbered, gzip-compressed Epicur files.
+
+    Records are written as they come, a new file is started every
+    ``chunk_size`` records. Files are written under a temporary name and
+    renamed when complete, so an aborted run leaves no truncated files.
+    """
+
+    def __init__(
+        self,
+        directory,
+        update_status=URL_UPDATE,
+        chunk_size=10000,
+        scheme="urn:nbn:de",
+        prefix="epicur",
+    ):
+        """Constructor."""
+        self.directory = directory
+        self.update_status = update_status
+        self.chunk_size = chunk_size
+        self.scheme = scheme
+        self.prefix = prefix
+        self.files = []
+        self._stack = None
+        self._xf = None
+        self._count = 0
+
+    def _path(self, number):
+        return os.path.join(
+            self.directory, f"{self.prefix}-{self.update_status}-{number:05d}.xml.gz"
+        )
+
+    def _open(self):
+        path = self._path(len(self.files) + 1)
+        self._stack = ExitStack()
+        fp = self._stack.enter_context(gzip.open(f"{path}.part", "wb"))
+        self._xf = self._stack.enter_context(etree.xmlfile(fp, encoding="UTF-8"))
+        self._xf.write_declaration()
+        self._stack.enter_context(
+            self._xf.element(
+                _tag("epicur"),
+                {etree.QName(NS_XSI, "schemaLocation"): SCHEMA_LOCATION},
+                nsmap={None: NS_EPICUR, "xsi": NS_XSI},
+            )
+        )
+        xf = self._xf
+        with xf.element(_tag("administrative_data")), xf.element(_tag("delivery")):
+            with xf.element(_tag("update_status"), type=self.update_status):
+                pass
+        self._count = 0
+
+    def _close(self):
+        self._stack.close()
+        path = self._path(len(self.files) + 1)
+        os.replace(f"{path}.part", path)
+        self.files.append((path, self._count))
+        self._stack = self._xf = None
+        self._count = 0
+
+    def write(self, urn, url):
+        """Write the record of an URN and its landing page URL."""
+        if self._xf is None:
+            self._open()
+        # Nested element contexts inherit the namespace declaration of the
+        # root, written elements would repeat it in every record.
+        xf = self._xf
+        with xf.element(_tag("record")):
+            with xf.element(_tag("identifier"), scheme=self.scheme):
+                xf.write(urn)
+            with xf.element(_tag("resource")):
+                with xf.element(
+                    _tag("identifier"),
+                    scheme="url",
+                    type="frontpage",
+                    role="primary",
+                    origin="original",
+                ):
+                    xf.write(url)
+                with xf.element(_tag("format"), scheme="imt"):
+                    xf.write("text/html")
+        self._count += 1
+        if self._count >= self.chunk_size:
+            self._close()
+
+    def close(self):
+        """Complete the open file, returns the ``(path, records)`` written."""
+        if self._xf is not None:
+            self._close()
+        return self.files
+
+    def abort(self):
+        """Discard the open file."""
+        if self._stack is not None:
+            path = self._path(len(self.files) + 1)
+            try:
+                self._stack.close()
+            finally:
+                self._stack = self._xf = None
+                if os.path.exists(f"{path}.part"):
+                    os.remove(f"{path}.part")
+
+    def __enter__(self):
+        """Enter the writer context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Complete the open file, or discard it on errors."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class Watermark:
+    """JSON file storing the start time of the last complete export.
+
+    Times are naive UTC like the ``updated`` column of PIDStore.
+    """
+
+    def __init__(self, path=None):
+        """Constructor."""
+        self.path = path
+
+    def load(self):
+        """Stored time, ``None`` if there is none."""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        with open(self.path) as fp:
+            return datetime.fromisoformat(json.load(fp)["since"])
+
+    def save(self, since):
+        """Atomically store the time."""
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump({"since": since.isoformat()}, fp)
+        os.replace(tmp_path, self.path)
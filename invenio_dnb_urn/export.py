@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Sharded bulk export of xMetaDiss."""
+
+import gzip
+import hashlib
+import json
+import os
+from contextlib import ExitStack
+
+from lxml import etree
+
+MANIFEST = "manifest.json"
+"""File name of the export manifest."""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ShardWriter:
+    """Writes serialized xMetaDiss into numbered, gzip-compressed shards.
+
+    Every shard is a ``records`` document of at most ``shard_size``
+    ``record`` elements, each with the OAI identifier and datestamp of the
+    record and its xMetaDiss. Shards are written under a temporary name and
+    renamed when complete.
+    """
+
+    def __init__(self, directory, shard_size=10000, prefix="xmetadiss"):
+        """Constructor."""
+        self.directory = directory
+        self.shard_size = shard_size
+        self.prefix = prefix
+        self.shards = []
+        self._stack = None
+        self._fp = None
+        self._xf = None
+        self._count = 0
+
+    def _path(self, number):
+        return os.path.join(self.directory, f"{self.prefix}-{number:05d}.xml.gz")
+
+    def _open(self):
+        path = self._path(len(self.shards) + 1)
+        self._stack = ExitStack()
+        self._fp = self._stack.enter_context(gzip.open(f"{path}.part", "wb"))
+        self._xf = self._stack.enter_context(etree.xmlfile(self._fp, encoding="UTF-8"))
+        self._xf.write_declaration()
+        self._stack.enter_context(self._xf.element("records"))
+        self._count = 0
+
+    def _close(self):
+        self._stack.close()
+        path = self._path(len(self.shards) + 1)
+        os.replace(f"{path}.part", path)
+        self.shards.append(
+            {
+                "file": os.path.basename(path),
+                "records": self._count,
+                "bytes": os.path.getsize(path),
+                "sha256": _sha256(path),
+            }
+        )
+        self._stack = self._xf = self._fp = None
+        self._count = 0
+
+    def write(self, identifier, datestamp, fragment):
+        """Write the serialized xMetaDiss of a record."""
+        if self._xf is None:
+            self._open()
+        with self._xf.element("record", identifier=identifier, datestamp=datestamp):
+            self._xf.flush()
+            self._fp.write(fragment)
+        self._count += 1
+        if self._count >= self.shard_size:
+            self._close()
+
+    def close(self):
+        """Complete the open shard, returns the shards written."""
+        if self._xf is not None:
+            self._close()
+        return self.shards
+
+    def abort(self):
+        """Discard the open shard."""
+        if self._stack is not None:
+            path = self._path(len(self.shards) + 1)
+            try:
+                self._stack.close()
+            finally:
+                self._stack = self._xf = self._fp = None
+                if os.path.exists(f"{path}.part"):
+                    os.remove(f"{path}.part")
+
+    def __enter__(self):
+        """Enter the writer context."""
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        """Complete the open shard, or discard it on errors."""
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_manifest(directory, **fields):
+    """Atomically write the manifest of an export."""
+    path = os.path.join(directory, MANIFEST)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fp:
+        json.dump(fields, fp, indent=2)
+    os.replace(tmp_path, path)
+    return path
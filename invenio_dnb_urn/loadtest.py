@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Load test of the DNB URN provider."""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from flask import current_app
+
+from .bulk import RateLimiter
+from .urn import add_check_digit
+
+
+class OperationFailed(Exception):
+    """The provider reported a failed operation, the cause is logged."""
+
+
+def percentile(values, percent):
+    """Nearest rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, round(percent / 100 * len(values) + 0.5) - 1))
+    return values[rank]
+
+
+class LoadTestReport:
+    """Latencies and errors of a load test."""
+
+    def __init__(self):
+        """Constructor."""
+        self.latencies = []
+        self.errors = {}
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, latency, error=None):
+        """Record a call."""
+        with self._lock:
+            self.latencies.append(latency)
+            if error is not None:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def stats(self):
+        """Call count, throughput and latency percentiles in seconds."""
+        latencies = sorted(self.latencies)
+        return {
+            "calls": len(latencies),
+            "errors": sum(self.errors.values()),
+            "throughput": len(latencies) / self.elapsed if self.elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else 0.0,
+        }
+
+    def summary(self):
+        """Human readable summary."""
+        stats = self.stats
+        lines = [
+            f"{stats['calls']} calls, {stats['errors']} errors "
+            f"in {self.elapsed:.1f}s ({stats['throughput']:.1f}/s)",
+            "latency p50 {p50:.3f}s, p95 {p95:.3f}s, p99 {p99:.3f}s, "
+            "max {max:.3f}s".format(**stats),
+        ]
+        lines.extend(f"{name}: {count}" for name, count in self.errors.items())
+        return "\n".join(lines)
+
+
+class LoadTest:
+    """Drives register, update or validate calls of a provider at a target rate.
+
+    The provider's ``register``, ``update`` and ``validate`` are called as on
+    publish, on URL updates and on PID validation, with transient PIDs. Each
+    call runs in its own application context and database transaction, which
+    is rolled back, so no PIDs are left behind. Updates are forced, so the
+    URL is sent even if it did not change; with ``URN_DNB_OUTBOX`` enabled
+    the provider only queues jobs. URNs are generated below the client's
+    prefix, URNs to update are registered before the measurement starts.
+    """
+
+    OPERATIONS = ("register", "update", "validate")
+
+    def __init__(
+        self, provider, operation, rate=None, workers=8, url="https://example.org/"
+    ):
+        """Constructor."""
+        if operation not in self.OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}.")
+        # Worker threads push their own context of the application.
+        self.app = current_app._get_current_object()
+        self.provider = provider
+        self.prefix = provider.client.cfg("id_prefix")
+        self.with_check_digit = provider.client.cfg("check_digit", False)
+        self.operation = operation
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self.url = url
+
+    def urn(self):
+        """A new URN below the configured prefix."""
+        urn = f"{self.prefix}-{uuid.uuid4().hex}"
+        if self.with_check_digit:
+            urn = add_check_digit(urn)
+        return urn
+
+    def prepare(self, count):
+        """URNs the calls are made with."""
+        urns = [self.urn() for _ in range(count)]
+        if self.operation == "update":
+            for urn in urns[: min(count, 100)]:
+                with self.app.app_context():
+                    self.call(urn, "register")
+            urns = [urns[i % min(count, 100)] for i in range(count)]
+        return urns
+
+    def pid(self, urn, status):
+        """Transient PID of a URN, it is not stored."""
+        from invenio_pidstore.models import PersistentIdentifier
+
+        return PersistentIdentifier(
+            pid_type=self.provider.pid_type,
+            pid_value=urn,
+            pid_provider=self.provider.name,
+            status=status,
+        )
+
+    def call(self, urn, operation=None):
+        """Run the operation for one URN, raises if the provider failed."""
+        from invenio_db import db
+        from invenio_pidstore.models import PIDStatus
+
+        operation = operation or self.operation
+        try:
+            if operation == "register":
+                pid = self.pid(urn, PIDStatus.NEW)
+                if not self.provider.register(pid, None, url=self.url):
+                    raise OperationFailed(urn)
+            elif operation == "update":
+                pid = self.pid(urn, PIDStatus.REGISTERED)
+                if not self.provider.update(pid, url=self.url, force=True):
+                    raise OperationFailed(urn)
+            else:
+                success, errors = self.provider.validate(
+                    SimpleNamespace(id=None), identifier=urn
+                )
+                if not success:
+                    raise OperationFailed(errors[0])
+        finally:
+            db.session.rollback()
+
+    def run(self, count):
+        """Make ``count`` calls, returns the :class:`LoadTestReport`."""
+        urns = self.prepare(count)
+        report = LoadTestReport()
+
+        def timed(urn):
+            self.limiter.acquire()
+            with self.app.app_context():
+                start = time.perf_counter()
+                try:
+                    self.call(urn)
+                except Exception as e:
+                    report.add(time.perf_counter() - start, e)
+                else:
+                    report.add(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            list(executor.map(timed, urns))
+        report.elapsed = time.perf_counter() - start
+        return report
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Timers, counters and debug events of the hot paths."""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("invenio_dnb_urn")
+
+
+def debug_event(event, **fields):
+    """Log a structured debug event, at no cost when debug logging is off."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "%s %s",
+            event,
+            json.dumps(fields, default=str),
+            extra={"event": event, "fields": fields},
+        )
+
+
+class Metrics:
+    """Per-process timers and counters rendered in Prometheus text format.
+
+    Timers are exported as summaries, ``<name>_seconds_count`` and
+    ``<name>_seconds_sum``, counters as ``<name>_total``.
+    """
+
+    def __init__(self, namespace="invenio_dnb_urn"):
+        """Constructor."""
+        self.namespace = namespace
+        self.enabled = True
+        self.timers = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items())) if labels else ()
+
+    def observe(self, name, seconds, **labels):
+        """Add a duration to a timer."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = [0, 0.0]
+            timer[0] += 1
+            timer[1] += seconds
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Time the enclosed block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """Drop all timers and counters."""
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def _metric(self, name, labels, suffix=""):
+        labels = ",".join(f'{key}="{value}"' for key, value in labels)
+        return f"{self.namespace}_{name}{suffix}" + (f"{{{labels}}}" if labels else "")
+
+    def render(self, gauges=None, labels=None):
+        """Prometheus text exposition of all metrics and the given gauges.
+
+        :param gauges: mapping of gauge names to values.
+        :param labels: labels added to every metric, e.g. the process id.
+        """
+        const = tuple(sorted((labels or {}).items()))
+        lines = []
+        with self._lock:
+            timers = sorted(self.timers.items())
+            counters = sorted(self.counters.items())
+        typed = set()
+        for (name, labels), (count, total) in timers:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {self.namespace}_{name}_seconds summary")
+            labels += const
+            lines.append(f"{self._metric(name, labels, '_seconds_count')} {count}")
+            lines.append(f"{self._metric(name, labels, '_seconds_sum')} {total}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {self.namespace}_{name}_total counter")
+            lines.append(f"{self._metric(name, labels + const, '_total')} {value}")
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {self.namespace}_{name} gauge")
+            lines.append(f"{self._metric(name, const)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+"""Metrics of the current process."""
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Database models."""
+
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from invenio_db import db
+from sqlalchemy_utils.models import Timestamp
+from sqlalchemy_utils.types import UUIDType
+
+ClaimedJob = namedtuple("ClaimedJob", "urn action url attempts claimed_until")
+"""Outbox job claimed by a worker, as it was when it was claimed."""
+
+
+class DnbUrnJob(db.Model, Timestamp):
+    """Pending registration or URL update of a URN at DNB.
+
+    There is at most one job per URN: queuing again replaces the URL, and a
+    pending creation stays a creation. Workers claim jobs for a lease time
+    and send them without holding locks, a sent job is only deleted if it
+    was not queued again in the meantime.
+    """
+
+    __tablename__ = "dnb_urn_outbox"
+
+    CREATE = "create"
+    MODIFY = "modify"
+
+    urn = db.Column(db.String(255), primary_key=True)
+    action = db.Column(db.String(6), nullable=False)
+    url = db.Column(db.Text, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, index=True
+    )
+    failed = db.Column(db.Boolean, nullable=False, default=False)
+    last_error = db.Column(db.Text, nullable=True)
+
+    @classmethod
+    def enqueue(cls, action, urn, url):
+        """Queue a job in the current transaction.
+
+        Inserts or updates the job in a single statement, so transactions
+        queuing the same URN concurrently neither fail nor lose a URL.
+        """
+        now = datetime.utcnow()
+        table = cls.__table__
+        values = {
+            "url": url,
+            "attempts": 0,
+            "next_attempt": now,
+            "failed": False,
+            "last_error": None,
+            "updated": now,
+        }
+        dialect = db.engine.dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        elif dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+        else:
+            raise NotImplementedError(f"Outbox not supported on {dialect}.")
+
+        stmt = insert(table).values(urn=urn, action=action, created=now, **values)
+        if dialect == "mysql":
+            values["action"] = db.case(
+                (table.c.action == cls.CREATE, cls.CREATE), else_=stmt.inserted.action
+            )
+            stmt = stmt.on_duplicate_key_update(**values)
+        else:
+            values["action"] = db.case(
+                (table.c.action == cls.CREATE, cls.CREATE), else_=stmt.excluded.action
+            )
+            stmt = stmt.on_conflict_do_update(index_elements=[table.c.urn], set_=values)
+        db.session.execute(stmt)
+
+    @classmethod
+    def is_pending(cls, urn):
+        """Whether a job is queued for the URN."""
+        return db.session.query(cls.query.filter(cls.urn == urn).exists()).scalar()
+
+    @classmethod
+    def claim(cls, limit, lease):
+        """Claim due jobs for ``lease`` seconds in the current transaction.
+
+        Claimed jobs are not due for other workers until the lease expires.
+        Commit right away, so no locks are held while the jobs are sent.
+        """
+        # Whole seconds, so the claim compares equal on every database.
+        claimed_until = (datetime.utcnow() + timedelta(seconds=lease)).replace(
+            microsecond=0
+        )
+        jobs = (
+            cls.query.filter(
+                cls.failed.is_(False), cls.next_attempt <= datetime.utcnow()
+            )
+            .order_by(cls.next_attempt)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed = []
+        for job in jobs:
+            job.next_attempt = claimed_until
+            claimed.append(
+                ClaimedJob(job.urn, job.action, job.url, job.attempts, claimed_until)
+            )
+        return claimed
+
+    @classmethod
+    def _unchanged(cls, job):
+        """Filter of the claimed job, if it was not queued again."""
+        return cls.query.filter(
+            cls.urn == job.urn,
+            cls.action == job.action,
+            cls.url == job.url,
+            cls.next_attempt == job.claimed_until,
+        )
+
+    @classmethod
+    def complete(cls, job):
+        """Delete a sent job, unless it was queued again since it was claimed.
+
+        :returns: whether the job was deleted.
+        """
+        return bool(cls._unchanged(job).delete(synchronize_session=False))
+
+    @classmethod
+    def retry_later(cls, job, error, delay, max_attempts):
+        """Record a failed attempt, giving up after ``max_attempts``.
+
+        Jobs queued again since they were claimed are left due.
+        :returns: whether the job is marked as failed.
+        """
+        now = datetime.utcnow()
+        attempts = job.attempts + 1
+        failed = attempts >= max_attempts
+        values = {
+            cls.attempts: attempts,
+            cls.last_error: str(error),
+            cls.failed: failed,
+            cls.updated: now,
+        }
+        if not failed:
+            values[cls.next_attempt] = now + timedelta(
+                seconds=delay * 2 ** (attempts - 1)
+            )
+        cls._unchanged(job).update(values, synchronize_session=False)
+        return failed
+
+
+class DnbUrnPushedUrl(db.Model, Timestamp):
+    """Hash of the URL last successfully sent to DNB for a URN."""
+
+    __tablename__ = "dnb_urn_pushed_url"
+
+    urn = db.Column(db.String(255), primary_key=True)
+    url_hash = db.Column(db.String(64), nullable=False)
+
+    @staticmethod
+    def hash(url):
+        """Hash of a URL."""
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def is_current(cls, urn, url):
+        """Whether the URL was the last one sent for the URN."""
+        pushed = cls.query.get(urn)
+        return pushed is not None and pushed.url_hash == cls.hash(url)
+
+    @classmethod
+    def hashes(cls, urns):
+        """Hashes of the URLs last sent for the given URNs, by URN."""
+        if not urns:
+            return {}
+        return dict(
+            db.session.query(cls.urn, cls.url_hash).filter(cls.urn.in_(urns)).all()
+        )
+
+    @classmethod
+    def record(cls, urn, url):
+        """Record a URL sent for a URN in the current transaction."""
+        pushed = cls.query.get(urn)
+        if pushed is None:
+            db.session.add(cls(urn=urn, url_hash=cls.hash(url)))
+        else:
+            pushed.url_hash = cls.hash(url)
+
+
+class XMetaDissDatestamp(db.Model, Timestamp):
+    """Fingerprint of the xMetaDiss content of a record and when it changed."""
+
+    __tablename__ = "dnb_urn_xmetadiss_datestamp"
+
+    record_id = db.Column(UUIDType, primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    datestamp = db.Column(db.DateTime, nullable=False)
+
+    @classmethod
+    def update(cls, record_id, fingerprint):
+        """Store a fingerprint in the current transaction.
+
+        The datestamp is only moved to now if the fingerprint changed.
+        """
+        entry = cls.query.get(record_id)
+        if entry is None:
+            db.session.add(
+                cls(
+                    record_id=record_id,
+                    fingerprint=fingerprint,
+                    datestamp=datetime.utcnow(),
+                )
+            )
+        elif entry.fingerprint != fingerprint:
+            entry.fingerprint = fingerprint
+            entry.datestamp = datetime.utcnow()
@@ -2,393 +2,601 @@
 #
 # Copyright (C) 2022, 2023 University Münster.
 #
-# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
-# it under the terms of the MIT License; see LICENSE file for more details.
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
 
 """ InvenioRDM additional metadata output format for OAI DataProvider. """
 
+import hashlib
+import json
+import random
+import time
+
 from flask import current_app
 from lxml import etree
 
+from . import __version__
+from .cache import fragment_key
+from .dumpers import FRAGMENT_FIELD, GENERATION_FIELD
+from .metrics import debug_event, logger, metrics
+from .thesis import ThesisTypes
 from .utils import get_vocabulary_props
 
+NS_XMETADISS = "http://www.d-nb.de/standards/xmetadissplus/"
+NS_DC = "http://purl.org/dc/elements/1.1/"
+NS_DCTERMS = "http://purl.org/dc/terms/"
+NS_DDB = "http://www.d-nb.de/standards/ddb/"
+NS_PC = "http://www.d-nb.de/standards/pc/"
+NS_CC = "http://www.d-nb.de/standards/cc/"
+NS_XSI = "http://www.w3.org/2001/XMLSchema-instance"
+NS_THESIS = "http://www.ndltd.org/standards/metadata/etdms/1.0/"
 
-def xmetadiss_etree(pid, record):
-    """OAI Epicur XML format for OAI-PMH.
+NSMAP = {
+    "xMetaDiss": NS_XMETADISS,
+    "dc": NS_DC,
+    "dcterms": NS_DCTERMS,
+    "ddb": NS_DDB,
+    "pc": NS_PC,
+    "cc": NS_CC,
+    "xsi": NS_XSI,
+    "thesis": NS_THESIS,
+}
 
-    It assumes that record is a search result.
+XSI_TYPE = etree.QName(NS_XSI, "type").text
+DDB_TYPE = etree.QName(NS_DDB, "type").text
+DDB_KIND = etree.QName(NS_DDB, "kind").text
+DDB_LICENCE_TYPE = etree.QName(NS_DDB, "licenceType").text
+DDB_GND_NR = etree.QName(NS_DDB, "GND-Nr").text
+
+SCHEMA_LOCATION = {
+    etree.QName(NS_XSI, "schemaLocation").text: (
+        "http://www.d-nb.de/standards/xmetadissplus/ "
+        "http://www.d-nb.de/standards/xmetadissplus/xmetadissplus.xsd"
+    ),
+}
+
+PERSON_ID_ELEMENTS = {
+    "orcid": (etree.QName(NS_DDB, "ORCID"), ""),
+    "isni": (etree.QName(NS_DDB, "ISNI"), ""),
+    "ror": (etree.QName(NS_DDB, "OtherId"), "(ror)"),
+}
+"""Person identifier schemes rendered as child elements and their text prefix."""
+
+IDENTIFIER_TYPES = {
+    "url": "URL",
+    "urn": "URN",
+    "doi": "DOI",
+    "handle": "handle",
+    "isbn": "ISBN",
+}
+"""Identifier scheme to ``ddb:type`` of ``ddb:identifier``."""
+
+SUBJECT_TYPES = {
+    "FOS": "xMetaDiss:noScheme",
+}
+"""Subject scheme to ``xsi:type`` of ``dc:subject``, DDC schemes aside."""
+
+LANGUAGES = {
+    "deu": "ger",
+}
+"""ISO 639-2/T codes which DNB expects in their bibliographic form."""
+
+
+def _attrib(key, value):
+    """Shared attribute template."""
+    return {key: value}
+
+
+class XMetaDissBuilder:
+    """Builds xMetaDissPlus trees from search hits.
+
+    Element names, attribute templates and config values are computed once,
+    so that building a record only walks its metadata.
     """
-    nsmap = {
-        "xMetaDiss": "http://www.d-nb.de/standards/xmetadissplus/",
-        "dc": "http://purl.org/dc/elements/1.1/",
-        "dcterms": "http://purl.org/dc/terms/",
-        "ddb": "http://www.d-nb.de/standards/ddb/",
-        "pc": "http://www.d-nb.de/standards/pc/",
-        "cc": "http://www.d-nb.de/standards/cc/",
-        "xsi": "http://www.w3.org/2001/XMLSchema-instance",
-        "thesis": "http://www.ndltd.org/standards/metadata/etdms/1.0/",
-    }
 
-    attribs = {
-        f"{{{nsmap['xsi']}}}schemaLocation": (
-            "http://www.d-nb.de/standards/xmetadissplus/ "
-            "http://www.d-nb.de/standards/xmetadissplus/xmetadissplus.xsd"
-        ),
+    dc_title = etree.QName(NS_DC, "title")
+    dc_creator = etree.QName(NS_DC, "creator")
+    dc_subject = etree.QName(NS_DC, "subject")
+    dc_publisher = etree.QName(NS_DC, "publisher")
+    dc_contributor = etree.QName(NS_DC, "contributor")
+    dc_type = etree.QName(NS_DC, "type")
+    dc_identifier = etree.QName(NS_DC, "identifier")
+    dc_language = etree.QName(NS_DC, "language")
+    dcterms_alternative = etree.QName(NS_DCTERMS, "alternative")
+    dcterms_issued = etree.QName(NS_DCTERMS, "issued")
+    dcterms_extent = etree.QName(NS_DCTERMS, "extent")
+    dcterms_medium = etree.QName(NS_DCTERMS, "medium")
+    dcterms_ispartof = etree.QName(NS_DCTERMS, "isPartOf")
+    pc_person = etree.QName(NS_PC, "person")
+    pc_name = etree.QName(NS_PC, "name")
+    pc_forename = etree.QName(NS_PC, "foreName")
+    pc_surname = etree.QName(NS_PC, "surName")
+    pc_organisationname = etree.QName(NS_PC, "organisationName")
+    pc_affiliation = etree.QName(NS_PC, "affiliation")
+    cc_institution = etree.QName(NS_CC, "universityOrInstitution")
+    cc_name = etree.QName(NS_CC, "name")
+    cc_place = etree.QName(NS_CC, "place")
+    ddb_transfer = etree.QName(NS_DDB, "transfer")
+    ddb_identifier = etree.QName(NS_DDB, "identifier")
+    ddb_rights = etree.QName(NS_DDB, "rights")
+    ddb_licence = etree.QName(NS_DDB, "licence")
+    thesis_degree = etree.QName(NS_THESIS, "degree")
+    thesis_level = etree.QName(NS_THESIS, "level")
+    thesis_grantor = etree.QName(NS_THESIS, "grantor")
+    xmetadiss = etree.QName(NS_XMETADISS, "xMetaDiss")
+
+    attrib_title = _attrib(XSI_TYPE, "ddb:titleISO639-2")
+    attrib_alternative = _attrib(XSI_TYPE, "ddb:talternativeISO639-2")
+    attrib_creator = _attrib(XSI_TYPE, "pc:MetaPers")
+    attrib_contributor = _attrib(XSI_TYPE, "pc:Contributor")
+    attrib_publisher = _attrib(XSI_TYPE, "cc:Publisher")
+    attrib_issued = _attrib(XSI_TYPE, "dcterms:W3CDTF")
+    attrib_medium = _attrib(XSI_TYPE, "dcterms:IMT")
+    attrib_ispartof = _attrib(XSI_TYPE, "ddb:noScheme")
+    attrib_urn = _attrib(XSI_TYPE, "urn:nbn")
+    attrib_doi = _attrib(XSI_TYPE, "doi:doi")
+    attrib_transfer = _attrib(DDB_TYPE, "dcterms:URI")
+    attrib_url = _attrib(DDB_TYPE, "URL")
+    attrib_ddb_doi = _attrib(DDB_TYPE, "DOI")
+    attrib_identifiers = {
+        scheme: _attrib(DDB_TYPE, type_) for scheme, type_ in IDENTIFIER_TYPES.items()
     }
+    attrib_identifier_other = _attrib(DDB_TYPE, "other")
+    attrib_rights = {
+        "free": _attrib(DDB_KIND, "free"),
+        "domain": _attrib(DDB_KIND, "domain"),
+    }
+    attrib_licence_access = _attrib(DDB_LICENCE_TYPE, "access")
+    attrib_licence_cc = _attrib(DDB_LICENCE_TYPE, "cc")
+    attrib_licence_noscheme = _attrib(DDB_LICENCE_TYPE, "noScheme")
+    attrib_licence_otherscheme = _attrib(DDB_LICENCE_TYPE, "otherScheme")
+    attrib_licence_url = _attrib(DDB_LICENCE_TYPE, "URL")
 
-    source = record['_source']
-    metadata = source['metadata']
-    print(record)
-    # prepare the structure required by the 'xMetaDissPlus' metadataPrefix
-    xmetadiss = etree.Element("{http://www.d-nb.de/standards/xmetadissplus/}xMetaDiss", nsmap=nsmap, attrib=attribs)
-    title = etree.SubElement(
-        xmetadiss, "{http://purl.org/dc/elements/1.1/}title",
-        nsmap=nsmap)
-    lang = None
-    if 'languages' in metadata:
-        lang = metadata['languages'][0]['id']
-        if lang == "deu":
-            lang = "ger"
-        title.attrib['lang'] = lang
-        title.attrib['{http://www.w3.org/2001/XMLSchema-instance}type'] = 'ddb:titleISO639-2'
-    title.text = metadata['title']
-    if 'additional_titles' in metadata:
-        for additionaltitle in metadata['additional_titles']:
-            if additionaltitle['type']['id'] == 'translated-title' or additionaltitle['type']['id'] == 'subtitle':
-                alternativetitle = etree.SubElement(
-                    xmetadiss, "{http://purl.org/dc/terms/}alternative",
-                    nsmap=nsmap,
-                    attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'ddb:talternativeISO639-2'})
-                if additionaltitle['type']['id'] == 'translated-title':
-                    alternativetitle.attrib['{http://www.d-nb.de/standards/ddb/}type'] = 'translated'
-                if 'lang' in additionaltitle:
-                    additionaltitle_lang = additionaltitle['lang']['id']
-                    if additionaltitle_lang == "deu":
-                        additionaltitle_lang = "ger"
-                    alternativetitle.attrib['lang'] = additionaltitle_lang
-                alternativetitle.text = additionaltitle['title']
-    for mcreator in metadata['creators']:
-        creator = etree.SubElement(xmetadiss, "{http://purl.org/dc/elements/1.1/}creator",
-                                   nsmap=nsmap,
-                                   attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'pc:MetaPers'})
-        person = etree.SubElement(creator, "{http://www.d-nb.de/standards/pc/}person", nsmap=nsmap)
-        mperson = mcreator['person_or_org']
-        if 'identifiers' in mperson:
-            for midentifier in mperson['identifiers']:
-                mscheme = midentifier['scheme']
-                if mscheme == "orcid":
-                    id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}ORCID")
-                    id.text = midentifier['identifier']
-                elif mscheme == "gnd":
-                    person.attrib['{http://www.d-nb.de/standards/ddb/}GND-Nr'] = midentifier['identifier']
-                elif mscheme == "isni":
-                    id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}ISNI")
-                    id.text = midentifier['identifier']
-                elif mscheme == "ror":
-                    id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}OtherId")
-                    id.text = "(ror)" + midentifier['identifier']
-        name = etree.SubElement(person, "{http://www.d-nb.de/standards/pc/}name", nsmap=nsmap)
-        if mperson['type'] == 'personal':
-            name.attrib['type'] = "nameUsedByThePerson"
-            foreName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}foreName", nsmap=nsmap)
-            foreName.text = mperson['given_name']
-            surName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}surName", nsmap=nsmap)
-            surName.text = mperson['family_name']
-            if 'affiliations' in mcreator:
-                maffiliation = mcreator['affiliations'][0]
-                affiliation = etree.SubElement(person, "{http://www.d-nb.de/standards/pc/}affiliation", nsmap=nsmap)
-                institution = etree.SubElement(affiliation,
-                                               "{http://www.d-nb.de/standards/cc/}universityOrInstitution",
-                                               nsmap=nsmap)
-                ccname = etree.SubElement(institution, "{http://www.d-nb.de/standards/cc/}name", nsmap=nsmap)
-                ccname.text = maffiliation['name']
-        else:
-            name.attrib['type'] = "otherName"
-            name.attrib['otherNameType'] = "organisation"
-            organisationName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}organisationName", nsmap=nsmap)
-            organisationName.text = mperson['name']
-    if 'subjects' in metadata:
-        for msubject in metadata['subjects']:
-            subject = etree.SubElement(xmetadiss, "{http://purl.org/dc/elements/1.1/}subject", nsmap=nsmap)
-            if 'scheme' in msubject:
-                if msubject['scheme'] == 'FOS':
-                    subject.attrib['{http://www.w3.org/2001/XMLSchema-instance}type'] = "xMetaDiss:noScheme"
-                    subject.text = msubject['subject']
-                elif 'DDC' in msubject['scheme']:
-                    subject.attrib['{http://www.w3.org/2001/XMLSchema-instance}type'] = "dcterms:DDC"
-                    id = msubject['id']
-                    reversed_id = "".join(reversed(id))
-                    last_slash = len(id) - reversed_id.index("/") - 1
-                    subject.text = id[last_slash + 1:]
-                else:
-                    subject.attrib['{http://www.w3.org/2001/XMLSchema-instance}type'] = "xMetaDiss:noScheme"
-                    subject.text = msubject['subject']
-    mpublisher = metadata['publisher']
-    if '/' in mpublisher:
-        reversed_mpublisher = "".join(reversed(mpublisher))
-        first_slash = mpublisher.index("/")
-        last_slash = len(mpublisher) - reversed_mpublisher.index("/") - 1
-        sinstitution = mpublisher[:first_slash].rstrip()
-        splace = mpublisher[last_slash + 1:].lstrip()
-    else:
-        sinstitution = mpublisher
-        splace = "..."
-    publisher = etree.SubElement(xmetadiss, "{http://purl.org/dc/elements/1.1/}publisher", nsmap=nsmap,
-                                 attrib={"{http://www.w3.org/2001/XMLSchema-instance}type": "cc:Publisher"})
-    institution = etree.SubElement(publisher,
-                                   "{http://www.d-nb.de/standards/cc/}universityOrInstitution",
-                                   nsmap=nsmap)
-    ccname = etree.SubElement(institution, "{http://www.d-nb.de/standards/cc/}name", nsmap=nsmap)
-    ccname.text = sinstitution
-    ccplace = etree.SubElement(institution, "{http://www.d-nb.de/standards/cc/}place", nsmap=nsmap)
-    ccplace.text = splace
-    if 'contributors' in metadata:
-        for mcontributor in metadata['contributors']:
-            contributor = etree.SubElement(xmetadiss, "{http://purl.org/dc/elements/1.1/}contributor", nsmap=nsmap,
-                                   attrib={"{http://www.w3.org/2001/XMLSchema-instance}type": "pc:Contributor"})
-            person = etree.SubElement(contributor, "{http://www.d-nb.de/standards/pc/}person", nsmap=nsmap)
-            mperson = mcontributor['person_or_org']
-            if 'identifiers' in mperson:
-                for midentifier in mperson['identifiers']:
-                    mscheme = midentifier['scheme']
-                    if mscheme == "orcid":
-                        id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}ORCID")
-                        id.text = midentifier['identifier']
-                    elif mscheme == "gnd":
-                        person.attrib['{http://www.d-nb.de/standards/ddb/}GND-Nr'] = midentifier['identifier']
-                    elif mscheme == "isni":
-                        id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}ISNI")
-                        id.text = midentifier['identifier']
-                    elif mscheme == "ror":
-                        id = etree.SubElement(person, "{http://www.d-nb.de/standards/ddb/}OtherId")
-                        id.text = "(ror)" + midentifier['identifier']
-            name = etree.SubElement(person, "{http://www.d-nb.de/standards/pc/}name", nsmap=nsmap)
-            if mperson['type'] == 'personal':
-                name.attrib['type'] = "nameUsedByThePerson"
-                foreName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}foreName", nsmap=nsmap)
-                foreName.text = mperson['given_name']
-                surName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}surName", nsmap=nsmap)
-                surName.text = mperson['family_name']
-                if 'affiliations' in mcreator:
-                    maffiliation = mcreator['affiliations'][0]
-                    affiliation = etree.SubElement(person, "{http://www.d-nb.de/standards/pc/}affiliation", nsmap=nsmap)
-                    institution = etree.SubElement(affiliation,
-                                                   "{http://www.d-nb.de/standards/cc/}universityOrInstitution",
-                                                   nsmap=nsmap)
-                    ccname = etree.SubElement(institution, "{http://www.d-nb.de/standards/cc/}name", nsmap=nsmap)
-                    ccname.text = maffiliation['name']
+    attrib_dini_publtype = _attrib(XSI_TYPE, "dini:publType")
+
+    source_fields = ("id", "pids", "metadata", "custom_fields", "access")
+    """Fields of the search document xMetaDiss is built from."""
+
+    def __init__(
+        self,
+        api_url,
+        ui_url,
+        dini_mapping,
+        dcterms_mapping,
+        vocabulary_props=None,
+        thesis_types=None,
+        thesis_publtype=False,
+    ):
+        """Constructor.
+
+        :param vocabulary_props: callable used to resolve resource type props,
+            defaults to :func:`invenio_dnb_urn.utils.get_vocabulary_props`.
+        :param thesis_types: thesis type index, see :mod:`invenio_dnb_urn.thesis`.
+        :param thesis_publtype: take ``dini:publType`` from the ``dini_publtype``
+            prop of the thesis level instead of the resource type mapping.
+        """
+        self.api_url = api_url
+        self.ui_url = ui_url
+        self.dini_mapping = dini_mapping
+        self.dcterms_mapping = dcterms_mapping
+        self.vocabulary_props = vocabulary_props or get_vocabulary_props
+        self.thesis_types = thesis_types or ThesisTypes()
+        self.thesis_publtype_enabled = thesis_publtype
+        self.types = (
+            (dini_mapping, self.attrib_dini_publtype),
+            (dcterms_mapping, _attrib(XSI_TYPE, "dcterms:DCMIType")),
+        )
+
+    @classmethod
+    def from_app(cls, app, **kwargs):
+        """Compile a builder from the application config."""
+        return cls(
+            app.config.get("SITE_API_URL"),
+            app.config.get("SITE_UI_URL"),
+            app.config.get("XMETADISS_TYPE_DINI_PUBLTYPE"),
+            app.config.get("XMETADISS_TYPE_DCTERMS_DCMITYPE"),
+            thesis_publtype=app.config.get("XMETADISS_THESIS_PUBLTYPE", False),
+            **kwargs,
+        )
+
+    def build(self, source):
+        """Build the ``xMetaDiss`` element of a record's ``_source``."""
+        SubElement = etree.SubElement
+        metadata = source["metadata"]
+        xmetadiss = etree.Element(self.xmetadiss, nsmap=NSMAP, attrib=SCHEMA_LOCATION)
+
+        title = SubElement(xmetadiss, self.dc_title)
+        lang = None
+        if "languages" in metadata:
+            lang = metadata["languages"][0]["id"]
+            lang = LANGUAGES.get(lang, lang)
+            title.attrib["lang"] = lang
+            title.attrib[XSI_TYPE] = "ddb:titleISO639-2"
+        title.text = metadata["title"]
+        for additional_title in metadata.get("additional_titles", ()):
+            self.add_alternative(xmetadiss, additional_title)
+
+        mcreator = None
+        for mcreator in metadata["creators"]:
+            creator = SubElement(xmetadiss, self.dc_creator, self.attrib_creator)
+            self.add_person(creator, mcreator["person_or_org"], mcreator)
+
+        for msubject in metadata.get("subjects", ()):
+            self.add_subject(xmetadiss, msubject)
+
+        self.add_publisher(xmetadiss, metadata["publisher"])
+
+        for mcontributor in metadata.get("contributors", ()):
+            contributor = SubElement(
+                xmetadiss, self.dc_contributor, self.attrib_contributor
+            )
+            # Contributors have always been rendered with the affiliation
+            # of the last creator; kept so the output does not change.
+            self.add_person(contributor, mcontributor["person_or_org"], mcreator)
+
+        mdate_issued = None
+        for mdate in metadata.get("dates", ()):
+            if mdate["type"]["id"] == "issued":
+                mdate_issued = mdate["date"]
+        if mdate_issued is None:
+            mdate_issued = metadata["publication_date"]
+        SubElement(xmetadiss, self.dcterms_issued, self.attrib_issued).text = (
+            mdate_issued
+        )
+
+        thesis_publtype = self.thesis_publtype(source.get("custom_fields"))
+        for mapping, attrib in self.types:
+            if thesis_publtype is not None and attrib is self.attrib_dini_publtype:
+                SubElement(xmetadiss, self.dc_type, attrib).text = thesis_publtype
             else:
-                name.attrib['type'] = "otherName"
-                name.attrib['otherNameType'] = "organisation"
-                organisationName = etree.SubElement(name, "{http://www.d-nb.de/standards/pc/}organisationName", nsmap=nsmap)
-                organisationName.text = mperson['name']
-    mdate_issued = None
-    if 'dates' in metadata:
-        for mdate in metadata['dates']:
-            if mdate['type']['id'] == 'issued':
-                mdate_issued = mdate['date']
-    if mdate_issued == None:
-        mdate_issued = metadata['publication_date']
-    date_issued = etree.SubElement(xmetadiss, "{http://purl.org/dc/terms/}issued", nsmap=nsmap,
-                                   attrib={"{http://www.w3.org/2001/XMLSchema-instance}type": "dcterms:W3CDTF"})
-    date_issued.text = mdate_issued
-    dini_mapping = current_app.config.get("XMETADISS_TYPE_DINI_PUBLTYPE")
-    dcterms_mapping = current_app.config.get("XMETADISS_TYPE_DCTERMS_DCMITYPE")
-    xmetadiss = add_dctype(xmetadiss, nsmap, metadata, dini_mapping, 'dini:publType')
-    xmetadiss = add_dctype(xmetadiss, nsmap, metadata, dcterms_mapping, 'dcterms:DCMIType')
-
-    pids = record['_source']['pids']
-    urn = None
-    doi = None
-    for mpid in pids:
-        if 'urn' in mpid:
-            urn = pids['urn']['identifier']
-        if 'doi' in mpid:
-            doi = pids['doi']['identifier']
-    if urn is not None:
-        dcidentifier = etree.SubElement(
-            xmetadiss, "{http://purl.org/dc/elements/1.1/}identifier",
-            nsmap=nsmap,
-            attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'urn:nbn'})
-        dcidentifier.text = urn
-    elif doi is not None:
-        dcidentifier = etree.SubElement(
-            xmetadiss, "{http://purl.org/dc/elements/1.1/}identifier",
-            nsmap=nsmap,
-            attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'doi:doi'})
-        dcidentifier.text = doi
-
-    if 'sizes' in metadata:
-        for size in metadata['sizes']:
-            dcterms_extent = etree.SubElement(
-                xmetadiss, "{http://purl.org/dc/terms/}extent",
-                nsmap=nsmap)
-            dcterms_extent.text = size
-    dcterms_medium = etree.SubElement(
-        xmetadiss, "{http://purl.org/dc/terms/}medium",
-        nsmap=nsmap,
-        attrib={"{http://www.w3.org/2001/XMLSchema-instance}type": "dcterms:IMT"})
-    dcterms_medium.text = "application/zip"
-    if lang is not None:
-        language = etree.SubElement(
-            xmetadiss, "{http://purl.org/dc/elements/1.1/}language",
-            nsmap=nsmap,
-            attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'ddb:titleISO639-2'})
-        language.text = lang
-    if 'additional_descriptions' in metadata:
-        for additional_description in metadata['additional_descriptions']:
-            if additional_description['type']['id'] == 'series-information':
-                isPartOf = etree.SubElement(
-                    xmetadiss, "{http://purl.org/dc/terms/}isPartOf",
-                    nsmap=nsmap,
-                    attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': 'ddb:noScheme'})
-                mIsPartOf = additional_description['description'].replace("<p>", "")
-                mIsPartOf = mIsPartOf.replace("</p>", "")
-                isPartOf.text = mIsPartOf
-    if 'custom_fields' in source:
-        custom_fields = source['custom_fields']
-        if 'thesis:level' in custom_fields \
-            and 'thesis:organisation' in custom_fields \
-            and 'thesis:place' in custom_fields:
-            thesis_degree = etree.SubElement(
-                xmetadiss, "{http://www.ndltd.org/standards/metadata/etdms/1.0/}degree",
-                nsmap=nsmap)
-            thesis_level = etree.SubElement(
-                thesis_degree, "{http://www.ndltd.org/standards/metadata/etdms/1.0/}level",
-                nsmap=nsmap
+                self.add_dctype(xmetadiss, metadata, mapping, attrib)
+
+        pids = source["pids"]
+        urn = pids["urn"]["identifier"] if "urn" in pids else None
+        doi = pids["doi"]["identifier"] if "doi" in pids else None
+        if urn is not None:
+            SubElement(xmetadiss, self.dc_identifier, self.attrib_urn).text = urn
+        elif doi is not None:
+            SubElement(xmetadiss, self.dc_identifier, self.attrib_doi).text = doi
+
+        for size in metadata.get("sizes", ()):
+            SubElement(xmetadiss, self.dcterms_extent).text = size
+        SubElement(xmetadiss, self.dcterms_medium, self.attrib_medium).text = (
+            "application/zip"
+        )
+        if lang is not None:
+            SubElement(xmetadiss, self.dc_language, self.attrib_title).text = lang
+        for additional_description in metadata.get("additional_descriptions", ()):
+            if additional_description["type"]["id"] == "series-information":
+                is_part_of = SubElement(
+                    xmetadiss, self.dcterms_ispartof, self.attrib_ispartof
+                )
+                is_part_of.text = (
+                    additional_description["description"]
+                    .replace("<p>", "")
+                    .replace("</p>", "")
+                )
+        self.add_thesis_degree(xmetadiss, source.get("custom_fields"))
+
+        SubElement(xmetadiss, self.ddb_transfer, self.attrib_transfer).text = (
+            self.api_url + "/records/" + source["id"] + "/files-archive"
+        )
+        SubElement(xmetadiss, self.ddb_identifier, self.attrib_url).text = (
+            self.ui_url + "/records/" + source["id"]
+        )
+        if urn is not None and doi is not None:
+            SubElement(xmetadiss, self.ddb_identifier, self.attrib_ddb_doi).text = doi
+        for midentifier in metadata.get("identifiers", ()):
+            attrib = self.attrib_identifiers.get(
+                midentifier["scheme"], self.attrib_identifier_other
+            )
+            SubElement(xmetadiss, self.ddb_identifier, attrib).text = midentifier[
+                "identifier"
+            ]
+
+        kind = "domain" if source["access"]["files"] == "restricted" else "free"
+        SubElement(xmetadiss, self.ddb_rights, self.attrib_rights[kind])
+        self.add_licences(xmetadiss, metadata.get("rights"))
+
+        return xmetadiss
+
+    def add_alternative(self, parent, additional_title):
+        """Add ``dcterms:alternative`` for translated titles and subtitles."""
+        type_id = additional_title["type"]["id"]
+        if type_id != "translated-title" and type_id != "subtitle":
+            return
+        alternative = etree.SubElement(
+            parent, self.dcterms_alternative, self.attrib_alternative
+        )
+        if type_id == "translated-title":
+            alternative.attrib[DDB_TYPE] = "translated"
+        if "lang" in additional_title:
+            lang = additional_title["lang"]["id"]
+            alternative.attrib["lang"] = LANGUAGES.get(lang, lang)
+        alternative.text = additional_title["title"]
+
+    def add_person(self, parent, mperson, maffiliations):
+        """Add ``pc:person`` of a creator or contributor."""
+        SubElement = etree.SubElement
+        person = SubElement(parent, self.pc_person)
+        for midentifier in mperson.get("identifiers", ()):
+            mscheme = midentifier["scheme"]
+            if mscheme == "gnd":
+                person.attrib[DDB_GND_NR] = midentifier["identifier"]
+            elif mscheme in PERSON_ID_ELEMENTS:
+                tag, prefix = PERSON_ID_ELEMENTS[mscheme]
+                SubElement(person, tag).text = prefix + midentifier["identifier"]
+        name = SubElement(person, self.pc_name)
+        if mperson["type"] == "personal":
+            name.attrib["type"] = "nameUsedByThePerson"
+            SubElement(name, self.pc_forename).text = mperson["given_name"]
+            SubElement(name, self.pc_surname).text = mperson["family_name"]
+            if "affiliations" in maffiliations:
+                affiliation = SubElement(person, self.pc_affiliation)
+                institution = SubElement(affiliation, self.cc_institution)
+                SubElement(institution, self.cc_name).text = maffiliations[
+                    "affiliations"
+                ][0]["name"]
+        else:
+            name.attrib["type"] = "otherName"
+            name.attrib["otherNameType"] = "organisation"
+            SubElement(name, self.pc_organisationname).text = mperson["name"]
+
+    def add_subject(self, parent, msubject):
+        """Add ``dc:subject``, DDC subjects are rendered by their notation."""
+        subject = etree.SubElement(parent, self.dc_subject)
+        if "scheme" not in msubject:
+            return
+        scheme = msubject["scheme"]
+        if scheme not in SUBJECT_TYPES and "DDC" in scheme:
+            subject.attrib[XSI_TYPE] = "dcterms:DDC"
+            id_ = msubject["id"]
+            subject.text = id_[id_.rindex("/") + 1 :]
+        else:
+            subject.attrib[XSI_TYPE] = SUBJECT_TYPES.get(scheme, "xMetaDiss:noScheme")
+            subject.text = msubject["subject"]
+
+    def add_publisher(self, parent, mpublisher):
+        """Add ``dc:publisher`` from an ``institution / place`` string."""
+        if "/" in mpublisher:
+            sinstitution = mpublisher[: mpublisher.index("/")].rstrip()
+            splace = mpublisher[mpublisher.rindex("/") + 1 :].lstrip()
+        else:
+            sinstitution = mpublisher
+            splace = "..."
+        publisher = etree.SubElement(parent, self.dc_publisher, self.attrib_publisher)
+        institution = etree.SubElement(publisher, self.cc_institution)
+        etree.SubElement(institution, self.cc_name).text = sinstitution
+        etree.SubElement(institution, self.cc_place).text = splace
+
+    def vocabulary_lookups(self, source):
+        """Arguments of the vocabulary props lookups needed to build source."""
+        resource_type = source["metadata"]["resource_type"]["id"]
+        return [
+            ("resourcetypes", ["props." + mapping], resource_type)
+            for mapping, _ in self.types
+        ]
+
+    def generation(self, source):
+        """Digest of the inputs of :meth:`build` apart from the record.
+
+        Changes with the package version, the builder config, the thesis
+        types and the vocabulary props source is built with.
+        """
+        inputs = [
+            __version__,
+            self.api_url,
+            self.ui_url,
+            self.dini_mapping,
+            self.dcterms_mapping,
+            self.thesis_publtype_enabled,
+            self.thesis_types.digest,
+        ]
+        for args in self.vocabulary_lookups(source):
+            inputs.append(self.vocabulary_props(*args))
+        return hashlib.sha1(
+            json.dumps(inputs, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def add_dctype(self, parent, metadata, mapping, attrib):
+        """Add ``dc:type`` mapped through the resource type vocabulary."""
+        resource_type = metadata["resource_type"]["id"]
+        with metrics.timer("vocabulary_lookup"):
+            props = self.vocabulary_props(
+                "resourcetypes",
+                [
+                    "props." + mapping,
+                ],
+                resource_type,
+            )
+        dctype = etree.SubElement(parent, self.dc_type, attrib)
+        dctype.text = props.get(mapping)
+        debug_event(
+            "xmetadiss.dctype",
+            mapping=mapping,
+            resource_type=resource_type,
+            value=dctype.text,
+        )
+        return parent
+
+    def thesis_publtype(self, custom_fields):
+        """DINI publication type of the record's thesis level, if enabled and mapped."""
+        if (
+            not self.thesis_publtype_enabled
+            or not custom_fields
+            or "thesis:level" not in custom_fields
+        ):
+            return None
+        return self.thesis_types.dini_publtype(custom_fields["thesis:level"]["id"])
+
+    def add_thesis_degree(self, parent, custom_fields):
+        """Add ``thesis:degree`` when all thesis custom fields are set."""
+        if (
+            not custom_fields
+            or "thesis:level" not in custom_fields
+            or "thesis:organisation" not in custom_fields
+            or "thesis:place" not in custom_fields
+        ):
+            return
+        SubElement = etree.SubElement
+        degree = SubElement(parent, self.thesis_degree)
+        SubElement(degree, self.thesis_level).text = custom_fields["thesis:level"][
+            "id"
+        ]
+        grantor = SubElement(degree, self.thesis_grantor)
+        institution = SubElement(grantor, self.cc_institution)
+        SubElement(institution, self.cc_name).text = custom_fields[
+            "thesis:organisation"
+        ]
+        SubElement(institution, self.cc_place).text = custom_fields["thesis:place"]
+
+    def add_licences(self, parent, mrights):
+        """Add ``ddb:licence`` elements for the record's rights."""
+        SubElement = etree.SubElement
+        if mrights is None:
+            SubElement(parent, self.ddb_licence, self.attrib_licence_access).text = (
+                "nOA"
+            )
+            SubElement(
+                parent, self.ddb_licence, self.attrib_licence_otherscheme
+            ).text = "Keine Angabe"
+            SubElement(parent, self.ddb_licence, self.attrib_licence_url).text = (
+                "Keine Angabe"
             )
-            thesis_level.text = custom_fields['thesis:level']['id']
-            thesis_grantor = etree.SubElement(
-                thesis_degree, "{http://www.ndltd.org/standards/metadata/etdms/1.0/}grantor",
-                nsmap=nsmap
+            return
+        for mright in mrights:
+            SubElement(parent, self.ddb_licence, self.attrib_licence_access).text = (
+                "OA"
             )
-            grantor_institution = etree.SubElement(thesis_grantor,
-                                           "{http://www.d-nb.de/standards/cc/}universityOrInstitution",
-                                           nsmap=nsmap)
-            grantor_ccname = etree.SubElement(
-                grantor_institution, "{http://www.d-nb.de/standards/cc/}name",
-                nsmap=nsmap)
-            grantor_ccname.text = custom_fields['thesis:organisation']
-            grantor_ccplace = etree.SubElement(
-                grantor_institution, "{http://www.d-nb.de/standards/cc/}place",
-                nsmap=nsmap)
-            grantor_ccplace.text = custom_fields['thesis:place']
-
-    ddbtransfer = etree.SubElement(
-        xmetadiss, "{http://www.d-nb.de/standards/ddb/}transfer",
-        nsmap=nsmap,
-        attrib={'{http://www.d-nb.de/standards/ddb/}type': 'dcterms:URI'})
-    ddbtransfer.text = current_app.config.get("SITE_API_URL") + "/records/" \
-                           + record['_source']['id'] + "/files-archive"
-
-    ddbidentifier = etree.SubElement(
-        xmetadiss, "{http://www.d-nb.de/standards/ddb/}identifier",
-        nsmap=nsmap,
-        attrib={'{http://www.d-nb.de/standards/ddb/}type': 'URL'})
-    ddbidentifier.text = current_app.config.get("SITE_UI_URL") + "/records/" \
-                           + record['_source']['id']
-    if urn is not None and doi is not None:
-        ddbidentifier = etree.SubElement(
-            xmetadiss, "{http://www.d-nb.de/standards/ddb/}identifier",
-            nsmap=nsmap,
-            attrib={'{http://www.d-nb.de/standards/ddb/}type': 'DOI'})
-        ddbidentifier.text = doi
-
-    if 'identifiers' in metadata:
-        for midentifier in metadata['identifiers']:
-            identifier = midentifier['identifier']
-            scheme = 'other'
-            if midentifier['scheme'] == 'url':
-                scheme = 'URL'
-            elif midentifier['scheme'] == 'urn':
-                scheme = 'URN'
-            elif midentifier['scheme'] == 'doi':
-                scheme = 'DOI'
-            elif midentifier['scheme'] == 'handle':
-                scheme = 'handle'
-            elif midentifier['scheme'] == 'isbn':
-                scheme = 'ISBN'
-            ddbidentifier = etree.SubElement(
-                xmetadiss, "{http://www.d-nb.de/standards/ddb/}identifier",
-                nsmap=nsmap,
-                attrib={'{http://www.d-nb.de/standards/ddb/}type': scheme})
-            ddbidentifier.text = identifier
-
-    maccess = record['_source']['access']
-    kind = 'free'
-    if maccess['files'] == 'restricted':
-        kind = 'domain'
-    ddbrights = etree.SubElement(
-        xmetadiss, "{http://www.d-nb.de/standards/ddb/}rights",
-        nsmap=nsmap,
-        attrib={'{http://www.d-nb.de/standards/ddb/}kind': kind})
-    if 'rights' in metadata:
-        for mright in metadata['rights']:
-            access = etree.SubElement(
-                xmetadiss,
-                "{http://www.d-nb.de/standards/ddb/}licence",
-                nsmap=nsmap,
-                attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'access'})
-            access.text = 'OA'
-            if 'cc' in mright['id']:
-                cc = etree.SubElement(
-                    xmetadiss,
-                    "{http://www.d-nb.de/standards/ddb/}licence",
-                    nsmap=nsmap,
-                    attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'cc'})
-                cc.text = mright['id']
+            if "cc" in mright["id"]:
+                SubElement(parent, self.ddb_licence, self.attrib_licence_cc).text = (
+                    mright["id"]
+                )
             else:
-                other_scheme = etree.SubElement(
-                    xmetadiss,
-                    "{http://www.d-nb.de/standards/ddb/}licence",
-                    nsmap=nsmap,
-                    attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'noScheme'})
-                if 'de' in mright['title']:
-                    other_scheme.text = mright['title']['de']
-                else:
-                    other_scheme.text = mright['title']['en']
-            lic_url = etree.SubElement(
-                    xmetadiss,
-                    "{http://www.d-nb.de/standards/ddb/}licence",
-                    nsmap=nsmap,
-                    attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'URL'})
-            lic_url.text = mright['props']['url']
-    else:
-        access = etree.SubElement(
-            xmetadiss,
-            "{http://www.d-nb.de/standards/ddb/}licence",
-            nsmap=nsmap,
-            attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'access'})
-        access.text = 'nOA'
-        other_scheme = etree.SubElement(
-            xmetadiss,
-            "{http://www.d-nb.de/standards/ddb/}licence",
-            nsmap=nsmap,
-            attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'otherScheme'})
-        other_scheme.text = 'Keine Angabe'
-        lic_url = etree.SubElement(
-            xmetadiss,
-            "{http://www.d-nb.de/standards/ddb/}licence",
-            nsmap=nsmap,
-            attrib={'{http://www.d-nb.de/standards/ddb/}licenceType': 'URL'})
-        lic_url.text = 'Keine Angabe'
-
-    return xmetadiss
-
-
-def add_dctype(parent, nsmap, metadata, mapping, type):
-    print(mapping)
-    props = get_vocabulary_props(
-        "resourcetypes",
-        [
-            "props." + mapping,
-        ],
-        metadata["resource_type"]["id"],
+                title = mright["title"]
+                SubElement(
+                    parent, self.ddb_licence, self.attrib_licence_noscheme
+                ).text = (title["de"] if "de" in title else title["en"])
+            SubElement(parent, self.ddb_licence, self.attrib_licence_url).text = (
+                mright["props"]["url"]
+            )
+
+
+def _prebuilt_fragment(ext, record):
+    """Stored or cached fragment of a search result and its cache key.
+
+    A stored fragment built by another generation of the builder is ignored.
+    """
+    source = record["_source"]
+    stored = source.get(FRAGMENT_FIELD)
+    cache = ext.xmetadiss_cache
+    if stored is None and cache is None:
+        return None, None
+    generation = ext.xmetadiss_builder.generation(source)
+    if stored is not None and source.get(GENERATION_FIELD) == generation:
+        return stored.encode("utf-8"), None
+    if cache is None:
+        return None, None
+    key = fragment_key(record, generation)
+    if key is None:
+        return None, None
+    return cache.get(key), key
+
+
+def build_fragment(builder, source):
+    """Serialize source, returns the fragment and the seconds it took."""
+    start = time.perf_counter()
+    fragment = etree.tostring(
+        builder.build(source), encoding="UTF-8", xml_declaration=False
+    )
+    return fragment, time.perf_counter() - start
+
+
+def sample_validation(record_id, xmetadiss):
+    """Validate a sample of the built xMetaDiss against the schema.
+
+    Violated rules are logged and counted in the ``xmetadiss_invalid``
+    metric.
+    """
+    rate = current_app.config.get("XMETADISS_VALIDATION_SAMPLE_RATE", 0)
+    if not rate or random.random() >= rate:
+        return
+    try:
+        validator = current_app.extensions["invenio_dnb_urn"].xmetadiss_validator
+        errors = validator.validate(xmetadiss)
+    except Exception:
+        logger.warning("Could not validate xMetaDiss", exc_info=True)
+        return
+    for rule, _ in errors:
+        metrics.inc("xmetadiss_invalid", rule=rule)
+    if errors:
+        logger.warning(
+            f"Invalid xMetaDiss of record {record_id}: "
+            + "; ".join(message for _, message in errors)
+        )
+
+
+def xmetadiss_fragment(record):
+    """Serialized xMetaDissPlus of a search result.
+
+    Taken from the search document when it was precomputed at index time,
+    otherwise served from the fragment cache when one is configured and the
+    record's revision was serialized before.
+    """
+    ext = current_app.extensions["invenio_dnb_urn"]
+    fragment, key = _prebuilt_fragment(ext, record)
+    if fragment is not None:
+        return fragment
+    fragment, seconds = build_fragment(ext.xmetadiss_builder, record["_source"])
+    metrics.observe("xmetadiss_build", seconds)
+    sample_validation(record["_source"].get("id"), fragment)
+    if key is not None:
+        ext.xmetadiss_cache.set(key, fragment, seconds)
+    return fragment
+
+
+def xmetadiss_fragments(records, pool=None):
+    """Serialized xMetaDissPlus of a page of search results, in order.
+
+    Records which are neither stored nor cached are serialized in the
+    serializer pool when one is configured and the page is large enough.
+
+    :param pool: serializer pool used instead of the configured one.
+    """
+    ext = current_app.extensions["invenio_dnb_urn"]
+    pool = pool or ext.serializer_pool
+    if pool is None or len(records) < pool.min_page_size:
+        for record in records:
+            yield xmetadiss_fragment(record)
+        return
+
+    prebuilt = [_prebuilt_fragment(ext, record) for record in records]
+    built = pool.serialize(
+        ext.xmetadiss_builder,
+        [r["_source"] for r, (f, _) in zip(records, prebuilt) if f is None],
     )
-    dctype = etree.SubElement(
-        parent, "{http://purl.org/dc/elements/1.1/}type",
-        nsmap=nsmap,
-        attrib={'{http://www.w3.org/2001/XMLSchema-instance}type': type})
-    mapped_type = props.get(mapping)
-    dctype.text = mapped_type
-    return parent
+    for record, (fragment, key) in zip(records, prebuilt):
+        if fragment is None:
+            fragment, seconds = next(built)
+            metrics.observe("xmetadiss_build", seconds, pool="true")
+            sample_validation(record["_source"].get("id"), fragment)
+            if key is not None:
+                ext.xmetadiss_cache.set(key, fragment, seconds)
+        yield fragment
+
+
+def xmetadiss_etree(pid, record):
+    """OAI xMetaDissPlus XML format for OAI-PMH.
+
+    It assumes that record is a search result.
+    """
+    debug_event("xmetadiss.record", id=record["_source"]["id"])
+    ext = current_app.extensions["invenio_dnb_urn"]
+    with metrics.timer("xmetadiss_etree"):
+        if ext.xmetadiss_cache is None and FRAGMENT_FIELD not in record["_source"]:
+            start = time.perf_counter()
+            xmetadiss = ext.xmetadiss_builder.build(record["_source"])
+            metrics.observe("xmetadiss_build", time.perf_counter() - start)
+            sample_validation(record["_source"].get("id"), xmetadiss)
+            return xmetadiss
+        return etree.fromstring(xmetadiss_fragment(record))
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Serialization of xMetaDiss pages in a process pool."""
+
+import copy
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+
+class VocabularyPropsTable:
+    """Picklable replacement of ``get_vocabulary_props`` for pool workers.
+
+    Workers run without an application context, so every vocabulary lookup
+    of a page is resolved up front and shipped along with the builder.
+    """
+
+    def __init__(self, props):
+        """Constructor."""
+        self.props = props
+
+    @staticmethod
+    def key(vocabulary, fields, id_):
+        """Lookup key of a ``get_vocabulary_props`` call."""
+        return (vocabulary, tuple(fields), id_)
+
+    def __call__(self, vocabulary, fields, id_):
+        """Return the resolved props."""
+        return self.props[self.key(vocabulary, fields, id_)]
+
+
+def _build_fragment(builder, source):
+    """Pool worker entry point."""
+    from .oai import build_fragment
+
+    return build_fragment(builder, source)
+
+
+def _validate_source(builder, directory, source):
+    """Pool worker entry point of validation."""
+    from .validation import get_validator, validate_source
+
+    return validate_source(builder, get_validator(directory), source)
+
+
+class SerializerPool:
+    """Process pool serializing the records of an OAI page.
+
+    The executor is created on first use and recreated in forked children,
+    e.g. gunicorn workers, which must not share their parent's pool.
+    """
+
+    def __init__(self, processes, min_page_size=0, chunksize=None):
+        """Constructor."""
+        self.processes = processes
+        self.min_page_size = min_page_size
+        self.chunksize = chunksize
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        """Process pool executor of the current process."""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def _worker_builder(self, builder, sources):
+        """Copy of builder with the vocabulary lookups of sources resolved."""
+        props = {}
+        for args in (
+            a for source in sources for a in builder.vocabulary_lookups(source)
+        ):
+            key = VocabularyPropsTable.key(*args)
+            if key not in props:
+                props[key] = builder.vocabulary_props(*args)
+
+        worker_builder = copy.copy(builder)
+        worker_builder.vocabulary_props = VocabularyPropsTable(props)
+        return worker_builder
+
+    def _map(self, func, sources):
+        chunksize = self.chunksize or max(1, len(sources) // (self.processes * 4))
+        return self.executor.map(func, sources, chunksize=chunksize)
+
+    def serialize(self, builder, sources):
+        """Serialize sources, yields ``(fragment, seconds)`` in order."""
+        worker_builder = self._worker_builder(builder, sources)
+        return self._map(partial(_build_fragment, worker_builder), sources)
+
+    def validate(self, builder, sources, directory):
+        """Validate the xMetaDiss of sources, yields ``(id, errors)`` in order.
+
+        :param directory: local mirror of the schemas.
+        """
+        worker_builder = self._worker_builder(builder, sources)
+        return self._map(partial(_validate_source, worker_builder, directory), sources)
+
+    def shutdown(self):
+        """Shut the pool down."""
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown()
+            self._executor = None
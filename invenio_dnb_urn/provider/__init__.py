@@ -5,10 +5,10 @@
 # Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
 # it under the terms of the MIT License; see LICENSE file for more details.
 
-from .dnburn import DNBUrnClient
-from .dnburn import DnbUrnProvider
+from .dnburn import DNBUrnClient, DnbUrnProvider, get_dnb_urn_provider
 
 __all__ = (
     "DNBUrnClient",
     "DnbUrnProvider",
+    "get_dnb_urn_provider",
 )
@@ -6,13 +6,20 @@
 # under the terms of the MIT License; see LICENSE file for more details.
 
 import json
+import os
+import threading
 import warnings
 
-from dnb_urn_service import DNBUrnServiceRESTClient
-from dnb_urn_service.errors import DNBURNServiceError
+import requests
 from flask import current_app
 from invenio_pidstore.models import PIDStatus
 from invenio_rdm_records.services.pids.providers import PIDProvider
+from requests.adapters import HTTPAdapter
+
+from ..urn import add_check_digit, validate_urns
+
+# dnb-urn-service imports idutils, which is slow to import. The DNB client,
+# its errors and the outbox model are imported when DNB is first called.
 
 
 class DNBUrnClient:
@@ -23,6 +30,11 @@ class DNBUrnClient:
         self.name = name
         self._config_prefix = config_prefix or "URN_DNB"
         self._api = None
+        self._session = None
+        self._session_pid = None
+        self._caller = None
+        self._options = None
+        self._lock = threading.Lock()
 
     def cfgkey(self, key):
         """Generate a configuration key."""
@@ -39,7 +51,20 @@ class DNBUrnClient:
         if not prefix:
             raise RuntimeError("Invalid URN prefix configured.")
         urn_format = self.cfg("format", "{prefix}-{id}")
-        return urn_format.format(prefix=prefix, id=record.pid.pid_value)
+        urn = urn_format.format(prefix=prefix, id=record.pid.pid_value)
+        if self.cfg("check_digit", False):
+            urn = add_check_digit(urn)
+        return urn
+
+    def validate_urns(self, urns, with_check_digit=False):
+        """Validate URNs locally, returns the errors of invalid ones by URN.
+
+        The check digit is only verified with ``with_check_digit``, URNs
+        minted before ``URN_DNB_CHECK_DIGIT`` was enabled have none.
+        """
+        return validate_urns(
+            urns, prefix=self.cfg("id_prefix"), with_check_digit=with_check_digit
+        )
 
     def check_credentials(self, **kwargs):
         """Returns if the client has the credentials properly set up.
@@ -53,16 +78,89 @@ class DNBUrnClient:
                 UserWarning,
             )
 
+    def _session_options(self):
+        """Session settings, read once as sessions may be created in threads."""
+        return {
+            "auth": (
+                str(self.cfg("username")).encode("utf-8"),
+                str(self.cfg("password")).encode("utf-8"),
+            ),
+            "pool_size": self.cfg("pool_size", 10),
+            "keep_alive": self.cfg("keep_alive", True),
+        }
+
+    def _create_session(self, auth, pool_size, keep_alive):
+        """Create a session with a sized connection pool."""
+        session = requests.Session()
+        session.auth = auth
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    @property
+    def session(self):
+        """HTTP session of the current process.
+
+        Sessions are not shared with forked children, e.g. gunicorn or Celery
+        workers, which get a new session on first use.
+        """
+        if self._options is None:
+            self._options = self._session_options()
+        with self._lock:
+            if self._session is None or self._session_pid != os.getpid():
+                self._session = self._create_session(**self._options)
+                self._session_pid = os.getpid()
+            return self._session
+
+    @property
+    def session_stats(self):
+        """Requests sent and connections opened by the current process."""
+        if self._session is None or self._session_pid != os.getpid():
+            return {"requests": 0, "connections": 0, "reused": 0}
+        from .http import session_stats
+
+        return session_stats(self._session)
+
+    @property
+    def caller(self):
+        """Retrying circuit breaker all DNB requests go through."""
+        if self._caller is None:
+            from .resilience import ResilientCaller
+
+            self._caller = ResilientCaller(
+                retries=self.cfg("retries", 3),
+                backoff=self.cfg("retry_backoff", 0.5),
+                max_backoff=self.cfg("retry_max_backoff", 8.0),
+                failure_threshold=self.cfg("breaker_threshold", 5),
+                reset_timeout=self.cfg("breaker_reset_timeout", 60.0),
+            )
+        return self._caller
+
+    @property
+    def resilience_stats(self):
+        """Circuit breaker state, retries and rejected calls."""
+        return self.caller.stats
+
     @property
     def api(self):
         """DNB URN Service API client instance."""
         if self._api is None:
             self.check_credentials()
-            self._api = DNBUrnServiceRESTClient(
+            self._options = self._session_options()
+            from .http import DNBUrnServiceSessionClient
+
+            self._api = DNBUrnServiceSessionClient(
+                lambda: self.session,
                 self.cfg("username"),
                 self.cfg("password"),
                 self.cfg("id_prefix"),
                 self.cfg("test_mode", True),
+                url=self.cfg("url"),
+                timeout=(self.cfg("connect_timeout", 5), self.cfg("read_timeout", 30)),
+                caller=self.caller,
             )
         return self._api
 
@@ -91,8 +189,14 @@ class DnbUrnProvider(PIDProvider):
     @staticmethod
     def _log_errors(errors):
         """Log errors from DNBURNServiceError class."""
-        # DNBURNServiceError is a tuple with the errors on the first
-        errors = json.loads(errors.args[0])["errors"]
+        # DNBURNServiceError is a tuple with the errors on the first, but
+        # dnb-urn-service raises the bare error classes and HttpError wraps
+        # the requests exception.
+        try:
+            errors = json.loads(errors.args[0])["errors"]
+        except (IndexError, KeyError, TypeError, ValueError):
+            current_app.logger.warning(f"Error: {errors!r}")
+            return
         for error in errors:
             field = error["source"]
             reason = error["title"]
@@ -103,6 +207,25 @@ class DnbUrnProvider(PIDProvider):
         # Delegate to client
         return self.client.generate_urn(record)
 
+    def url_unchanged(self, urn, url):
+        """Whether the URL is the last one sent to DNB for the URN.
+
+        Always ``False`` unless ``URN_DNB_SKIP_UNCHANGED_URLS`` is enabled.
+        """
+        if not self.client.cfg("skip_unchanged_urls"):
+            return False
+        from ..models import DnbUrnPushedUrl
+
+        return DnbUrnPushedUrl.is_current(urn, url)
+
+    def url_pushed(self, urn, url):
+        """Record a URL successfully sent to DNB, in the current transaction."""
+        if not self.client.cfg("skip_unchanged_urls"):
+            return
+        from ..models import DnbUrnPushedUrl
+
+        DnbUrnPushedUrl.record(urn, url)
+
     def can_modify(self, pid, **kwargs):
         """Checks if the PID can be modified."""
         return not pid.is_registered() and not pid.is_reserved()
@@ -120,38 +243,88 @@ class DnbUrnProvider(PIDProvider):
         if not local_success:
             return False
 
+        if self.client.cfg("outbox"):
+            from ..models import DnbUrnJob
+
+            DnbUrnJob.enqueue(DnbUrnJob.CREATE, pid.pid_value, url)
+            return True
+
+        from dnb_urn_service.errors import DNBURNServiceError, HttpError
+
         try:
             self.client.api.create_urn(url=url, urn=pid.pid_value)
+            self.url_pushed(pid.pid_value, url)
             return True
-        except DNBURNServiceError as e:
+        except (DNBURNServiceError, HttpError) as e:
             current_app.logger.warning(
                 "DNBURN provider error when " f"registering URN for {pid.pid_value}"
             )
             self._log_errors(e)
             return False
 
-    def update(self, pid, url=None, **kwargs):
+    def update(self, pid, url=None, force=False, **kwargs):
         """Update url associated with a URN.
 
-        This can be called after a URN is registered.
+        This can be called after a URN is registered. The URL is not sent
+        again if it was the last one sent for the URN, see
+        ``URN_DNB_SKIP_UNCHANGED_URLS``.
         :param pid: the PID to register.
+        :param force: send the URL even if it did not change.
         :returns: `True` if is updated successfully.
         """
-        try:
-            self.client.api.modify_urn(urn=pid.pid_value, url=url)
-        except DNBURNServiceError as e:
-            current_app.logger.warning(
-                "DNBURN provider error when " f"updating URL for {pid.pid_value}"
-            )
-            self._log_errors(e)
+        if self.client.cfg("outbox"):
+            from ..models import DnbUrnJob
+
+            # A pending job may still send another URL.
+            if (
+                force
+                or DnbUrnJob.is_pending(pid.pid_value)
+                or not self.url_unchanged(pid.pid_value, url)
+            ):
+                DnbUrnJob.enqueue(DnbUrnJob.MODIFY, pid.pid_value, url)
+            if pid.is_deleted():
+                return pid.sync_status(PIDStatus.REGISTERED)
+            return True
 
-            return False
+        from dnb_urn_service.errors import DNBURNServiceError, HttpError
+
+        if force or not self.url_unchanged(pid.pid_value, url):
+            try:
+                self.client.api.modify_urn(urn=pid.pid_value, url=url)
+            except (DNBURNServiceError, HttpError) as e:
+                current_app.logger.warning(
+                    "DNBURN provider error when " f"updating URL for {pid.pid_value}"
+                )
+                self._log_errors(e)
+
+                return False
+            self.url_pushed(pid.pid_value, url)
 
         if pid.is_deleted():
             return pid.sync_status(PIDStatus.REGISTERED)
 
         return True
 
+    def send(self, job):
+        """Send a queued outbox job to DNB.
+
+        A creation of a URN which already exists at DNB is sent again as an
+        update of its URL.
+        """
+        from dnb_urn_service.errors import DNBURNServiceConflictError
+
+        from ..models import DnbUrnJob
+
+        if job.action == DnbUrnJob.CREATE:
+            try:
+                self.client.api.create_urn(url=job.url, urn=job.urn)
+                self.url_pushed(job.urn, job.url)
+                return
+            except DNBURNServiceConflictError:
+                pass
+        self.client.api.modify_urn(url=job.url, urn=job.urn)
+        self.url_pushed(job.urn, job.url)
+
     def delete(self, pid, **kwargs):
         """Delete/unregister a registered URN.
 
@@ -173,9 +346,14 @@ class DnbUrnProvider(PIDProvider):
 
         # Format check
         if identifier is not None:
-            try:
-                self.client.api.check_urn(identifier)
-            except ValueError as e:
-                errors.append(str(e))
+            errors.extend(self.client.validate_urns([identifier]).get(identifier, []))
 
         return not bool(errors), errors
+
+
+def get_dnb_urn_provider():
+    """The configured DNB URN provider of the current app."""
+    for provider in current_app.config.get("RDM_PERSISTENT_IDENTIFIER_PROVIDERS", []):
+        if isinstance(provider, DnbUrnProvider):
+            return provider
+    return DnbUrnProvider("urn")
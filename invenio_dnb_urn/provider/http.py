@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""DNB URN service client sending its requests through a pooled session."""
+
+import ssl
+import time
+
+from dnb_urn_service import DNBUrnServiceRESTClient
+from dnb_urn_service.errors import DNBURNServiceConflictError, HttpError
+from dnb_urn_service.request import DNBUrnServiceRequest
+from requests.exceptions import RequestException
+
+from ..metrics import metrics
+
+
+class DNBUrnServiceSessionRequest(DNBUrnServiceRequest):
+    """Request helper using a ``requests.Session`` instead of ``requests``."""
+
+    def __init__(self, session, **kwargs):
+        """Constructor."""
+        super().__init__(**kwargs)
+        self.session = session
+
+    def request(self, url, method="GET", body=None, params=None, headers=None):
+        """Make a request."""
+        params = dict(params or {}, **self.default_params)
+        if self.base_url:
+            url = self.base_url + url
+        if body and isinstance(body, str):
+            body = body.encode("utf-8")
+
+        try:
+            return self.session.request(
+                method,
+                url,
+                data=body,
+                params=params,
+                headers=headers,
+                timeout=self.timeout,
+            )
+        except (RequestException, ssl.SSLError) as e:
+            raise HttpError(e)
+
+
+class DNBUrnServiceSessionClient(DNBUrnServiceRESTClient):
+    """DNB URN service API client reusing pooled connections."""
+
+    def __init__(self, session, *args, caller=None, **kwargs):
+        """Constructor.
+
+        :param session: returns the ``requests.Session`` of the current
+            process, credentials are expected to be set on the session.
+        :param caller: :class:`~.resilience.ResilientCaller` sending the
+            requests.
+        """
+        super().__init__(*args, **kwargs)
+        self.session = session
+        self.caller = caller
+
+    def _call(self, func, *args):
+        """Send a request through the resilient caller if there is one."""
+        operation = func.__name__
+        start = time.perf_counter()
+        try:
+            if self.caller is None:
+                return func(*args)
+            return self.caller.call(func, *args)
+        except Exception as e:
+            metrics.inc("dnb_errors", operation=operation, error=type(e).__name__)
+            raise
+        finally:
+            metrics.observe(
+                "dnb_request", time.perf_counter() - start, operation=operation
+            )
+
+    def get_urn(self, urn):
+        """Get the URL where the resource pointed by the URN is located."""
+        return self._call(super().get_urn, urn)
+
+    def head_urn(self, urn):
+        """Check if a URN is registered."""
+        return self._call(super().head_urn, urn)
+
+    def post_urn(self, data):
+        """Post a new JSON payload to DNB.
+
+        POSTs are not idempotent: a retried POST conflicts if an earlier
+        attempt registered the URN although its response was lost. Such a
+        conflict is taken as success if DNB has the URN with the posted URL.
+        """
+        attempts = 0
+        post_urn = super().post_urn
+
+        def post(data):
+            nonlocal attempts
+            attempts += 1
+            return post_urn(data)
+
+        post.__name__ = post_urn.__name__
+        try:
+            return self._call(post, data)
+        except DNBURNServiceConflictError:
+            if attempts < 2 or not self._registered_with(data):
+                raise
+            return data["urn"]
+
+    def _registered_with(self, data):
+        """Whether DNB has the URN of a POST payload with its first URL."""
+        try:
+            return self.get_urn(data["urn"]) == data["urls"][0]["url"]
+        except Exception:
+            return False
+
+    def patch_urn(self, urn, data):
+        """Patch a new JSON payload to DNB."""
+        return self._call(super().patch_urn, urn, data)
+
+    def patch_urls(self, urn, data):
+        """Patch a new JSON payload to patch the URL's at DNB."""
+        return self._call(super().patch_urls, urn, data)
+
+    def _create_request(self):
+        """Create a new Request object."""
+        return DNBUrnServiceSessionRequest(
+            self.session(),
+            base_url=self.api_url,
+            username=self.username,
+            password=self.password,
+            timeout=self.timeout,
+        )
+
+    def modify_urn(self, url, urn):
+        """Replace the URL of an existing urn.
+
+        :param url: URL where the urn will resolve.
+        :param urn: URN (e.g. urn:nbn:de:hbz:6-1234)
+        """
+        # The payload built by dnb-urn-service is a set containing a list,
+        # which raises a TypeError.
+        return self.patch_urls(urn, [{"url": url, "priority": 10}])
+
+
+def session_stats(session):
+    """Requests sent and connections opened by the pools of a session."""
+    requests = connections = 0
+    for adapter in set(session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                requests += pool.num_requests
+                connections += pool.num_connections
+    return {
+        "requests": requests,
+        "connections": connections,
+        "reused": requests - connections if requests > connections else 0,
+    }
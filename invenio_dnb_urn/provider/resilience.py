@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify it
+# under the terms of the MIT License; see LICENSE file for more details.
+
+"""Retries and circuit breaker for DNB URN service calls."""
+
+import random
+import threading
+import time
+
+from dnb_urn_service.errors import DNBURNServiceServerError, HttpError
+
+TRANSIENT_ERRORS = (HttpError, DNBURNServiceServerError)
+"""Errors worth a retry: connection problems, timeouts and 5XX responses."""
+
+
+class CircuitOpenError(HttpError):
+    """Raised without calling DNB while the circuit breaker is open."""
+
+
+class ResilientCaller:
+    """Calls DNB with jittered exponential backoff behind a circuit breaker.
+
+    The breaker opens after ``failure_threshold`` consecutive calls failed
+    with transient errors, including their retries. While it is open calls
+    fail immediately with :class:`CircuitOpenError`. After ``reset_timeout``
+    seconds a single trial call is let through: it closes the breaker on
+    success and opens it again on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        retries=3,
+        backoff=0.5,
+        max_backoff=8.0,
+        failure_threshold=5,
+        reset_timeout=60.0,
+    ):
+        """Constructor."""
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.counters = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "rejected": 0,
+            "opened": 0,
+        }
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        """Check whether a call may be sent."""
+        with self._lock:
+            self.counters["calls"] += 1
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError("DNB URN service circuit breaker is open.")
+                self.state = self.HALF_OPEN
+                self._trial = False
+            if self.state == self.HALF_OPEN:
+                if self._trial:
+                    self.counters["rejected"] += 1
+                    raise CircuitOpenError("DNB URN service circuit breaker is open.")
+                self._trial = True
+
+    def _record(self, success):
+        """Update the breaker with the outcome of a call."""
+        with self._lock:
+            if success:
+                self.state = self.CLOSED
+                self.failures = 0
+                return
+            self.counters["failures"] += 1
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.counters["opened"] += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number ``attempt``, with full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def call(self, func, *args, **kwargs):
+        """Call ``func``, retrying transient errors."""
+        self._acquire()
+        attempt = 0
+        while True:
+            try:
+                result = func(*args, **kwargs)
+            except TRANSIENT_ERRORS:
+                if attempt >= self.retries:
+                    self._record(False)
+                    raise
+            except Exception:
+                # DNB answered, e.g. with a 4XX error, so it is healthy.
+                self._record(True)
+                raise
+            else:
+                self._record(True)
+                return result
+            time.sleep(self.delay(attempt))
+            attempt += 1
+            with self._lock:
+                self.counters["retries"] += 1
+
+    @property
+    def stats(self):
+        """Breaker state and call counters."""
+        with self._lock:
+            return dict(
+                self.counters, state=self.state, consecutive_failures=self.failures
+            )
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Reconciliation of local URN PIDs with the DNB registry."""
+
+from dnb_urn_service.errors import DNBURNServiceUrnNotRegisteredError
+
+MISSING = "missing"
+"""The URN is not registered at DNB."""
+
+STALE = "stale"
+"""The URN is registered at DNB with another landing page URL."""
+
+UNKNOWN = "unknown"
+"""The URN is registered at DNB, but its local PID is not marked as registered.
+
+DNB cannot list the URNs of a prefix, so URNs registered at DNB without any
+local PID, i.e. orphaned at DNB, cannot be found and are not reported.
+"""
+
+
+def compare(api, urn, url, registered):
+    """Compare a local URN with DNB.
+
+    :param registered: whether the local PID is marked as registered.
+    :returns: ``(difference, remote url)``, the difference is ``None`` if
+        both are in sync.
+    """
+    try:
+        remote_url = api.get_urn(urn)
+    except DNBURNServiceUrnNotRegisteredError:
+        return MISSING, None
+    if not registered:
+        return UNKNOWN, remote_url
+    if remote_url != url:
+        return STALE, remote_url
+    return None, remote_url
+
+
+def repair(api, difference, urn, url, remote_url):
+    """Register the URN or its landing page URL at DNB."""
+    if difference == MISSING:
+        api.create_urn(url=url, urn=urn)
+    elif remote_url != url:
+        api.modify_urn(url=url, urn=urn)
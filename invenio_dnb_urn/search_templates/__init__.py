@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Search templates adding the xMetaDiss fields to the record indices."""
+
+
+def register_templates():
+    """Template modules of the ``invenio_search.templates`` entry point."""
+    return ["invenio_dnb_urn.search_templates"]
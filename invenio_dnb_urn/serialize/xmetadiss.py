@@ -7,10 +7,15 @@
 
 """xMetaDissPlus-based data model for Invenio."""
 
-from invenio_rdm_records.oaiserver.resources.config import OAIPMHServerResourceConfig
-from invenio_rdm_records.oaiserver.resources.resources import OAIPMHServerResource
-from invenio_rdm_records.oaiserver.services.config import OAIPMHServerServiceConfig
-from invenio_rdm_records.oaiserver.services.services import OAIPMHServerService
+import os
+
+from flask import current_app
+from invenio_base.utils import obj_or_import_string
+from werkzeug.utils import cached_property
+
+from .. import config
+from ..metrics import metrics
+from ..utils import invalidate_vocabulary_props, vocabulary_props_cache
 
 
 class InvenioSerializerXMetaDissPlus(object):
@@ -22,38 +27,134 @@ class InvenioSerializerXMetaDissPlus(object):
             self.init_app(app)
 
     def init_app(self, app):
+        # Services, resources and the xMetaDiss builder are created on first
+        # use, so that CLI invocations and worker boot don't pay for them.
         self.init_config(app)
-        self.init_services(app)
-        self.init_resource(app)
+        self.init_vocabulary_cache(app)
+        self.init_indexer(app)
+        self.init_xmetadiss_cache(app)
+        self.init_serializer_pool(app)
+        self.init_thesis_types(app)
+        metrics.enabled = app.config["URN_DNB_METRICS_ENABLED"]
         app.extensions["invenio_dnb_urn"] = self
 
     def init_config(self, app):
         """Initialize configuration."""
+        for k in dir(config):
+            if k.startswith(("URN_DNB_", "XMETADISS_", "EPICUR_")):
+                app.config.setdefault(k, getattr(config, k))
 
-    def init_config(self, app):
-        """Initialize configuration."""
+    def init_vocabulary_cache(self, app):
+        """Size the vocabulary props cache and invalidate it on writes."""
+        from invenio_records.signals import (
+            after_record_delete,
+            after_record_insert,
+            after_record_update,
+        )
+
+        vocabulary_props_cache.configure(
+            maxsize=app.config["XMETADISS_VOCABULARY_CACHE_SIZE"],
+            ttl=app.config["XMETADISS_VOCABULARY_CACHE_TTL"],
+        )
+        for signal in (after_record_insert, after_record_update, after_record_delete):
+            signal.connect(invalidate_vocabulary_props, weak=False)
+
+    def init_indexer(self, app):
+        """Add the xMetaDiss fields to indexed published records."""
+        from invenio_indexer.signals import before_record_index
+        from invenio_records.signals import after_record_insert, after_record_update
+
+        from ..dumpers import index_xmetadiss, update_fingerprint
+
+        before_record_index.connect(index_xmetadiss, weak=False)
+        for signal in (after_record_insert, after_record_update):
+            signal.connect(update_fingerprint, weak=False)
+
+    def init_xmetadiss_cache(self, app):
+        """Initialize the serialized xMetaDiss cache, if configured."""
+        self.xmetadiss_cache = None
+        backend = obj_or_import_string(app.config["XMETADISS_CACHE_BACKEND"])
+        if backend is not None:
+            self.xmetadiss_cache = backend(
+                max_entries=app.config["XMETADISS_CACHE_MAX_ENTRIES"],
+                max_bytes=app.config["XMETADISS_CACHE_MAX_BYTES"],
+                ttl=app.config["XMETADISS_CACHE_TTL"],
+            )
+
+    def init_serializer_pool(self, app):
+        """Initialize the serializer process pool, if configured."""
+        self.serializer_pool = None
+        processes = app.config["XMETADISS_SERIALIZER_PROCESSES"]
+        if processes:
+            from ..parallel import SerializerPool
+
+            self.serializer_pool = SerializerPool(
+                processes,
+                min_page_size=app.config["XMETADISS_SERIALIZER_MIN_PAGE_SIZE"],
+            )
+
+    def init_thesis_types(self, app):
+        """Load the thesis type vocabulary index."""
+        from ..thesis import ThesisTypesFile
+
+        path = app.config["XMETADISS_THESIS_TYPES_FILE"] or os.path.join(
+            app.instance_path, "app_data", "vocabularies", "thesis_types.yaml"
+        )
+        self.thesis_types = ThesisTypesFile(
+            path,
+            cache_path=os.path.join(app.instance_path, "thesis_types.json"),
+            check_interval=app.config["XMETADISS_THESIS_TYPES_CHECK_INTERVAL"],
+        )
+        self.thesis_types.load()
+
+    @cached_property
+    def xmetadiss_builder(self):
+        """xMetaDiss builder compiled from the application config."""
+        from ..oai import XMetaDissBuilder
+
+        return XMetaDissBuilder.from_app(current_app, thesis_types=self.thesis_types)
+
+    @cached_property
+    def xmetadiss_validator(self):
+        """xMetaDiss validator, the schema is compiled once per process."""
+        from ..validation import get_validator, schema_directory
+
+        return get_validator(schema_directory(current_app))
 
     def service_configs(self, app):
         """Customized service configs."""
+        from invenio_rdm_records.oaiserver.services.config import (
+            OAIPMHServerServiceConfig,
+        )
 
         class ServiceConfigs:
             oaipmh_server = OAIPMHServerServiceConfig
 
         return ServiceConfigs
 
-    def init_services(self, app):
-        """Initialize services"""
-        service_configs = self.service_configs(app)
+    @cached_property
+    def oaipmh_server_service(self):
+        """OAI-PMH server service."""
+        from invenio_rdm_records.oaiserver.services.services import (
+            OAIPMHServerService,
+        )
 
-        self.oaipmh_server_service = OAIPMHServerService(
+        service_configs = self.service_configs(current_app)
+        return OAIPMHServerService(
             config=service_configs.oaipmh_server,
         )
 
-    def init_resource(self, app):
-        """Initialize resources"""
+    @cached_property
+    def oaipmh_server_resource(self):
+        """OAI-PMH server resource."""
+        from invenio_rdm_records.oaiserver.resources.config import (
+            OAIPMHServerResourceConfig,
+        )
+        from invenio_rdm_records.oaiserver.resources.resources import (
+            OAIPMHServerResource,
+        )
 
-        # OAI-PMH
-        self.oaipmh_server_resource = OAIPMHServerResource(
+        return OAIPMHServerResource(
             service=self.oaipmh_server_service,
             config=OAIPMHServerResourceConfig,
         )
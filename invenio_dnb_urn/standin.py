@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Local stand-in for the DNB URN service REST API.
+
+Implements the calls used by ``dnb-urn-service`` against an in-memory
+registry, with configurable latency, error rate and throttling, to test and
+load test the provider without DNB's sandbox.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .bulk import RateLimiter
+
+URN_PATH_RE = re.compile(r"^/urns/urn/(?P<urn>[^/]+)(?P<urls>/my-urls)?$")
+
+
+class TokenBucket(RateLimiter):
+    """Non-blocking variant of the rate limiter, with a burst of one second."""
+
+    def try_acquire(self):
+        """Whether a request is allowed now."""
+        if not self.interval:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now - 1.0)
+            if self._next > now:
+                return False
+            self._next += self.interval
+            return True
+
+
+class StandinRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of the DNB URN service stand-in."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        """Log requests only when the server is verbose."""
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, code, body=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.send_response(code)
+        if data:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _error(self, code, title):
+        self._send(code, {"errors": [{"source": self.path, "title": title}]})
+
+    def _handle(self, method):
+        server = self.server
+        # Always consume the body, the connection is kept alive.
+        data = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        server.count("requests")
+        if not server.throttle.try_acquire():
+            server.count("throttled")
+            return self._error(429, "Too many requests.")
+        if server.latency:
+            time.sleep(random.uniform(0, 2 * server.latency))
+        if random.random() < server.error_rate:
+            server.count("errors")
+            return self._error(503, "Service unavailable.")
+        try:
+            body = json.loads(data or "null") if method in ("POST", "PATCH") else None
+        except ValueError:
+            return self._error(400, "Invalid JSON.")
+
+        if method == "POST" and self.path == "/urns":
+            return self._create(body)
+        match = URN_PATH_RE.match(self.path)
+        if match is None:
+            return self._error(404, "Not found.")
+        urn, urls = match.group("urn"), match.group("urls")
+        with server.lock:
+            registered = server.registry.get(urn)
+        if registered is None:
+            return self._error(404, f"URN {urn} is not registered.")
+        if method == "HEAD" and not urls:
+            return self._send(200)
+        if method == "GET" and urls:
+            return self._send(200, {"items": [{"url": u} for u in registered]})
+        if method == "PATCH" and urls:
+            if not isinstance(body, list) or not all("url" in u for u in body):
+                return self._error(400, "Invalid URL list.")
+            with server.lock:
+                server.registry[urn] = [u["url"] for u in body]
+            return self._send(204)
+        if method == "PATCH":
+            return self._send(204)
+        return self._error(405, "Method not allowed.")
+
+    def _create(self, body):
+        if not isinstance(body, dict) or not body.get("urn") or not body.get("urls"):
+            return self._error(400, "Invalid URN.")
+        urn = body["urn"]
+        with self.server.lock:
+            if urn in self.server.registry:
+                return self._error(409, f"URN {urn} is already registered.")
+            self.server.registry[urn] = [u["url"] for u in body["urls"]]
+        self._send(201, {"urn": urn})
+
+    def do_GET(self):
+        """Look up the URLs of a URN."""
+        self._handle("GET")
+
+    def do_HEAD(self):
+        """Check whether a URN is registered."""
+        self._handle("HEAD")
+
+    def do_POST(self):
+        """Register a URN."""
+        self._handle("POST")
+
+    def do_PATCH(self):
+        """Modify a URN or its URLs."""
+        self._handle("PATCH")
+
+
+class StandinServer(ThreadingHTTPServer):
+    """DNB URN service stand-in.
+
+    :param latency: mean response latency in seconds, uniformly jittered.
+    :param error_rate: share of requests answered with 503.
+    :param rate_limit: requests per second above which 429 is returned.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        latency=0.0,
+        error_rate=0.0,
+        rate_limit=None,
+        verbose=False,
+    ):
+        """Constructor."""
+        super().__init__(address, StandinRequestHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle = TokenBucket(rate_limit)
+        self.verbose = verbose
+        self.registry = {}
+        self.counters = {"requests": 0, "throttled": 0, "errors": 0}
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        """Increment a request counter."""
+        with self.lock:
+            self.counters[key] += 1
+
+    @property
+    def url(self):
+        """Base URL to configure as ``URN_DNB_URL``."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        """Serve in a daemon thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""OAI-PMH responses for the xMetaDiss metadata prefix.
+
+ListRecords is streamed, GetRecord and ListIdentifiers are dated by the same
+xMetaDiss datestamp.
+"""
+
+from datetime import datetime
+from io import BytesIO
+
+from flask import current_app
+from invenio_oaiserver import query
+from invenio_oaiserver import response as xml
+from invenio_oaiserver.errors import OAINoRecordsMatchError
+from invenio_oaiserver.percolator import sets_search_all
+from invenio_oaiserver.provider import OAIIDProvider
+from invenio_oaiserver.proxies import current_oaiserver
+from invenio_oaiserver.utils import serializer
+from invenio_search import current_search_client
+from invenio_search.engine import dsl
+from lxml import etree
+
+from .dumpers import (
+    DATESTAMP_FIELD,
+    FINGERPRINT_FIELD,
+    FRAGMENT_FIELD,
+    GENERATION_FIELD,
+)
+from .oai import xmetadiss_fragments
+
+
+def metadata_prefix(args):
+    """Metadata prefix of parsed OAI-PMH arguments."""
+    if args.get("resumptionToken"):
+        return args["resumptionToken"].get("metadataPrefix")
+    return args.get("metadataPrefix")
+
+
+class SearchPagination:
+    """Page of search hits dated by a field of their source.
+
+    Provides what ``invenio_oaiserver`` needs of its own pagination to write
+    resumption tokens.
+    """
+
+    def __init__(self, response, page, per_page, datestamp_key):
+        """Constructor."""
+        self.response = response
+        self.page = page
+        self.per_page = per_page
+        self.datestamp_key = datestamp_key
+        self.total = response["hits"]["total"]["value"]
+        self._scroll_id = response.get("_scroll_id")
+
+        if self.total == 0:
+            raise OAINoRecordsMatchError()
+
+        if not self.has_next:
+            current_search_client.clear_scroll(scroll_id=self._scroll_id)
+            self._scroll_id = None
+
+    @property
+    def has_next(self):
+        """Return True if there is a next page."""
+        return self.page * self.per_page <= self.total
+
+    @property
+    def next_num(self):
+        """Return the next page number."""
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def items(self):
+        """Search hits with their datestamp as ``updated``."""
+        for result in self.response["hits"]["hits"]:
+            yield {
+                "id": result["_id"],
+                "json": result,
+                "updated": hit_datestamp(result["_source"], self.datestamp_key),
+            }
+
+
+def hit_datestamp(source, datestamp_key):
+    """Datestamp of a search document, its last update if it has none."""
+    datestamp = source.get(datestamp_key) or source[current_oaiserver.last_update_key]
+    return datetime.strptime(datestamp[:19], "%Y-%m-%dT%H:%M:%S")
+
+
+def datestamp_key(app):
+    """Source field records are selected and dated by."""
+    if app.config["XMETADISS_FINGERPRINT_ENABLED"]:
+        return DATESTAMP_FIELD
+    return current_oaiserver.last_update_key
+
+
+def source_includes(app):
+    """Search document fields fetched for xMetaDiss responses.
+
+    The fields xMetaDiss is built from, the fields of the OAI-PMH header and
+    caches, and ``XMETADISS_SOURCE_INCLUDES``.
+    """
+    from .oai import XMetaDissBuilder
+
+    return sorted(
+        {
+            *XMetaDissBuilder.source_fields,
+            *app.config["XMETADISS_SOURCE_INCLUDES"],
+            current_oaiserver.last_update_key,
+            "revision_id",
+            FRAGMENT_FIELD,
+            GENERATION_FIELD,
+            FINGERPRINT_FIELD,
+            DATESTAMP_FIELD,
+        }
+    )
+
+
+def datestamp_range(key, time_range):
+    """Query of the documents whose datestamp is in the time range.
+
+    Documents indexed before fingerprints were enabled have no xMetaDiss
+    datestamp, they are selected by their last update instead.
+    """
+    last_update_key = current_oaiserver.last_update_key
+    if key == last_update_key:
+        return dsl.Q("range", **{key: time_range})
+    return dsl.Q(
+        "bool",
+        should=[
+            dsl.Q("range", **{key: time_range}),
+            dsl.Q(
+                "bool",
+                must_not=[dsl.Q("exists", field=key)],
+                filter=[dsl.Q("range", **{last_update_key: time_range})],
+            ),
+        ],
+        minimum_should_match=1,
+    )
+
+
+def get_records(**kwargs):
+    """Page of records selected by ``from`` and ``until``.
+
+    With fingerprints enabled records are selected and dated by their
+    xMetaDiss datestamp instead of their last update, so records are only
+    harvested again when their xMetaDiss changed. With source filtering only
+    the fields needed for xMetaDiss are fetched.
+    """
+    config = current_app.config
+    fingerprints = config["XMETADISS_FINGERPRINT_ENABLED"]
+    source_filtering = config["XMETADISS_SOURCE_FILTERING"]
+    if not fingerprints and not source_filtering:
+        return query.get_records(**kwargs)
+
+    key = datestamp_key(current_app)
+    page = kwargs.get("resumptionToken", {}).get("page", 1)
+    size = config["OAISERVER_PAGE_SIZE"]
+    scroll = "{0}s".format(config["OAISERVER_RESUMPTION_TOKEN_EXPIRE_TIME"])
+    scroll_id = kwargs.get("resumptionToken", {}).get("scroll_id")
+    if scroll_id is not None:
+        # The scroll keeps the source filter of its first page.
+        response = current_search_client.scroll(scroll_id=scroll_id, scroll=scroll)
+        return SearchPagination(response, page, size, key)
+
+    search = (
+        current_oaiserver.search_cls(index=config["OAISERVER_RECORD_INDEX"])
+        .params(scroll=scroll)
+        .extra(version=True)[(page - 1) * size : page * size]
+    )
+    if source_filtering:
+        search = search.source(includes=source_includes(current_app))
+    if "set" in kwargs:
+        search = search.query(
+            current_oaiserver.set_records_query_fetcher(kwargs["set"])
+        )
+    time_range = {}
+    if "from_" in kwargs:
+        time_range["gte"] = kwargs["from_"]
+    if "until" in kwargs:
+        time_range["lte"] = kwargs["until"]
+    if time_range:
+        search = search.filter(datestamp_range(key, time_range))
+    return SearchPagination(search.execute().to_dict(), page, size, key)
+
+
+def getrecord(**kwargs):
+    """Create OAI-PMH response for verb GetRecord.
+
+    The record is read from the OAI-PMH index and dated like the records of
+    :func:`listrecords`. Records which are not indexed yet are left to
+    invenio-oaiserver.
+    """
+    config = current_app.config
+    pid = OAIIDProvider.get(pid_value=kwargs["identifier"]).pid
+    search = (
+        current_oaiserver.search_cls(index=config["OAISERVER_RECORD_INDEX"])
+        .filter("ids", values=[str(pid.object_uuid)])
+        .extra(version=True)
+    )
+    if config["XMETADISS_SOURCE_FILTERING"]:
+        search = search.source(includes=source_includes(current_app))
+    hits = search.execute().to_dict()["hits"]["hits"]
+    if not hits:
+        return xml.getrecord(**kwargs)
+    source = hits[0]["_source"]
+
+    e_tree, e_getrecord = xml.verb(**kwargs)
+    e_record = etree.SubElement(e_getrecord, etree.QName(xml.NS_OAIPMH, "record"))
+    xml.header(
+        e_record,
+        identifier=pid.pid_value,
+        datestamp=hit_datestamp(source, datestamp_key(current_app)),
+        sets=sets_search_all([source])[0],
+    )
+    e_metadata = etree.SubElement(e_record, etree.QName(xml.NS_OAIPMH, "metadata"))
+    e_metadata.append(serializer(kwargs["metadataPrefix"])(pid, hits[0]))
+    return e_tree
+
+
+def listidentifiers(**kwargs):
+    """Create OAI-PMH response for verb ListIdentifiers.
+
+    Records are selected and dated like the records of :func:`listrecords`.
+    """
+    e_tree, e_listidentifiers = xml.verb(**kwargs)
+    result = get_records(**kwargs)
+
+    all_records = list(result.items)
+    records_sets = sets_search_all([r["json"]["_source"] for r in all_records])
+    for index, record in enumerate(all_records):
+        pid = current_oaiserver.oaiid_fetcher(record["id"], record["json"]["_source"])
+        xml.header(
+            e_listidentifiers,
+            identifier=pid.pid_value,
+            datestamp=record["updated"],
+            sets=records_sets[index],
+        )
+
+    xml.resumption_token(e_listidentifiers, result, **kwargs)
+    return e_tree
+
+
+def listrecords(**kwargs):
+    """Stream the OAI-PMH response for verb ListRecords.
+
+    The search page is fetched before the first chunk is produced, so OAI
+    errors like ``noRecordsMatch`` are still raised to the caller. Records
+    are then written one at a time as serialized xMetaDiss fragments, taken
+    from the fragment cache when possible and built in the serializer pool
+    for large pages when one is configured.
+    """
+    result = get_records(**kwargs)
+    all_records = list(result.items)
+    result.response["hits"]["hits"] = []
+    records_sets = sets_search_all([r["json"]["_source"] for r in all_records])
+
+    # The envelope is small, build it with invenio-oaiserver to stay in line
+    # with the non-streaming response and write it around the records.
+    e_tree, e_listrecords = xml.verb(**kwargs)
+    e_oaipmh = e_tree.getroot()
+    e_tail = etree.Element(e_listrecords.tag, nsmap=xml.NSMAP)
+    xml.resumption_token(e_tail, result, **kwargs)
+
+    def generate():
+        buffer = BytesIO()
+
+        def flush():
+            chunk = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return chunk
+
+        with etree.xmlfile(buffer, encoding="UTF-8") as xf:
+            xf.write_declaration()
+            stylesheet = e_oaipmh.getprevious()
+            if stylesheet is not None:
+                xf.write(stylesheet)
+            with xf.element(e_oaipmh.tag, dict(e_oaipmh.attrib), e_oaipmh.nsmap):
+                for child in e_oaipmh:
+                    if child is not e_listrecords:
+                        xf.write(child)
+                with xf.element(e_listrecords.tag):
+                    # Send the envelope before the records are serialized.
+                    xf.flush()
+                    yield flush()
+                    fragments = xmetadiss_fragments([r["json"] for r in all_records])
+                    for index, record in enumerate(all_records):
+                        source = record["json"]["_source"]
+                        pid = current_oaiserver.oaiid_fetcher(record["id"], source)
+                        e_record = etree.Element(
+                            etree.QName(xml.NS_OAIPMH, "record"), nsmap=xml.NSMAP
+                        )
+                        e_header = xml.header(
+                            e_record,
+                            identifier=pid.pid_value,
+                            datestamp=record["updated"],
+                            sets=records_sets[index],
+                        )
+                        with xf.element(e_record.tag):
+                            xf.write(e_header)
+                            with xf.element(etree.QName(xml.NS_OAIPMH, "metadata")):
+                                xf.flush()
+                                buffer.write(next(fragments))
+                        yield flush()
+                    for child in e_tail:
+                        xf.write(child)
+        yield flush()
+
+    return generate()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Celery tasks."""
+
+from celery import shared_task
+from flask import current_app
+
+
+@shared_task(ignore_result=True)
+def process_outbox():
+    """Send due outbox jobs to DNB.
+
+    Jobs are claimed with ``SKIP LOCKED`` for a lease time, so several
+    workers can process the outbox at the same time, and every job is
+    committed on its own, so no locks are held while DNB is called. Failed
+    jobs are retried with exponential backoff. When a full batch was
+    processed the task queues itself again.
+    """
+    from invenio_db import db
+
+    from .models import DnbUrnJob
+    from .provider import get_dnb_urn_provider
+    from .provider.resilience import CircuitOpenError, ResilientCaller
+
+    batch_size = current_app.config["URN_DNB_OUTBOX_BATCH_SIZE"]
+    provider = get_dnb_urn_provider()
+
+    jobs = DnbUrnJob.claim(batch_size, current_app.config["URN_DNB_OUTBOX_LEASE"])
+    db.session.commit()
+    for job in jobs:
+        try:
+            provider.send(job)
+        except CircuitOpenError:
+            # DNB is down, the remaining jobs are due again after their lease.
+            current_app.logger.warning("DNB unavailable, outbox processing paused.")
+            break
+        except Exception as e:
+            db.session.rollback()
+            failed = DnbUrnJob.retry_later(
+                job,
+                e,
+                current_app.config["URN_DNB_OUTBOX_RETRY_DELAY"],
+                current_app.config["URN_DNB_OUTBOX_MAX_ATTEMPTS"],
+            )
+            log = current_app.logger.error if failed else current_app.logger.warning
+            log(f"DNB {job.action} of {job.urn} failed ({job.attempts + 1}): {e!r}")
+        else:
+            DnbUrnJob.complete(job)
+        db.session.commit()
+
+    if len(jobs) == batch_size and provider.client.caller.state != ResilientCaller.OPEN:
+        process_outbox.delay()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""In-memory index of the thesis type vocabulary."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from .metrics import logger
+
+_UNLOADED = object()
+
+ThesisType = namedtuple("ThesisType", "id title props")
+"""Entry of the thesis type vocabulary, ``title`` and ``props`` are read-only."""
+
+
+class ThesisTypes:
+    """Immutable index of thesis types by id."""
+
+    def __init__(self, entries=()):
+        """Constructor.
+
+        :param entries: vocabulary entries as in ``thesis_types.yaml``.
+        """
+        self._types = MappingProxyType(
+            {
+                entry["id"]: ThesisType(
+                    entry["id"],
+                    MappingProxyType(dict(entry.get("title") or {})),
+                    MappingProxyType(dict(entry.get("props") or {})),
+                )
+                for entry in entries
+            }
+        )
+        self.digest = hashlib.sha1(
+            json.dumps(self._entries(), sort_keys=True).encode()
+        ).hexdigest()
+
+    def _entries(self):
+        return [
+            {"id": t.id, "title": dict(t.title), "props": dict(t.props)}
+            for t in self._types.values()
+        ]
+
+    def __contains__(self, id_):
+        """Whether the thesis type exists."""
+        return id_ in self._types
+
+    def __len__(self):
+        """Number of thesis types."""
+        return len(self._types)
+
+    def get(self, id_):
+        """Thesis type of an id, ``None`` if unknown."""
+        return self._types.get(id_)
+
+    def title(self, id_, lang="en"):
+        """Title of a thesis type in a language, ``None`` if unknown."""
+        thesis_type = self._types.get(id_)
+        if thesis_type is None:
+            return None
+        return thesis_type.title.get(lang)
+
+    def dini_publtype(self, id_):
+        """DINI publication type of a thesis type, ``None`` if not mapped."""
+        thesis_type = self._types.get(id_)
+        if thesis_type is None:
+            return None
+        return thesis_type.props.get("dini_publtype")
+
+    def __reduce__(self):
+        """Pickle as the vocabulary entries."""
+        return ThesisTypes, (self._entries(),)
+
+
+class ThesisTypesFile:
+    """Thesis type index loaded from the vocabulary YAML file.
+
+    The parsed entries are stored as JSON in ``cache_path``, which is read
+    instead of the YAML as long as the file did not change. The file is
+    checked for changes at most every ``check_interval`` seconds and the
+    index is replaced when it changed. Pickles as its current index, e.g.
+    for serializer pool workers.
+    """
+
+    def __init__(self, path, cache_path=None, check_interval=30):
+        """Constructor."""
+        self.path = path
+        self.cache_path = cache_path
+        self.check_interval = check_interval
+        self.index = ThesisTypes()
+        self._signature = _UNLOADED
+        self._checked = None
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_cache(self, signature):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path) as fp:
+                cache = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        if cache.get("path") != self.path or cache.get("signature") != signature:
+            return None
+        return cache["entries"]
+
+    def _save_cache(self, signature, entries):
+        if not self.cache_path:
+            return
+        tmp_path = f"{self.cache_path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            with open(tmp_path, "w") as fp:
+                json.dump(
+                    {"path": self.path, "signature": signature, "entries": entries},
+                    fp,
+                )
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            logger.warning(f"Could not write {self.cache_path}", exc_info=True)
+
+    def load(self):
+        """(Re)load the index, returns it."""
+        with self._lock:
+            self._checked = time.monotonic()
+            signature = self._stat()
+            if signature == self._signature:
+                return self.index
+            entries = []
+            if signature is not None:
+                entries = self._load_cache(signature)
+                if entries is None:
+                    import yaml
+
+                    with open(self.path) as fp:
+                        entries = yaml.safe_load(fp) or []
+                    self._save_cache(signature, entries)
+            else:
+                logger.warning(f"Thesis types file {self.path} not found")
+            self.index = ThesisTypes(entries)
+            self._signature = signature
+            return self.index
+
+    def current(self):
+        """The index, reloaded first if the check interval passed."""
+        checked = self._checked
+        if checked is None or time.monotonic() - checked >= self.check_interval:
+            return self.load()
+        return self.index
+
+    def get(self, id_):
+        """Thesis type of an id, ``None`` if unknown."""
+        return self.current().get(id_)
+
+    def title(self, id_, lang="en"):
+        """Title of a thesis type in a language, ``None`` if unknown."""
+        return self.current().title(id_, lang)
+
+    def dini_publtype(self, id_):
+        """DINI publication type of a thesis type, ``None`` if not mapped."""
+        return self.current().dini_publtype(id_)
+
+    @property
+    def digest(self):
+        """Digest of the current entries, changes with the vocabulary."""
+        return self.current().digest
+
+    def __reduce__(self):
+        """Pickle as the current index."""
+        return self.current().__reduce__()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""URN:NBN syntax and DNB check digit."""
+
+import re
+
+# Character values of the DNB check digit algorithm.
+CHECK_DIGIT_VALUES = {
+    "0": "1",
+    "1": "2",
+    "2": "3",
+    "3": "4",
+    "4": "5",
+    "5": "6",
+    "6": "7",
+    "7": "8",
+    "8": "9",
+    "9": "41",
+    "a": "18",
+    "b": "14",
+    "c": "19",
+    "d": "15",
+    "e": "16",
+    "f": "21",
+    "g": "22",
+    "h": "23",
+    "i": "24",
+    "j": "25",
+    "k": "42",
+    "l": "26",
+    "m": "27",
+    "n": "13",
+    "o": "28",
+    "p": "29",
+    "q": "31",
+    "r": "12",
+    "s": "32",
+    "t": "33",
+    "u": "11",
+    "v": "34",
+    "w": "35",
+    "x": "36",
+    "y": "37",
+    "z": "38",
+    "-": "39",
+    ":": "17",
+    "_": "43",
+    "/": "45",
+    ".": "47",
+    "+": "49",
+}
+
+_CHECK_DIGIT_TABLE = str.maketrans(CHECK_DIGIT_VALUES)
+
+URN_NBN_RE = re.compile(
+    r"^urn:nbn:[a-z]{2}(?::[a-z0-9]+)*[:-][a-z0-9][a-z0-9\-_./+:]*$", re.IGNORECASE
+)
+
+
+def check_digit(urn):
+    """DNB check digit of a URN given without check digit."""
+    digits = urn.lower().translate(_CHECK_DIGIT_TABLE)
+    if not digits.isdigit():
+        raise ValueError(f"Invalid character in URN {urn}.")
+    checksum = sum(index * int(digit) for index, digit in enumerate(digits, 1))
+    return str(checksum // int(digits[-1]) % 10)
+
+
+def add_check_digit(urn):
+    """Append the DNB check digit to a URN."""
+    return urn + check_digit(urn)
+
+
+def validate_urn(urn, prefix=None, with_check_digit=True):
+    """Validate a URN:NBN.
+
+    :param prefix: URN prefix the URN is expected to start with.
+    :param with_check_digit: whether the last character is a DNB check digit.
+    :returns: a list of error messages, empty for a valid URN.
+    """
+    errors = []
+    if not URN_NBN_RE.match(urn):
+        errors.append(f"{urn} is not a valid URN:NBN.")
+        return errors
+    if prefix and not urn.lower().startswith(prefix.lower()):
+        errors.append(f"Wrong URN {urn} prefix provided, it should be {prefix}.")
+    if with_check_digit and check_digit(urn[:-1]) != urn[-1]:
+        errors.append(f"Invalid check digit of URN {urn}.")
+    return errors
+
+
+def validate_urns(urns, prefix=None, with_check_digit=True):
+    """Validate many URNs, returns the errors of the invalid ones by URN."""
+    invalid = {}
+    for urn in urns:
+        errors = validate_urn(urn, prefix=prefix, with_check_digit=with_check_digit)
+        if errors:
+            invalid[urn] = errors
+    return invalid
@@ -7,27 +7,132 @@
 
 """Helpers for serializers."""
 
-from invenio_access.permissions import system_identity
-from invenio_search.engine import dsl
-from invenio_vocabularies.proxies import current_service as vocabulary_service
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
 
 from .errors import VocabularyItemNotFoundError
 
 
+class VocabularyPropsCache:
+    """Process-wide, size bounded cache for vocabulary props.
+
+    Entries are keyed by ``(vocabulary, fields, id)`` and expire after
+    ``ttl`` seconds. The least recently used entry is evicted once
+    ``maxsize`` entries are stored.
+
+    The cache is local to the process. Writes to a vocabulary only
+    invalidate the cache of the process handling them, other web and Celery
+    worker processes keep serving the old props until their entries expire.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        """Constructor."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        """Change size bound and TTL, dropping all cached entries."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            if ttl is not None:
+                self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, key):
+        """Return the cached props for key or ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, props = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return props
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, props):
+        """Store props for key."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, props)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, vocabulary=None):
+        """Drop the entries of a vocabulary, or all entries."""
+        with self._lock:
+            if vocabulary is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == vocabulary]:
+                del self._entries[key]
+
+    @property
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+
+vocabulary_props_cache = VocabularyPropsCache()
+"""Vocabulary props cache shared by all serializer calls of a process."""
+
+
 def get_vocabulary_props(vocabulary, fields, id_):
     """Returns props associated with a vocabulary, id_."""
-    # This is ok given that read_all is cached per vocabulary+fields and
-    # is reused overtime
+    key = (vocabulary, tuple(fields), id_)
+    props = vocabulary_props_cache.get(key)
+    if props is not None:
+        return props
+
+    from invenio_access.permissions import system_identity
+    from invenio_search.engine import dsl
+    from invenio_vocabularies.proxies import current_service as vocabulary_service
+
     results = vocabulary_service.read_all(
         system_identity,
         ["id"] + fields,
         vocabulary,
+        cache=False,
         extra_filter=dsl.Q("term", id=id_),
     )
 
     for h in results.hits:
-        return h.get("props", {})
+        props = h.get("props", {})
+        vocabulary_props_cache.set(key, props)
+        return props
 
     raise VocabularyItemNotFoundError(
         f"The '{vocabulary}' vocabulary item '{id_}' was not found."
     )
+
+
+def invalidate_vocabulary_props(sender, record=None, **kwargs):
+    """Signal receiver dropping cached props when a vocabulary is written."""
+    from invenio_vocabularies.records.api import Vocabulary
+
+    if not isinstance(record, Vocabulary):
+        return
+    vocabulary_type = record.get("type") or {}
+    vocabulary_props_cache.invalidate(vocabulary_type.get("id"))
+    current_app.logger.debug(
+        f"Vocabulary props cache invalidated for {vocabulary_type.get('id')}"
+    )
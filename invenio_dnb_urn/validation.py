@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Validation of xMetaDissPlus against the DNB schemas."""
+
+import os
+import re
+import threading
+from collections import deque
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit
+from urllib.request import urlopen
+
+from lxml import etree
+
+SCHEMA_URL = "http://www.d-nb.de/standards/xmetadissplus/xmetadissplus.xsd"
+"""Location of the xMetaDissPlus schema, its imports are resolved from it."""
+
+NS_XS = "http://www.w3.org/2001/XMLSchema"
+
+SCHEMA_REFERENCES = [
+    etree.QName(NS_XS, name).text for name in ("import", "include", "redefine")
+]
+
+BUILD_ERROR = "BUILD_ERROR"
+"""Rule of records failing before validation."""
+
+
+def schema_directory(app):
+    """Directory of the local schema mirror of the application."""
+    return app.config["XMETADISS_SCHEMA_DIR"] or os.path.join(
+        app.instance_path, "xmetadiss-schemas"
+    )
+
+
+def mirror_path(directory, url):
+    """Local path of a schema URL, ``None`` for non HTTP URLs."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https"):
+        return None
+    return os.path.join(directory, parts.netloc, parts.path.lstrip("/"))
+
+
+def fetch_schemas(directory, url=SCHEMA_URL, opener=urlopen):
+    """Mirror a schema and everything it imports or includes.
+
+    Files keep the layout of their URLs below ``directory``, so relative
+    references between them resolve locally as well.
+
+    :returns: the mirrored URLs.
+    """
+    fetched = []
+    queue = deque([url])
+    seen = {url}
+    while queue:
+        url = queue.popleft()
+        with opener(url) as response:
+            content = response.read()
+        path = mirror_path(directory, url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as fp:
+            fp.write(content)
+        fetched.append(url)
+        for element in etree.fromstring(content).iter(*SCHEMA_REFERENCES):
+            location = element.get("schemaLocation")
+            if location:
+                location = urljoin(url, location)
+                if location not in seen:
+                    seen.add(location)
+                    queue.append(location)
+    return fetched
+
+
+class MirrorResolver(etree.Resolver):
+    """Resolves schema URLs from the local mirror."""
+
+    def __init__(self, directory):
+        """Constructor."""
+        super().__init__()
+        self.directory = directory
+
+    def resolve(self, url, pubid, context):
+        """Resolve mirrored URLs, leave the rest to the parser."""
+        path = mirror_path(self.directory, url)
+        if path is not None and os.path.exists(path):
+            return self.resolve_filename(path, context)
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_schema(directory, url=SCHEMA_URL):
+    """Compiled schema, once per process.
+
+    The parser may not access the network, a missing file in the mirror
+    fails the compilation.
+    """
+    path = mirror_path(directory, url)
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found, mirror the schemas with "
+            "'invenio dnb-urn fetch-xmetadiss-schemas'."
+        )
+    parser = etree.XMLParser(no_network=True)
+    parser.resolvers.add(MirrorResolver(directory))
+    return etree.XMLSchema(etree.parse(path, parser))
+
+
+def error_rule(error):
+    """Rule of a validation error: its type and the element path."""
+    path = re.sub(r"\[\d+\]", "", error.path or "")
+    return f"{error.type_name} {path}".strip()
+
+
+class XMetaDissValidator:
+    """Validates xMetaDissPlus against the compiled schema.
+
+    Validation runs under a lock, the compiled schema is shared between
+    threads but keeps the error log of the last validation.
+    """
+
+    def __init__(self, directory):
+        """Constructor."""
+        self.schema = load_schema(directory)
+        self._lock = threading.Lock()
+
+    def validate(self, xmetadiss):
+        """Validate an element or serialized fragment.
+
+        :returns: the ``(rule, message)`` of every error.
+        """
+        if isinstance(xmetadiss, bytes):
+            xmetadiss = etree.fromstring(xmetadiss)
+        with self._lock:
+            if self.schema.validate(xmetadiss):
+                return []
+            return [
+                (error_rule(error), error.message) for error in self.schema.error_log
+            ]
+
+
+@lru_cache(maxsize=None)
+def get_validator(directory):
+    """Validator of a schema mirror, shared within the process.
+
+    The schema is compiled once and all threads validate under the same lock.
+    """
+    return XMetaDissValidator(directory)
+
+
+class ValidationReport:
+    """Validation errors of many records grouped by rule."""
+
+    def __init__(self, max_examples=10):
+        """Constructor."""
+        self.validated = 0
+        self.invalid = 0
+        self.max_examples = max_examples
+        self.rules = {}
+
+    def add(self, record_id, errors):
+        """Add the errors of a validated record."""
+        self.validated += 1
+        if not errors:
+            return
+        self.invalid += 1
+        for rule, message in errors:
+            entry = self.rules.setdefault(
+                rule, {"count": 0, "message": message, "records": []}
+            )
+            entry["count"] += 1
+            records = entry["records"]
+            if len(records) < self.max_examples and record_id not in records:
+                records.append(record_id)
+
+    def by_count(self):
+        """Rules and their entries, most frequent first."""
+        return sorted(self.rules.items(), key=lambda item: -item[1]["count"])
+
+    def dump(self):
+        """Report as JSON serializable dict."""
+        return {
+            "validated": self.validated,
+            "invalid": self.invalid,
+            "rules": dict(self.by_count()),
+        }
+
+    def summary(self):
+        """One line summary."""
+        return (
+            f"{self.validated} validated, {self.invalid} invalid, "
+            f"{len(self.rules)} rules violated"
+        )
+
+
+def validate_source(builder, validator, source):
+    """Build and validate the xMetaDiss of a search document.
+
+    :returns: the record id and its ``(rule, message)`` errors.
+    """
+    try:
+        xmetadiss = builder.build(source)
+    except Exception as e:
+        return source.get("id"), [(BUILD_ERROR, f"{type(e).__name__}: {e}")]
+    return source.get("id"), validator.validate(xmetadiss)
@@ -7,25 +7,273 @@
 
 """Views."""
 
-from flask import Blueprint
+import hmac
+import os
+import random
+import time
+
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    g,
+    request,
+    stream_with_context,
+)
+from lxml import etree
+
+from .metrics import metrics
 
 blueprint = Blueprint("invenio_dnb_urn_ext", __name__)
 
 
-@blueprint.record_once
-def init(state):
-    """Init app."""
-    app = state.app
-    # Register services - cannot be done in extension because
-    # Invenio-Records-Resources might not have been initialized.
-    sregistry = app.extensions["invenio-records-resources"].registry
-    ext = app.extensions["invenio-dnb-urn"]
-    sregistry.register(ext.oaipmh_server_service, service_id="oaipmh-server")
-    # Register indexers
-    iregistry = app.extensions["invenio-indexer"].registry
-    iregistry.register(ext.records_service.indexer, indexer_id="records")
+@blueprint.before_app_request
+def start_oai_profile():
+    """Profile a sample of the OAI-PMH requests."""
+    if request.endpoint != "invenio_oaiserver.response":
+        return
+    rate = current_app.config["URN_DNB_PROFILE_SAMPLE_RATE"]
+    if not rate or random.random() >= rate:
+        return
+    import cProfile
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Another profiler is active.
+        return
+    g.dnb_urn_profile = profile
+
+
+@blueprint.teardown_app_request
+def stop_oai_profile(exc):
+    """Store or log the profile of a sampled request.
+
+    Runs after a streamed response was sent completely.
+    """
+    profile = g.pop("dnb_urn_profile", None)
+    if profile is None:
+        return
+    profile.disable()
+    directory = current_app.config["URN_DNB_PROFILE_DIR"]
+    if directory:
+        filename = f"oai-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.prof"
+        profile.dump_stats(os.path.join(directory, filename))
+        return
+    import io
+    import pstats
+
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(30)
+    current_app.logger.info(f"Profile of {request.full_path}\n{out.getvalue()}")
+
+
+def _metrics_permitted():
+    """Whether the request may read the metrics.
+
+    Scrapers authenticate with the ``URN_DNB_METRICS_TOKEN`` bearer token,
+    users need superuser access.
+    """
+    token = current_app.config["URN_DNB_METRICS_TOKEN"]
+    if token and hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return True
+    from invenio_access import Permission
+    from invenio_access.permissions import superuser_access
+
+    return Permission(superuser_access).can()
+
+
+@blueprint.route("/dnb-urn/metrics")
+def prometheus_metrics():
+    """Metrics of the current process in Prometheus text format.
+
+    Every metric is labelled with the process id: behind a load balancer
+    each scrape reaches one web worker, whose counters only cover the
+    requests it served itself.
+    """
+    if not current_app.config["URN_DNB_METRICS_ENABLED"]:
+        abort(404)
+    if not _metrics_permitted():
+        abort(403)
+    from .provider import get_dnb_urn_provider
+    from .utils import vocabulary_props_cache
+
+    gauges = {}
+    for key, value in vocabulary_props_cache.stats.items():
+        gauges[f"vocabulary_cache_{key}"] = value
+    xmetadiss_cache = current_app.extensions["invenio_dnb_urn"].xmetadiss_cache
+    if xmetadiss_cache is not None:
+        for key, value in xmetadiss_cache.stats.items():
+            gauges[f"xmetadiss_cache_{key}"] = value
+    breaker = get_dnb_urn_provider().client.resilience_stats
+    gauges["dnb_breaker_open"] = int(breaker["state"] != "closed")
+    return Response(
+        metrics.render(gauges, labels={"pid": os.getpid()}),
+        content_type="text/plain; version=0.0.4",
+    )
+
+
+@blueprint.before_app_request
+def xmetadiss_oai_response():
+    """Answer record requests for the xMetaDiss metadata prefix.
+
+    Takes over ``invenio_oaiserver.response`` requests when streaming is
+    enabled: ListRecords is streamed, GetRecord and ListIdentifiers use the
+    same datestamps. Every other OAI-PMH request is left to invenio-oaiserver.
+    """
+    if request.endpoint != "invenio_oaiserver.response":
+        return
+    if not current_app.config["XMETADISS_STREAMING_ENABLED"]:
+        return
+    verb = request.values.get("verb")
+    if verb not in ("GetRecord", "ListIdentifiers", "ListRecords"):
+        return
+
+    from invenio_oaiserver.verbs import make_request_validator
+    from webargs.flaskparser import parser
+
+    from . import streaming
+
+    args = parser.parse(make_request_validator, request)
+    if (
+        streaming.metadata_prefix(args)
+        != current_app.config["XMETADISS_METADATA_PREFIX"]
+    ):
+        return
+
+    if verb == "ListRecords":
+        return Response(
+            stream_with_context(streaming.listrecords(**args)),
+            content_type="text/xml",
+        )
+    e_tree = getattr(streaming, verb.lower())(**args)
+    return Response(
+        etree.tostring(
+            e_tree, pretty_print=True, xml_declaration=True, encoding="UTF-8"
+        ),
+        content_type="text/xml",
+    )
+
+
+def _record_revision(pid_value):
+    """Revision and stored data of a published record, ``None`` if unknown.
+
+    Read by primary key from the database, no search is needed.
+    """
+    from invenio_db import db
+    from invenio_pidstore.models import PersistentIdentifier, PIDStatus
+    from invenio_rdm_records.records.api import RDMRecord
+
+    model_cls = RDMRecord.model_cls
+    row = (
+        db.session.query(model_cls.version_id, model_cls.json)
+        .join(PersistentIdentifier, PersistentIdentifier.object_uuid == model_cls.id)
+        .filter(
+            PersistentIdentifier.pid_type == "recid",
+            PersistentIdentifier.pid_value == pid_value,
+            PersistentIdentifier.status == PIDStatus.REGISTERED,
+            model_cls.is_deleted == False,  # noqa: E712
+        )
+        .one_or_none()
+    )
+    if row is None:
+        return None
+    # Records are indexed with their revision id, one less than the version.
+    return row.version_id - 1, row.json
+
+
+def _harvestable(data):
+    """Whether stored record data passes the filter of the OAI-PMH search.
+
+    Mirrors the default filter of ``invenio_rdm_records.oai.OAIRecordSearch``:
+    the record has an OAI identifier and is public.
+    """
+    oai_id = data.get("pids", {}).get("oai", {}).get("identifier")
+    return bool(oai_id) and data.get("access", {}).get("record") == "public"
+
+
+def _indexed_record(pid_value):
+    """Search hit of a record in the OAI-PMH index, ``None`` if not exposed."""
+    from invenio_oaiserver.proxies import current_oaiserver
+
+    from .oai import XMetaDissBuilder
+
+    search = (
+        current_oaiserver.search_cls(index=current_app.config["OAISERVER_RECORD_INDEX"])
+        .filter("term", id=pid_value)
+        .source(includes=[*XMetaDissBuilder.source_fields, "revision_id"])
+        .extra(version=True)[:1]
+    )
+    hits = search.execute().to_dict()["hits"]["hits"]
+    return hits[0] if hits else None
+
+
+def _export_etag(pid_value, revision, generation):
+    """ETag of the xMetaDiss of a record revision."""
+    return f"{pid_value}:{revision}:{generation[:16]}"
+
+
+@blueprint.route("/records/<pid_value>/export/xmetadiss")
+def export_xmetadiss(pid_value):
+    """xMetaDiss of a record with a strong ETag.
+
+    The ETag is derived from the record revision and the builder generation,
+    which covers the package version, the config, the thesis types and the
+    vocabulary props the record is built with. The revision is read from the
+    database, so matching ``If-None-Match`` requests of records OAI-PMH
+    exposes are answered with 304 without searching the record index or
+    building xMetaDiss. The vocabulary props of the generation still come
+    from the vocabulary cache, which searches them on a cold cache.
+
+    Other requests look the record up in the OAI-PMH search index, so
+    exactly the records exposed by OAI-PMH are exported. A record whose
+    access changes gets a new revision and so a new ETag. The body is built
+    from the search document instead of the precomputed or cached fragments,
+    which may predate the current generation.
+    """
+    from .oai import build_fragment, sample_validation
+
+    builder = current_app.extensions["invenio_dnb_urn"].xmetadiss_builder
+    stored = _record_revision(pid_value)
+    if stored is not None and _harvestable(stored[1]):
+        revision, data = stored
+        etag = _export_etag(pid_value, revision, builder.generation(data))
+        if request.if_none_match.contains(etag):
+            metrics.inc("xmetadiss_export", status="304")
+            return _cacheable(Response(status=304), etag)
+
+    record = _indexed_record(pid_value)
+    if record is None:
+        abort(404)
+    source = record["_source"]
+
+    fragment, seconds = build_fragment(builder, source)
+    metrics.observe("xmetadiss_build", seconds)
+    sample_validation(source.get("id"), fragment)
+    body = b'<?xml version="1.0" encoding="UTF-8"?>\n' + fragment
+    metrics.inc("xmetadiss_export", status="200")
+    response = Response(body, content_type="application/xml; charset=utf-8")
+    # The ETag follows the indexed revision the body was built from.
+    revision = record.get("_version", source.get("revision_id"))
+    if revision is None:
+        return response
+    return _cacheable(
+        response, _export_etag(pid_value, revision, builder.generation(source))
+    )
+
+
+def _cacheable(response, etag):
+    """Set the ETag and cache headers of an xMetaDiss export."""
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["XMETADISS_EXPORT_MAX_AGE"]
+    return response
 
 
 def create_oaipmh_server_blueprint_from_app(app):
     """Create app blueprint."""
-    return app.extensions["invenio-dnb-urn"].oaipmh_server_resource.as_blueprint()
+    return app.extensions["invenio_dnb_urn"].oaipmh_server_resource.as_blueprint()
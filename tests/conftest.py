@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Pytest configuration.
+
+See https://pytest-invenio.readthedocs.io/ for documentation on which test
+fixtures are available.
+"""
+
+import pytest
+from flask import Flask
+from invenio_db import InvenioDB
+from invenio_oaiserver import InvenioOAIServer
+from invenio_oaiserver.views.server import blueprint as oaiserver_blueprint
+
+from invenio_dnb_urn import InvenioSerializerXMetaDissPlus
+from invenio_dnb_urn.views import blueprint
+
+
+@pytest.fixture(scope="module")
+def app_config(app_config):
+    """Application config of the tests."""
+    app_config.update(
+        SECRET_KEY="test-key",
+        SERVER_NAME="localhost",
+        SITE_API_URL="https://127.0.0.1/api",
+        SITE_UI_URL="https://127.0.0.1",
+        OAISERVER_ID_PREFIX="oai:127.0.0.1:",
+        OAISERVER_XSL_URL=None,
+    )
+    return app_config
+
+
+@pytest.fixture(scope="module")
+def create_app(instance_path):
+    """Application factory fixture."""
+
+    def factory(**config):
+        app = Flask("testapp", instance_path=instance_path)
+        app.config.update(**config)
+        InvenioDB(app)
+        InvenioOAIServer(app)
+        InvenioSerializerXMetaDissPlus(app)
+        app.register_blueprint(oaiserver_blueprint)
+        app.register_blueprint(blueprint)
+        return app
+
+    return factory
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Bulk run checkpoint tests."""
+
+from invenio_dnb_urn.bulk import BulkReport, Checkpoint
+
+
+def test_checkpoint_without_file(tmp_path):
+    """A missing checkpoint starts from the beginning."""
+    position, report = Checkpoint(str(tmp_path / "checkpoint.json")).load()
+    assert position is None
+    assert report.processed == 0
+
+
+def test_checkpoint_without_path():
+    """Without a path nothing is stored."""
+    checkpoint = Checkpoint()
+    checkpoint.save(42, BulkReport(processed=1))
+    position, report = checkpoint.load()
+    assert position is None
+    assert report.processed == 0
+
+
+def test_checkpoint_roundtrip(tmp_path):
+    """Position and counters are restored."""
+    path = tmp_path / "checkpoint.json"
+    report = BulkReport(processed=3, succeeded=1, skipped=1)
+    report.count("unchanged", 2)
+    report.failures.append(["urn:nbn:de:hbz:6-123458", "HttpError"])
+    Checkpoint(str(path)).save(42, report)
+    assert not (tmp_path / "checkpoint.json.tmp").exists()
+
+    position, resumed = Checkpoint(str(path)).load()
+    assert position == 42
+    assert resumed.dump() == report.dump()
+    assert resumed.failed == 1
+    assert resumed.counters == {"unchanged": 2}
+    # Resumed items do not count towards the throughput of this run.
+    assert resumed.throughput == 0.0
+
+
+def test_checkpoint_overwrite(tmp_path):
+    """The latest save wins."""
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.save(1, BulkReport(processed=1))
+    checkpoint.save(2, BulkReport(processed=2))
+    position, report = checkpoint.load()
+    assert position == 2
+    assert report.processed == 2
+
+
+def test_report_counters():
+    """Command specific counters are added up and summarized."""
+    report = BulkReport(processed=4, succeeded=1)
+    report.count("missing")
+    report.count("differs", 2)
+    report.count("missing")
+    assert report.counters == {"missing": 2, "differs": 2}
+    assert report.summary().startswith(
+        "4 processed, 1 succeeded, 0 skipped, 0 failed, 2 missing, 2 differs in "
+    )
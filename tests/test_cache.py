@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""xMetaDiss fragment cache tests."""
+
+from types import SimpleNamespace
+
+from invenio_dnb_urn.cache import LRUFragmentCache, fragment_key
+from invenio_dnb_urn.dumpers import FINGERPRINT_FIELD, FRAGMENT_FIELD, GENERATION_FIELD
+from invenio_dnb_urn.oai import _prebuilt_fragment
+
+GENERATION = "0123456789abcdef0123456789abcdef01234567"
+
+
+def test_fragment_key_prefers_fingerprint():
+    """The fingerprint keys the fragment across revisions."""
+    record = {
+        "_version": 3,
+        "_source": {"id": "abcd-1234", FINGERPRINT_FIELD: "f00", "revision_id": 3},
+    }
+    assert fragment_key(record, GENERATION) == "abcd-1234:f00:0123456789abcdef"
+
+
+def test_fragment_key_revision():
+    """Without fingerprint the search document version is used."""
+    assert fragment_key(
+        {"_version": 3, "_source": {"id": "abcd-1234"}}, GENERATION
+    ) == ("abcd-1234:3:0123456789abcdef")
+    assert fragment_key(
+        {"_source": {"id": "abcd-1234", "revision_id": 2}}, GENERATION
+    ) == ("abcd-1234:2:0123456789abcdef")
+    assert fragment_key(
+        {"_source": {"id": "abcd-1234", "updated": "2023-06-01T00:00:00"}}, GENERATION
+    ) == ("abcd-1234:2023-06-01T00:00:00:0123456789abcdef")
+
+
+def test_fragment_key_generation():
+    """Fragments of another builder generation are not found."""
+    record = {"_version": 3, "_source": {"id": "abcd-1234"}}
+    assert fragment_key(record, GENERATION) != fragment_key(record, "f" * 40)
+
+
+def test_fragment_key_without_revision():
+    """Hits without any revision are not cached."""
+    assert fragment_key({"_source": {"id": "abcd-1234"}}, GENERATION) is None
+
+
+def extension(cache=None):
+    """Extension with a builder of generation ``GENERATION``."""
+    builder = SimpleNamespace(generation=lambda source: GENERATION)
+    return SimpleNamespace(xmetadiss_cache=cache, xmetadiss_builder=builder)
+
+
+def test_prebuilt_fragment_stored():
+    """A fragment stored by the current builder generation is used."""
+    record = {
+        "_version": 3,
+        "_source": {
+            "id": "abcd-1234",
+            FRAGMENT_FIELD: "<doc/>",
+            GENERATION_FIELD: GENERATION,
+        },
+    }
+    assert _prebuilt_fragment(extension(), record) == (b"<doc/>", None)
+
+
+def test_prebuilt_fragment_stale_generation():
+    """A fragment stored by another builder generation is ignored."""
+    cache = LRUFragmentCache()
+    record = {
+        "_version": 3,
+        "_source": {
+            "id": "abcd-1234",
+            FRAGMENT_FIELD: "<old/>",
+            GENERATION_FIELD: "f" * 40,
+        },
+    }
+    assert _prebuilt_fragment(extension(), record) == (None, None)
+    assert _prebuilt_fragment(extension(cache), record) == (
+        None,
+        "abcd-1234:3:0123456789abcdef",
+    )
+    cache.set("abcd-1234:3:0123456789abcdef", b"<doc/>")
+    assert _prebuilt_fragment(extension(cache), record)[0] == b"<doc/>"
+
+
+def test_lru_fragment_cache():
+    """Entries are evicted by count and size, hits save build time."""
+    cache = LRUFragmentCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"aaaa", 0.5)
+    cache.set("b", b"bbbb", 0.5)
+    assert cache.get("a") == b"aaaa"
+    cache.set("c", b"cccc", 0.5)
+    assert cache.get("b") is None
+    assert cache.get("c") == b"cccc"
+    cache.set("d", b"d" * 11)
+    assert cache.get("d") is None
+    assert cache.stats == {
+        "hits": 2,
+        "misses": 2,
+        "hit_rate": 0.5,
+        "saved_seconds": 1.0,
+        "entries": 2,
+        "bytes": 8,
+    }
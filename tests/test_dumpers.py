@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""xMetaDiss fingerprint tests."""
+
+import copy
+from types import SimpleNamespace
+
+import pytest
+from invenio_records.api import Record
+from invenio_records.dumpers import SearchDumper, SearchDumperExt
+
+from invenio_dnb_urn import dumpers
+from invenio_dnb_urn.models import XMetaDissDatestamp
+
+DATA = {"metadata": {"title": "A thesis", "creators": [{"name": "Doe, Jane"}]}}
+
+
+class DereferenceExt(SearchDumperExt):
+    """Dumper extension changing the record, as the relations do."""
+
+    def dump(self, record, data):
+        """Replace the creators of the record."""
+        record["metadata"]["creators"] = [{"name": "Doe, Jane", "id": "0001"}]
+        data["metadata"]["creators"] = record["metadata"]["creators"]
+
+
+def record_class(*extensions):
+    """Record class dumped with the given extensions."""
+    return type(
+        "ThesisRecord",
+        (Record,),
+        {
+            "dumper": SearchDumper(extensions=list(extensions)),
+            "is_draft": False,
+            "pid": SimpleNamespace(pid_value="abcd-1234"),
+            "parent": SimpleNamespace(pid=SimpleNamespace(pid_value="abcd-0000")),
+        },
+    )
+
+
+def test_record_fingerprint_keeps_record(base_app):
+    """The fingerprint is taken from a copy of the record."""
+    record = record_class(DereferenceExt())(copy.deepcopy(DATA))
+    with base_app.app_context():
+        value = dumpers.record_fingerprint(record)
+        fields = base_app.config["XMETADISS_FINGERPRINT_FIELDS"]
+    assert record == DATA
+    dereferenced = copy.deepcopy(DATA)
+    dereferenced["metadata"]["creators"][0]["id"] = "0001"
+    assert value == dumpers.fingerprint(dereferenced, fields)
+
+
+def test_update_fingerprint_skips_statistics(base_app, monkeypatch, mocker):
+    """Writing a published record does not query the record statistics."""
+    statistics = pytest.importorskip("invenio_rdm_records.records.dumpers.statistics")
+    get_record_stats = mocker.patch.object(statistics, "get_record_stats")
+    update = mocker.patch.object(XMetaDissDatestamp, "update")
+    monkeypatch.setattr(dumpers, "_is_published", lambda record: True)
+    monkeypatch.setitem(base_app.config, "XMETADISS_FINGERPRINT_ENABLED", True)
+
+    cls = record_class(statistics.StatisticsDumperExt("stats"))
+    record = cls(copy.deepcopy(DATA))
+    with base_app.app_context():
+        dumpers.update_fingerprint(None, record=record)
+        expected = dumpers.record_fingerprint(record)
+
+    get_record_stats.assert_not_called()
+    update.assert_called_once_with(record.id, expected)
+    record.dumps()
+    get_record_stats.assert_called_once()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Epicur bulk delivery tests."""
+
+import gzip
+from datetime import datetime
+
+import pytest
+from lxml import etree
+
+from invenio_dnb_urn.epicur import NS_EPICUR, URN_NEW, EpicurWriter, Watermark
+
+NS = {"e": NS_EPICUR}
+
+
+def parse(path):
+    """Parsed Epicur file."""
+    with gzip.open(path) as fp:
+        return etree.parse(fp).getroot()
+
+
+def test_epicur_file(tmp_path):
+    """URN/URL pairs are written as Epicur records."""
+    with EpicurWriter(str(tmp_path), update_status=URN_NEW) as writer:
+        writer.write("urn:nbn:de:hbz:6-123458", "https://127.0.0.1/records/1")
+    ((path, count),) = writer.files
+    assert path == str(tmp_path / "epicur-urn_new-00001.xml.gz")
+    assert count == 1
+
+    root = parse(path)
+    assert root.tag == f"{{{NS_EPICUR}}}epicur"
+    status = root.find("e:administrative_data/e:delivery/e:update_status", NS)
+    assert status.get("type") == "urn_new"
+    (record,) = root.findall("e:record", NS)
+    urn = record.find("e:identifier", NS)
+    assert (urn.get("scheme"), urn.text) == ("urn:nbn:de", "urn:nbn:de:hbz:6-123458")
+    url = record.find("e:resource/e:identifier", NS)
+    assert url.text == "https://127.0.0.1/records/1"
+    assert (url.get("scheme"), url.get("role")) == ("url", "primary")
+    assert record.findtext("e:resource/e:format", namespaces=NS) == "text/html"
+    with gzip.open(path) as fp:
+        assert fp.read().count(b'xmlns="') == 1
+
+
+def test_epicur_chunks(tmp_path):
+    """A new file is started every chunk size records."""
+    with EpicurWriter(str(tmp_path), chunk_size=2) as writer:
+        for i in range(5):
+            writer.write(f"urn:nbn:de:hbz:6-{i}", f"https://127.0.0.1/records/{i}")
+    assert [count for _, count in writer.files] == [2, 2, 1]
+    assert len(parse(writer.files[2][0]).findall("e:record", NS)) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        f"epicur-url_update_general-0000{i}.xml.gz" for i in range(1, 4)
+    ]
+
+
+def test_epicur_abort(tmp_path):
+    """An aborted run leaves only the complete files."""
+    with pytest.raises(RuntimeError):
+        with EpicurWriter(str(tmp_path), chunk_size=2) as writer:
+            for i in range(3):
+                writer.write(f"urn:nbn:de:hbz:6-{i}", "https://127.0.0.1/")
+            raise RuntimeError()
+    assert [p.name for p in tmp_path.iterdir()] == [
+        "epicur-url_update_general-00001.xml.gz"
+    ]
+
+
+def test_watermark(tmp_path):
+    """The time of the last complete export is stored."""
+    watermark = Watermark(str(tmp_path / "watermark.json"))
+    assert watermark.load() is None
+    watermark.save(datetime(2023, 6, 1, 12, 30))
+    assert watermark.load() == datetime(2023, 6, 1, 12, 30)
+    assert Watermark().load() is None
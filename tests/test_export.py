@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Sharded xMetaDiss export tests."""
+
+import gzip
+import hashlib
+import json
+
+import pytest
+from lxml import etree
+
+from invenio_dnb_urn.export import MANIFEST, ShardWriter, write_manifest
+
+
+def parse(path):
+    """Parsed shard."""
+    with gzip.open(path) as fp:
+        return etree.parse(fp).getroot()
+
+
+def test_shards(tmp_path):
+    """Fragments are written into shards with their OAI header fields."""
+    with ShardWriter(str(tmp_path), shard_size=2) as writer:
+        for i in range(3):
+            writer.write(f"oai:127.0.0.1:{i}", "2023-06-01T00:00:00Z", b"<doc/>")
+    shards = writer.shards
+    assert [s["file"] for s in shards] == [
+        "xmetadiss-00001.xml.gz",
+        "xmetadiss-00002.xml.gz",
+    ]
+    assert [s["records"] for s in shards] == [2, 1]
+
+    path = tmp_path / shards[0]["file"]
+    assert shards[0]["bytes"] == path.stat().st_size
+    assert shards[0]["sha256"] == hashlib.sha256(path.read_bytes()).hexdigest()
+    root = parse(path)
+    assert root.tag == "records"
+    records = root.findall("record")
+    assert [r.get("identifier") for r in records] == [
+        "oai:127.0.0.1:0",
+        "oai:127.0.0.1:1",
+    ]
+    assert records[0].get("datestamp") == "2023-06-01T00:00:00Z"
+    assert records[0][0].tag == "doc"
+
+
+def test_shard_abort(tmp_path):
+    """An aborted export leaves only the complete shards."""
+    with pytest.raises(RuntimeError):
+        with ShardWriter(str(tmp_path), shard_size=2) as writer:
+            for i in range(3):
+                writer.write(f"oai:127.0.0.1:{i}", "2023-06-01T00:00:00Z", b"<doc/>")
+            raise RuntimeError()
+    assert [p.name for p in tmp_path.iterdir()] == ["xmetadiss-00001.xml.gz"]
+
+
+def test_manifest(tmp_path):
+    """The manifest is written as JSON."""
+    path = write_manifest(str(tmp_path), records=3, shards=[{"file": "a"}])
+    assert path == str(tmp_path / MANIFEST)
+    assert json.loads((tmp_path / MANIFEST).read_text()) == {
+        "records": 3,
+        "shards": [{"file": "a"}],
+    }
+    assert not (tmp_path / f"{MANIFEST}.tmp").exists()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Provider load test tests."""
+
+import threading
+
+import pytest
+from dnb_urn_service.errors import DNBURNServiceServerError
+from invenio_pidstore.models import PersistentIdentifier
+
+from invenio_dnb_urn.loadtest import LoadTest
+from invenio_dnb_urn.provider import DNBUrnClient, DnbUrnProvider
+
+
+class API:
+    """DNB URN service API recording its calls."""
+
+    def __init__(self, fail=False):
+        """Constructor."""
+        self.fail = fail
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _call(self, action, url, urn):
+        with self._lock:
+            self.calls.append((action, urn, url))
+        if self.fail:
+            raise DNBURNServiceServerError()
+
+    def create_urn(self, url, urn):
+        """Register a URN."""
+        self._call("create", url, urn)
+
+    def modify_urn(self, url, urn):
+        """Update the URL of a URN."""
+        self._call("modify", url, urn)
+
+
+@pytest.fixture()
+def provider(database, base_app, monkeypatch):
+    """URN provider with a recording API."""
+    monkeypatch.setitem(base_app.config, "URN_DNB_ID_PREFIX", "urn:nbn:de:hbz:6")
+    client = DNBUrnClient("dnb", config_prefix="URN_DNB")
+    client._api = API()
+    return DnbUrnProvider("urn", client=client)
+
+
+def test_register(provider):
+    """Registrations go through the provider and leave no PIDs behind."""
+    report = LoadTest(provider, "register", workers=2).run(5)
+    assert report.stats["calls"] == 5
+    assert report.stats["errors"] == 0
+    calls = provider.client.api.calls
+    assert [action for action, _, _ in calls] == ["create"] * 5
+    assert all(urn.startswith("urn:nbn:de:hbz:6-") for _, urn, _ in calls)
+    assert PersistentIdentifier.query.count() == 0
+
+
+def test_update(provider):
+    """URNs are registered before their URLs are updated."""
+    report = LoadTest(provider, "update", workers=2).run(4)
+    assert report.stats["errors"] == 0
+    actions = [action for action, _, _ in provider.client.api.calls]
+    assert actions == ["create"] * 4 + ["modify"] * 4
+    assert PersistentIdentifier.query.count() == 0
+
+
+def test_validate(provider):
+    """Validations use the provider's URN check and do not call DNB."""
+    report = LoadTest(provider, "validate", workers=2).run(3)
+    assert report.stats["calls"] == 3
+    assert report.stats["errors"] == 0
+    assert provider.client.api.calls == []
+
+
+def test_failed_calls_are_counted(provider):
+    """Calls the provider reports as failed are errors."""
+    provider.client.api.fail = True
+    report = LoadTest(provider, "register", workers=1).run(2)
+    assert report.errors == {"OperationFailed": 2}
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Outbox model tests."""
+
+from datetime import datetime, timedelta
+
+from invenio_dnb_urn.models import DnbUrnJob
+
+URN = "urn:nbn:de:hbz:6-123458"
+
+
+def get_job(db, urn=URN):
+    """Job of a URN as stored in the database."""
+    db.session.expire_all()
+    return DnbUrnJob.query.filter_by(urn=urn).one_or_none()
+
+
+def claim(db, limit=10):
+    """Claim due jobs and commit, as the outbox task does."""
+    claimed = DnbUrnJob.claim(limit=limit, lease=300)
+    db.session.commit()
+    return claimed
+
+
+def test_enqueue(db):
+    """A queued job is due right away."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    job = get_job(db)
+    assert job.action == DnbUrnJob.CREATE
+    assert job.url == "https://127.0.0.1/records/1"
+    assert job.attempts == 0
+    assert not job.failed
+    assert job.next_attempt <= datetime.utcnow()
+    assert DnbUrnJob.is_pending(URN)
+    assert not DnbUrnJob.is_pending("urn:nbn:de:hbz:6-123466")
+
+
+def test_enqueue_again_replaces_url(db):
+    """Queuing again keeps one job with the last URL and resets failures."""
+    DnbUrnJob.enqueue(DnbUrnJob.MODIFY, URN, "https://127.0.0.1/records/1")
+    db.session.execute(
+        DnbUrnJob.__table__.update().values(attempts=5, failed=True, last_error="x")
+    )
+    DnbUrnJob.enqueue(DnbUrnJob.MODIFY, URN, "https://127.0.0.1/records/2")
+    job = get_job(db)
+    assert DnbUrnJob.query.count() == 1
+    assert job.url == "https://127.0.0.1/records/2"
+    assert job.attempts == 0
+    assert not job.failed
+    assert job.last_error is None
+
+
+def test_enqueue_keeps_pending_creation(db):
+    """A pending creation is not turned into a modification."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    DnbUrnJob.enqueue(DnbUrnJob.MODIFY, URN, "https://127.0.0.1/records/2")
+    job = get_job(db)
+    assert job.action == DnbUrnJob.CREATE
+    assert job.url == "https://127.0.0.1/records/2"
+
+
+def test_claim(db):
+    """Claimed jobs are leased and not due for other workers."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    DnbUrnJob.enqueue(
+        DnbUrnJob.CREATE, "urn:nbn:de:hbz:6-123466", "https://127.0.0.1/records/2"
+    )
+    claimed = claim(db, limit=1)
+    assert len(claimed) == 1
+    assert claimed[0].claimed_until > datetime.utcnow() + timedelta(seconds=290)
+    assert claimed[0].claimed_until.microsecond == 0
+
+    second = claim(db)
+    assert len(second) == 1
+    assert second[0].urn != claimed[0].urn
+    assert claim(db) == []
+
+
+def test_claim_skips_failed_jobs(db):
+    """Jobs which gave up are not claimed."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    db.session.execute(DnbUrnJob.__table__.update().values(failed=True))
+    assert claim(db) == []
+
+
+def test_complete(db):
+    """A sent job is deleted."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    (job,) = claim(db)
+    assert DnbUrnJob.complete(job)
+    assert get_job(db) is None
+
+
+def test_complete_keeps_job_queued_again(db):
+    """A job queued again while it was sent stays due."""
+    DnbUrnJob.enqueue(DnbUrnJob.MODIFY, URN, "https://127.0.0.1/records/1")
+    (job,) = claim(db)
+    DnbUrnJob.enqueue(DnbUrnJob.MODIFY, URN, "https://127.0.0.1/records/2")
+    assert not DnbUrnJob.complete(job)
+    assert get_job(db).url == "https://127.0.0.1/records/2"
+    assert len(claim(db)) == 1
+
+
+def test_retry_later(db):
+    """Failed attempts back off exponentially until the job gives up."""
+    DnbUrnJob.enqueue(DnbUrnJob.CREATE, URN, "https://127.0.0.1/records/1")
+    (job,) = claim(db)
+    assert not DnbUrnJob.retry_later(job, "timeout", delay=60, max_attempts=2)
+    stored = get_job(db)
+    assert stored.attempts == 1
+    assert stored.last_error == "timeout"
+    assert stored.next_attempt > datetime.utcnow() + timedelta(seconds=50)
+    assert claim(db) == []
+
+    db.session.execute(
+        DnbUrnJob.__table__.update().values(next_attempt=datetime.utcnow())
+    )
+    (job,) = claim(db)
+    assert job.attempts == 1
+    assert DnbUrnJob.retry_later(job, "timeout", delay=60, max_attempts=2)
+    assert get_job(db).failed
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""xMetaDiss serialization tests."""
+
+import json
+import os
+
+import pytest
+from lxml import etree
+
+from invenio_dnb_urn.oai import XMetaDissBuilder
+
+DATA = os.path.join(os.path.dirname(__file__), "data", "xmetadiss")
+
+
+def vocabulary_props(vocabulary, fields, id_):
+    """Constant resource type props."""
+    return {"openaire_type": "publication"}
+
+
+@pytest.fixture
+def builder():
+    """Builder configured like the records of the golden files."""
+    return XMetaDissBuilder(
+        "https://127.0.0.1:5000/api",
+        "https://127.0.0.1:5000",
+        "openaire_type",
+        "openaire_type",
+        vocabulary_props=vocabulary_props,
+    )
+
+
+@pytest.mark.parametrize("name", ["tiny", "small", "medium", "schemes", "minimal"])
+def test_build_byte_identical(builder, name):
+    """The output equals the one of the original ``xmetadiss_etree``."""
+    with open(os.path.join(DATA, f"{name}.json")) as fp:
+        source = json.load(fp)
+    with open(os.path.join(DATA, f"{name}.xml"), "rb") as fp:
+        expected = fp.read()
+
+    assert etree.tostring(builder.build(source)) == expected
+
+
+def test_build_keeps_source(builder):
+    """Building does not change the search hit."""
+    with open(os.path.join(DATA, "medium.json")) as fp:
+        source = json.load(fp)
+    with open(os.path.join(DATA, "medium.json")) as fp:
+        expected = json.load(fp)
+
+    builder.build(source)
+    assert source == expected
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""URN provider tests."""
+
+import pytest
+from dnb_urn_service.errors import DNBURNServiceServerError
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus
+
+from invenio_dnb_urn.models import DnbUrnJob, DnbUrnPushedUrl
+from invenio_dnb_urn.provider import DNBUrnClient, DnbUrnProvider
+
+URN = "urn:nbn:de:hbz:6-123458"
+
+
+class API:
+    """DNB URN service API recording URL updates."""
+
+    def __init__(self):
+        """Constructor."""
+        self.modified = []
+        self.fail = False
+
+    def modify_urn(self, url, urn):
+        """Update the URL of a URN."""
+        if self.fail:
+            raise DNBURNServiceServerError()
+        self.modified.append((urn, url))
+
+
+@pytest.fixture()
+def provider(db, base_app, monkeypatch):
+    """URN provider skipping unchanged URLs, with a recording API."""
+    monkeypatch.setitem(base_app.config, "URN_DNB_SKIP_UNCHANGED_URLS", True)
+    client = DNBUrnClient("dnb", config_prefix="URN_DNB")
+    client._api = API()
+    return DnbUrnProvider("urn", client=client)
+
+
+def pid():
+    """Registered URN PID."""
+    return PersistentIdentifier(
+        pid_type="urn", pid_value=URN, status=PIDStatus.REGISTERED
+    )
+
+
+def test_update_skips_unchanged_url(provider):
+    """A URL is only sent again when it changed or the update is forced."""
+    api = provider.client.api
+    assert provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert api.modified == [(URN, "https://127.0.0.1/records/1")]
+
+    assert provider.update(pid(), url="https://127.0.0.1/records/2")
+    assert provider.update(pid(), url="https://127.0.0.1/records/2", force=True)
+    assert api.modified[1:] == [(URN, "https://127.0.0.1/records/2")] * 2
+    assert DnbUrnPushedUrl.is_current(URN, "https://127.0.0.1/records/2")
+
+
+def test_update_sends_url_again_after_failure(provider):
+    """A URL DNB did not accept is not recorded as sent."""
+    api = provider.client.api
+    api.fail = True
+    assert not provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert not DnbUrnPushedUrl.is_current(URN, "https://127.0.0.1/records/1")
+
+    api.fail = False
+    assert provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert api.modified == [(URN, "https://127.0.0.1/records/1")]
+
+
+def test_update_without_skipping(provider, monkeypatch, base_app):
+    """Every update is sent when skipping is disabled."""
+    monkeypatch.setitem(base_app.config, "URN_DNB_SKIP_UNCHANGED_URLS", False)
+    provider.update(pid(), url="https://127.0.0.1/records/1")
+    provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert len(provider.client.api.modified) == 2
+    assert DnbUrnPushedUrl.query.count() == 0
+
+
+def test_update_outbox_skips_unchanged_url(provider, monkeypatch, base_app):
+    """No job is queued for an unchanged URL unless forced."""
+    monkeypatch.setitem(base_app.config, "URN_DNB_OUTBOX", True)
+    DnbUrnPushedUrl.record(URN, "https://127.0.0.1/records/1")
+    assert provider.update(pid(), url="https://127.0.0.1/records/1")
+    assert not DnbUrnJob.is_pending(URN)
+
+    assert provider.update(pid(), url="https://127.0.0.1/records/1", force=True)
+    assert DnbUrnJob.is_pending(URN)
+    assert provider.client.api.modified == []
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Retry and circuit breaker tests."""
+
+import pytest
+from dnb_urn_service.errors import (
+    DNBURNServiceNotValidError,
+    DNBURNServiceServerError,
+    HttpError,
+)
+
+from invenio_dnb_urn.provider.resilience import CircuitOpenError, ResilientCaller
+
+
+def failing(*errors, result="ok"):
+    """Callable raising errors in turn, then returning result."""
+    errors = list(errors)
+    calls = []
+
+    def func():
+        calls.append(1)
+        if errors:
+            raise errors.pop(0)
+        return result
+
+    func.calls = calls
+    return func
+
+
+def test_retries_transient_errors():
+    """Connection problems and 5XX responses are retried."""
+    caller = ResilientCaller(retries=3, backoff=0)
+    func = failing(HttpError(), DNBURNServiceServerError())
+    assert caller.call(func) == "ok"
+    assert len(func.calls) == 3
+    assert caller.stats["retries"] == 2
+    assert caller.state == ResilientCaller.CLOSED
+
+
+def test_gives_up_after_retries():
+    """The last transient error is raised once the retries are used up."""
+    caller = ResilientCaller(retries=1, backoff=0)
+    func = failing(HttpError(), HttpError())
+    with pytest.raises(HttpError):
+        caller.call(func)
+    assert len(func.calls) == 2
+    assert caller.failures == 1
+
+
+def test_client_errors_are_not_retried():
+    """A 4XX response is raised right away and counts as healthy."""
+    caller = ResilientCaller(retries=3, backoff=0, failure_threshold=2)
+    caller.failures = 1
+    func = failing(DNBURNServiceNotValidError())
+    with pytest.raises(DNBURNServiceNotValidError):
+        caller.call(func)
+    assert len(func.calls) == 1
+    assert caller.failures == 0
+    assert caller.state == ResilientCaller.CLOSED
+
+
+def test_opens_after_failure_threshold():
+    """Calls are rejected without calling DNB while the breaker is open."""
+    caller = ResilientCaller(retries=0, failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(HttpError):
+            caller.call(failing(HttpError()))
+    assert caller.state == ResilientCaller.OPEN
+
+    func = failing()
+    with pytest.raises(CircuitOpenError):
+        caller.call(func)
+    assert func.calls == []
+    stats = caller.stats
+    assert stats["opened"] == 1
+    assert stats["rejected"] == 1
+    assert stats["consecutive_failures"] == 2
+
+
+def test_half_open_trial_success_closes():
+    """After the reset timeout a successful trial call closes the breaker."""
+    caller = ResilientCaller(retries=0, failure_threshold=1, reset_timeout=0)
+    with pytest.raises(HttpError):
+        caller.call(failing(HttpError()))
+    assert caller.state == ResilientCaller.OPEN
+
+    assert caller.call(failing()) == "ok"
+    assert caller.state == ResilientCaller.CLOSED
+    assert caller.failures == 0
+
+
+def test_half_open_trial_failure_reopens():
+    """A failed trial call opens the breaker again."""
+    caller = ResilientCaller(retries=0, failure_threshold=3, reset_timeout=0)
+    caller.state = ResilientCaller.OPEN
+    caller.opened_at = 0
+    with pytest.raises(HttpError):
+        caller.call(failing(HttpError()))
+    assert caller.state == ResilientCaller.OPEN
+    assert caller.stats["opened"] == 1
+
+
+def test_half_open_allows_single_trial():
+    """Only one trial call is let through while half-open."""
+    caller = ResilientCaller(retries=0, failure_threshold=1, reset_timeout=0)
+    caller.state = ResilientCaller.HALF_OPEN
+    caller._trial = True
+    func = failing()
+    with pytest.raises(CircuitOpenError):
+        caller.call(func)
+    assert func.calls == []
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Streaming ListRecords tests."""
+
+from datetime import datetime
+
+from invenio_oaiserver.proxies import current_oaiserver
+from lxml import etree
+
+from invenio_dnb_urn import streaming
+from invenio_dnb_urn.dumpers import DATESTAMP_FIELD
+
+NS = {"oai": "http://www.openarchives.org/OAI/2.0/", "x": "urn:x"}
+
+
+class Pagination:
+    """Single page of search hits."""
+
+    page = 1
+    per_page = 10
+    has_next = False
+    next_num = None
+
+    def __init__(self, hits):
+        """Constructor."""
+        self.total = len(hits)
+        self.response = {"hits": {"hits": hits}}
+
+    @property
+    def items(self):
+        """Search hits as returned by ``invenio_oaiserver``."""
+        for hit in self.response["hits"]["hits"]:
+            yield {"id": hit["_id"], "json": hit, "updated": datetime(2023, 6, 1)}
+
+
+def listrecords(base_app, monkeypatch, hits, sets):
+    """Chunks of a streamed ListRecords response."""
+    monkeypatch.setattr(streaming, "get_records", lambda **kwargs: Pagination(hits))
+    monkeypatch.setattr(streaming, "sets_search_all", lambda sources: sets)
+    monkeypatch.setattr(
+        streaming,
+        "xmetadiss_fragments",
+        lambda records: (
+            b'<x:doc xmlns:x="urn:x">%s</x:doc>' % r["_id"].encode() for r in records
+        ),
+    )
+    with base_app.test_request_context("/oai2d"):
+        return list(
+            streaming.listrecords(verb="ListRecords", metadataPrefix="xMetaDiss")
+        )
+
+
+def test_listrecords_envelope(base_app, monkeypatch):
+    """Records are written into the invenio-oaiserver envelope."""
+    hits = [
+        {"_id": f"id-{i}", "_source": {"_oai": {"id": f"oai:127.0.0.1:{i}"}}}
+        for i in range(2)
+    ]
+    chunks = listrecords(base_app, monkeypatch, hits, [["user-a"], []])
+    root = etree.fromstring(b"".join(chunks))
+
+    assert root.tag == "{http://www.openarchives.org/OAI/2.0/}OAI-PMH"
+    request = root.find("oai:request", NS)
+    assert request.get("verb") == "ListRecords"
+    assert request.get("metadataPrefix") == "xMetaDiss"
+    assert root.find("oai:responseDate", NS) is not None
+
+    records = root.findall("oai:ListRecords/oai:record", NS)
+    assert len(records) == 2
+    header = records[0].find("oai:header", NS)
+    assert header.findtext("oai:identifier", namespaces=NS) == "oai:127.0.0.1:0"
+    assert header.findtext("oai:datestamp", namespaces=NS) == "2023-06-01T00:00:00Z"
+    assert header.findtext("oai:setSpec", namespaces=NS) == "user-a"
+    assert records[1].find("oai:header/oai:setSpec", NS) is None
+    assert [r.findtext("oai:metadata/x:doc", namespaces=NS) for r in records] == [
+        "id-0",
+        "id-1",
+    ]
+    assert root.find("oai:ListRecords/oai:resumptionToken", NS) is None
+
+
+def test_listrecords_streams_records(base_app, monkeypatch):
+    """The envelope is sent first, then one chunk per record."""
+    hits = [
+        {"_id": f"id-{i}", "_source": {"_oai": {"id": f"oai:127.0.0.1:{i}"}}}
+        for i in range(3)
+    ]
+    chunks = listrecords(base_app, monkeypatch, hits, [[], [], []])
+
+    assert chunks[0].startswith(b"<?xml")
+    assert b"<record" not in chunks[0]
+    assert chunks[0].rstrip().endswith(b"<ListRecords>")
+    assert all(chunk.count(b"<record>") == 1 for chunk in chunks[1:4])
+    assert chunks[-1].rstrip().endswith(b"</OAI-PMH>")
+
+
+def test_hit_datestamp(base_app):
+    """Documents without xMetaDiss datestamp are dated by their last update."""
+    with base_app.app_context():
+        key = current_oaiserver.last_update_key
+        dated = {key: "2023-06-01T00:00:00", DATESTAMP_FIELD: "2023-01-01T10:00:00"}
+        assert streaming.hit_datestamp(dated, DATESTAMP_FIELD) == datetime(
+            2023, 1, 1, 10
+        )
+        assert streaming.hit_datestamp(
+            {key: "2023-06-01T00:00:00+00:00"}, DATESTAMP_FIELD
+        ) == datetime(2023, 6, 1)
+
+
+def test_datestamp_range(base_app):
+    """The range falls back to the last update for documents not reindexed."""
+    time_range = {"gte": "2023-01-01"}
+    with base_app.app_context():
+        key = current_oaiserver.last_update_key
+        assert streaming.datestamp_range(key, time_range).to_dict() == {
+            "range": {key: time_range}
+        }
+        assert streaming.datestamp_range(DATESTAMP_FIELD, time_range).to_dict() == {
+            "bool": {
+                "should": [
+                    {"range": {DATESTAMP_FIELD: time_range}},
+                    {
+                        "bool": {
+                            "must_not": [{"exists": {"field": DATESTAMP_FIELD}}],
+                            "filter": [{"range": {key: time_range}}],
+                        }
+                    },
+                ],
+                "minimum_should_match": 1,
+            }
+        }
+
+
+def test_listidentifiers(base_app, monkeypatch):
+    """Identifiers are dated like the records of ListRecords."""
+    hits = [{"_id": "id-0", "_source": {"_oai": {"id": "oai:127.0.0.1:0"}}}]
+    monkeypatch.setattr(streaming, "get_records", lambda **kwargs: Pagination(hits))
+    monkeypatch.setattr(streaming, "sets_search_all", lambda sources: [["user-a"]])
+    with base_app.test_request_context("/oai2d"):
+        root = streaming.listidentifiers(
+            verb="ListIdentifiers", metadataPrefix="xMetaDiss"
+        ).getroot()
+
+    headers = root.findall("oai:ListIdentifiers/oai:header", NS)
+    assert len(headers) == 1
+    assert headers[0].findtext("oai:identifier", namespaces=NS) == "oai:127.0.0.1:0"
+    assert headers[0].findtext("oai:datestamp", namespaces=NS) == (
+        "2023-06-01T00:00:00Z"
+    )
+    assert headers[0].findtext("oai:setSpec", namespaces=NS) == "user-a"
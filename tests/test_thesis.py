@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Thesis type vocabulary tests."""
+
+import json
+import os
+import pickle
+
+import pytest
+
+from invenio_dnb_urn import thesis
+from invenio_dnb_urn.thesis import ThesisTypes, ThesisTypesFile
+
+DOCTORAL = """
+- id: "thesis.doctoral"
+  title:
+    en: "PhD thesis"
+    de: "Dissertation"
+  props:
+    dini_publtype: "doctoralThesis"
+"""
+
+MASTER = """
+- id: "thesis.master"
+  title:
+    en: "Master thesis"
+"""
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """Settable ``time.monotonic`` of the vocabulary file."""
+    now = [1000.0]
+    monkeypatch.setattr(thesis.time, "monotonic", lambda: now[0])
+    return now
+
+
+def write(path, content, mtime):
+    """Write the vocabulary with the given modification time."""
+    path.write_text(content)
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_thesis_types():
+    """Entries are indexed by id and cannot be changed."""
+    types = ThesisTypes(
+        [{"id": "thesis.doctoral", "title": {"en": "PhD thesis"}, "props": {}}]
+    )
+    assert "thesis.doctoral" in types
+    assert len(types) == 1
+    assert types.title("thesis.doctoral") == "PhD thesis"
+    assert types.title("thesis.doctoral", "de") is None
+    assert types.dini_publtype("thesis.doctoral") is None
+    assert types.get("thesis.unknown") is None
+    with pytest.raises(TypeError):
+        types.get("thesis.doctoral").title["en"] = "Thesis"
+    assert pickle.loads(pickle.dumps(types)).digest == types.digest
+
+
+def test_reload_after_check_interval(tmp_path, clock):
+    """A changed file is reloaded once the check interval passed."""
+    path = tmp_path / "thesis_types.yaml"
+    write(path, DOCTORAL, 1_000_000_000)
+    types = ThesisTypesFile(str(path), check_interval=30)
+    assert types.dini_publtype("thesis.doctoral") == "doctoralThesis"
+    digest = types.digest
+
+    write(path, MASTER, 2_000_000_000)
+    clock[0] += 29
+    assert types.get("thesis.doctoral") is not None
+    clock[0] += 1
+    assert types.get("thesis.doctoral") is None
+    assert types.title("thesis.master") == "Master thesis"
+    assert types.digest != digest
+
+
+def test_missing_file(tmp_path):
+    """A missing file gives an empty index."""
+    types = ThesisTypesFile(str(tmp_path / "thesis_types.yaml"))
+    assert len(types.load()) == 0
+
+
+def test_parsed_cache(tmp_path, clock):
+    """The parsed entries are read from the cache while the file is unchanged."""
+    path = tmp_path / "thesis_types.yaml"
+    cache_path = tmp_path / "cache" / "thesis_types.json"
+    write(path, DOCTORAL, 1_000_000_000)
+    ThesisTypesFile(str(path), cache_path=str(cache_path)).load()
+    cache = json.loads(cache_path.read_text())
+    cache["entries"][0]["props"]["dini_publtype"] = "masterThesis"
+    cache_path.write_text(json.dumps(cache))
+
+    types = ThesisTypesFile(str(path), cache_path=str(cache_path))
+    assert types.dini_publtype("thesis.doctoral") == "masterThesis"
+
+    write(path, DOCTORAL, 2_000_000_000)
+    types = ThesisTypesFile(str(path), cache_path=str(cache_path))
+    assert types.dini_publtype("thesis.doctoral") == "doctoralThesis"
+
+
+def test_pickles_as_index(tmp_path):
+    """Serializer pool workers receive the current index."""
+    path = tmp_path / "thesis_types.yaml"
+    write(path, DOCTORAL, 1_000_000_000)
+    types = pickle.loads(pickle.dumps(ThesisTypesFile(str(path))))
+    assert isinstance(types, ThesisTypes)
+    assert types.dini_publtype("thesis.doctoral") == "doctoralThesis"
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""URN syntax and check digit tests."""
+
+import pytest
+
+from invenio_dnb_urn.urn import add_check_digit, validate_urn, validate_urns
+
+
+@pytest.mark.parametrize(
+    "urn,expected",
+    [
+        ("urn:nbn:de:bvb:19-14664", "urn:nbn:de:bvb:19-146642"),
+        ("urn:nbn:de:gbv:089-332175294", "urn:nbn:de:gbv:089-3321752945"),
+        ("urn:nbn:de:hbz:6-12345", "urn:nbn:de:hbz:6-123458"),
+    ],
+)
+def test_add_check_digit(urn, expected):
+    """The DNB check digit is appended."""
+    assert add_check_digit(urn) == expected
+
+
+def test_add_check_digit_is_case_insensitive():
+    """Upper case URNs get the same check digit."""
+    assert add_check_digit("URN:NBN:DE:BVB:19-14664") == "URN:NBN:DE:BVB:19-146642"
+
+
+def test_add_check_digit_invalid_character():
+    """Characters outside the URN alphabet are rejected."""
+    with pytest.raises(ValueError):
+        add_check_digit("urn:nbn:de:hbz:6-1 2")
+
+
+def test_validate_urn():
+    """A URN with a correct check digit and prefix is valid."""
+    assert validate_urn("urn:nbn:de:bvb:19-146642") == []
+    assert validate_urn("urn:nbn:de:bvb:19-146642", prefix="urn:nbn:de:bvb:19") == []
+
+
+def test_validate_urn_wrong_check_digit():
+    """A wrong check digit is reported."""
+    errors = validate_urn("urn:nbn:de:bvb:19-146643")
+    assert errors == ["Invalid check digit of URN urn:nbn:de:bvb:19-146643."]
+
+
+def test_validate_urn_without_check_digit():
+    """URNs without check digit are valid when it is not expected."""
+    assert validate_urn("urn:nbn:de:bvb:19-146643", with_check_digit=False) == []
+
+
+def test_validate_urn_wrong_prefix():
+    """A URN outside the prefix is reported."""
+    errors = validate_urn("urn:nbn:de:hbz:6-123458", prefix="urn:nbn:de:bvb:19")
+    assert errors == [
+        "Wrong URN urn:nbn:de:hbz:6-123458 prefix provided, "
+        "it should be urn:nbn:de:bvb:19."
+    ]
+
+
+@pytest.mark.parametrize(
+    "urn", ["", "urn:isbn:3-16-148410-0", "urn:nbn:de", "urn:nbn:de:hbz:6-1 2"]
+)
+def test_validate_urn_syntax(urn):
+    """Strings which are no URN:NBN are reported."""
+    assert validate_urn(urn) == [f"{urn} is not a valid URN:NBN."]
+
+
+def test_validate_urns():
+    """Only invalid URNs are returned, with their errors."""
+    invalid = validate_urns(
+        ["urn:nbn:de:bvb:19-146642", "urn:nbn:de:bvb:19-146643", "foo"]
+    )
+    assert list(invalid) == ["urn:nbn:de:bvb:19-146643", "foo"]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""Vocabulary props cache tests."""
+
+import pytest
+from invenio_vocabularies.records.api import Vocabulary
+
+from invenio_dnb_urn import utils
+from invenio_dnb_urn.utils import VocabularyPropsCache
+
+KEY = ("resourcetypes", ("props.dini_publtype",), "publication-thesis")
+
+
+@pytest.fixture()
+def clock(monkeypatch):
+    """Settable ``time.monotonic`` of the cache."""
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl(clock):
+    """Entries expire after the TTL."""
+    cache = VocabularyPropsCache(ttl=60)
+    cache.set(KEY, {"dini_publtype": "doctoralThesis"})
+    clock[0] += 59
+    assert cache.get(KEY) == {"dini_publtype": "doctoralThesis"}
+    clock[0] += 2
+    assert cache.get(KEY) is None
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+    assert cache.stats["size"] == 0
+
+
+def test_maxsize():
+    """The least recently used entry is evicted."""
+    cache = VocabularyPropsCache(maxsize=2)
+    cache.set(("a",), {})
+    cache.set(("b",), {})
+    cache.get(("a",))
+    cache.set(("c",), {})
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == {}
+    assert cache.get(("c",)) == {}
+
+
+def test_disabled():
+    """Nothing is cached with a size of 0."""
+    cache = VocabularyPropsCache(maxsize=0)
+    cache.set(KEY, {})
+    assert cache.get(KEY) is None
+
+
+def test_invalidate():
+    """Only the entries of the given vocabulary are dropped."""
+    cache = VocabularyPropsCache()
+    cache.set(KEY, {})
+    cache.set(("licenses", ("props.url",), "cc-by-4.0"), {})
+    cache.invalidate("resourcetypes")
+    assert cache.get(KEY) is None
+    assert cache.get(("licenses", ("props.url",), "cc-by-4.0")) == {}
+    cache.invalidate()
+    assert cache.stats["size"] == 0
+
+
+def test_configure():
+    """Reconfiguring drops the cached entries."""
+    cache = VocabularyPropsCache()
+    cache.set(KEY, {})
+    cache.configure(maxsize=10, ttl=5)
+    assert cache.get(KEY) is None
+    assert (cache.maxsize, cache.ttl) == (10, 5)
+
+
+def test_cached_props_need_no_search(base_app, monkeypatch):
+    """Cached props are returned without reading the vocabulary."""
+    cache = VocabularyPropsCache()
+    cache.set(KEY, {"dini_publtype": "doctoralThesis"})
+    monkeypatch.setattr(utils, "vocabulary_props_cache", cache)
+    with base_app.app_context():
+        props = utils.get_vocabulary_props(
+            "resourcetypes", ["props.dini_publtype"], "publication-thesis"
+        )
+    assert props == {"dini_publtype": "doctoralThesis"}
+
+
+def test_vocabulary_write_invalidates(base_app, monkeypatch):
+    """Writing a vocabulary entry drops the cached props of its vocabulary."""
+    cache = VocabularyPropsCache()
+    cache.set(KEY, {})
+    cache.set(("licenses", ("props.url",), "cc-by-4.0"), {})
+    monkeypatch.setattr(utils, "vocabulary_props_cache", cache)
+    with base_app.app_context():
+        record = Vocabulary({"type": {"id": "resourcetypes"}})
+        utils.invalidate_vocabulary_props(None, record=record)
+        utils.invalidate_vocabulary_props(None, record={"type": {"id": "licenses"}})
+    assert cache.get(KEY) is None
+    assert cache.get(("licenses", ("props.url",), "cc-by-4.0")) == {}
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2023 University of Münster.
+#
+# Invenio-Dnb-Urn is free software; you can redistribute it and/or modify
+# it under the terms of the MIT License; see LICENSE file for more details.
+
+"""xMetaDiss export tests."""
+
+import pytest
+
+from invenio_dnb_urn import oai, views
+
+GENERATION = "0123456789abcdef0123456789abcdef01234567"
+
+ETAG = "abcd-1234:3:0123456789abcdef"
+
+DATA = {
+    "id": "abcd-1234",
+    "pids": {"oai": {"identifier": "oai:127.0.0.1:abcd-1234"}},
+    "access": {"record": "public"},
+}
+
+
+@pytest.fixture()
+def export(base_app, monkeypatch):
+    """Export view with a stored record and its search hit."""
+    stored = {"abcd-1234": (3, DATA)}
+    indexed = {"abcd-1234": {"_version": 3, "_source": DATA}}
+    searches = []
+
+    def indexed_record(pid_value):
+        searches.append(pid_value)
+        return indexed.get(pid_value)
+
+    monkeypatch.setattr(views, "_record_revision", stored.get)
+    monkeypatch.setattr(views, "_indexed_record", indexed_record)
+    monkeypatch.setattr(
+        oai.XMetaDissBuilder, "generation", lambda self, source: GENERATION
+    )
+    monkeypatch.setattr(
+        oai, "build_fragment", lambda builder, source: (b"<xMetaDiss/>", 0.1)
+    )
+    return base_app.test_client(), stored, indexed, searches
+
+
+def test_export(export):
+    """The xMetaDiss of a record is served with its ETag."""
+    client, _, _, _ = export
+    response = client.get("/records/abcd-1234/export/xmetadiss")
+    assert response.status_code == 200
+    assert response.data == b'<?xml version="1.0" encoding="UTF-8"?>\n<xMetaDiss/>'
+    assert response.get_etag() == (ETAG, False)
+    assert response.cache_control.public
+
+
+def test_export_not_modified(export):
+    """A matching ETag is answered without searching the record."""
+    client, _, _, searches = export
+    response = client.get(
+        "/records/abcd-1234/export/xmetadiss", headers={"If-None-Match": f'"{ETAG}"'}
+    )
+    assert response.status_code == 304
+    assert response.get_etag() == (ETAG, False)
+    assert searches == []
+
+
+def test_export_changed_generation(export, monkeypatch):
+    """The ETag changes with the builder generation."""
+    client, _, _, _ = export
+    monkeypatch.setattr(
+        oai.XMetaDissBuilder, "generation", lambda self, source: "f" * 40
+    )
+    response = client.get(
+        "/records/abcd-1234/export/xmetadiss", headers={"If-None-Match": f'"{ETAG}"'}
+    )
+    assert response.status_code == 200
+    assert response.get_etag() == ("abcd-1234:3:ffffffffffffffff", False)
+
+
+def test_export_restricted(export):
+    """Records OAI-PMH does not expose are not answered with 304."""
+    client, stored, indexed, searches = export
+    stored["abcd-1234"] = (3, {**DATA, "access": {"record": "restricted"}})
+    del indexed["abcd-1234"]
+    response = client.get(
+        "/records/abcd-1234/export/xmetadiss", headers={"If-None-Match": f'"{ETAG}"'}
+    )
+    assert response.status_code == 404
+    assert searches == ["abcd-1234"]
+
+
+def test_export_unknown(export):
+    """Unknown records are not found."""
+    client, _, _, _ = export
+    assert client.get("/records/unknown/export/xmetadiss").status_code == 404